@@ -5,5 +5,13 @@ class BaseBrain(ABC):
     brain_name: str = ""
 
     @abstractmethod
-    def get_spawn_cmd(self, tool_name: str, params: dict) -> str:
-        """Return a shell command string that invokes this brain for the given tool/params."""
+    def get_spawn_argv(self, tool_name: str, params: dict) -> list[str]:
+        """Return the argv (no shell) that invokes this brain for the given tool/params."""
+
+    def get_result_path(self, task_id: int) -> str | None:
+        """Return where this brain will write *task_id*'s result, or None if unknown.
+
+        Recorded on the task so providers can open it directly instead of
+        searching the inbox.
+        """
+        return None
@@ -15,20 +15,22 @@ class ClaudeCodeBrain(BaseBrain):
     def __init__(self, cloud_brain_semaphore: asyncio.Semaphore | None = None) -> None:
         self._semaphore = cloud_brain_semaphore
 
-    def get_spawn_cmd(self, tool_name: str, params: dict) -> str:
-        """Build a `claude` CLI invocation for the given task."""
-        prompt = self._build_prompt(tool_name, params)
-        # Escape single quotes in the prompt for shell safety
-        safe_prompt = prompt.replace("'", "'\\''")
-        return f"claude --print '{safe_prompt}'"
+    def get_spawn_argv(self, tool_name: str, params: dict) -> list[str]:
+        """Build a `claude` CLI invocation for the given task.
+
+        The prompt is passed as a single argv element, so no shell quoting is needed.
+        """
+        return ["claude", "--print", self._build_prompt(tool_name, params)]
+
+    def get_result_path(self, task_id: int) -> str | None:
+        return f"{get_settings().brain_inbox}/{task_id}_result.md"
 
     def _build_prompt(self, tool_name: str, params: dict) -> str:
         task_id = params.get("_task_id", "unknown")
-        inbox = get_settings().brain_inbox
         return (
             f"You are Pie-Brain's cloud assistant.\n"
             f"Tool requested: {tool_name}\n"
             f"Parameters: {json.dumps(params, indent=2)}\n"
             f"Please complete this task and write your Markdown output to "
-            f"{inbox}/{task_id}_result.md"
+            f"{self.get_result_path(task_id)}"
         )
@@ -1,38 +1,53 @@
-"""Auto-loading brain registry."""
+"""Explicit brain registry — brains are imported lazily on first use."""
 import asyncio
 import importlib
-import pkgutil
 import logging
-from pathlib import Path
 
 from brains.base import BaseBrain
 
 logger = logging.getLogger(__name__)
 
+# brain_name → "module:ClassName". Only the brain actually requested is imported.
+_BRAIN_CLASSES: dict[str, str] = {
+    "claude_code": "brains.claude_code:ClaudeCodeBrain",
+}
+
 
 class BrainRegistry:
     def __init__(self, cloud_brain_semaphore: asyncio.Semaphore | None = None) -> None:
         self._semaphore = cloud_brain_semaphore
+        # Resolved classes; guardian validates and quarantines entries here.
         self._registry: dict[str, type[BaseBrain]] = {}
-        self._load_all()
+        # Not-yet-imported targets; each is moved into _registry once resolved.
+        self._targets: dict[str, str] = dict(_BRAIN_CLASSES)
+
+    @staticmethod
+    def register(name: str, target: str) -> None:
+        """Register a third-party brain as *name* → ``"pkg.module:ClassName"``.
 
-    def _load_all(self) -> None:
-        """Import every module in brains/ to trigger subclass registration."""
-        pkg_path = str(Path(__file__).parent)
-        for info in pkgutil.iter_modules([pkg_path]):
-            if info.name not in ("base", "registry"):
-                importlib.import_module(f"brains.{info.name}")
+        Affects registries created afterwards.
+        """
+        _BRAIN_CLASSES[name] = target
 
-        for cls in BaseBrain.__subclasses__():
-            if cls.brain_name:
-                self._registry[cls.brain_name] = cls
-                logger.debug("Brain registered: %s", cls.brain_name)
+    def load(self, name: str) -> type[BaseBrain]:
+        """Return the brain class registered as *name*, importing it on first use."""
+        brain_cls = self._registry.get(name)
+        if brain_cls is not None:
+            return brain_cls
+        target = self._targets.get(name)
+        if target is None:
+            raise KeyError(f"No brain registered under {name!r}. Available: {self.available}")
+        module_name, _, attr = target.partition(":")
+        brain_cls = getattr(importlib.import_module(module_name), attr)
+        # Only dropped once resolved, so a failed import can be retried later.
+        self._registry[name] = brain_cls
+        del self._targets[name]
+        logger.debug("Brain registered: %s", name)
+        return brain_cls
 
     def get(self, name: str) -> BaseBrain:
         """Return an instantiated brain by name, injecting the semaphore."""
-        brain_cls = self._registry.get(name)
-        if brain_cls is None:
-            raise KeyError(f"No brain registered under {name!r}. Available: {list(self._registry)}")
+        brain_cls = self.load(name)
         try:
             return brain_cls(cloud_brain_semaphore=self._semaphore)
         except TypeError:
@@ -40,4 +55,4 @@ class BrainRegistry:
 
     @property
     def available(self) -> list[str]:
-        return list(self._registry.keys())
+        return [*self._registry, *self._targets]
@@ -1,14 +1,41 @@
 import asyncio
+import copy
 from functools import lru_cache
 from pathlib import Path
 
-import yaml
 from pydantic import field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 # Absolute project root so .env and config.yaml are found regardless of CWD.
 _PROJECT_ROOT = Path(__file__).parent.parent
 
+# Parsed config.yaml contents keyed by resolved path: (st_mtime, st_size, data).
+_YAML_CACHE: dict[Path, tuple[float, int, dict]] = {}
+
+
+def _load_yaml(yaml_path: Path) -> dict:
+    """Parse *yaml_path*, reusing the cached result while mtime and size are unchanged."""
+    key = yaml_path.resolve()
+    st = key.stat()
+    cached = _YAML_CACHE.get(key)
+    if cached is not None and cached[0] == st.st_mtime and cached[1] == st.st_size:
+        return copy.deepcopy(cached[2])
+
+    import yaml  # deferred: only needed when a config.yaml is actually present
+
+    # libyaml's C loader is much faster; fall back when PyYAML was built without it.
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    with key.open() as f:
+        data = yaml.load(f, Loader=loader) or {}
+    _YAML_CACHE[key] = (st.st_mtime, st.st_size, data)
+    return copy.deepcopy(data)
+
+
+@lru_cache(maxsize=32)
+def _expand(path: str) -> str:
+    """Memoized ``~`` expansion; the same few paths are expanded on every Settings build."""
+    return str(Path(path).expanduser())
+
 
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(
@@ -25,6 +52,10 @@ class Settings(BaseSettings):
     ollama_base_url: str = "http://localhost:11434"
     ollama_timeout: int = 300  # seconds; generous for CPU-bound Pi 4
     ollama_max_retries: int = 3
+    ollama_keep_alive: str = "10m"  # how long Ollama keeps the model loaded between calls
+    ollama_num_ctx: int = 2048
+    # Seconds an identical request reuses its previous routing decision (0 = disabled)
+    router_cache_ttl: int = 300
 
     # ArXiv
     arxiv_discover_keywords: list[str] = [
@@ -32,10 +63,20 @@ class Settings(BaseSettings):
         "reinforcement learning",
         "computer vision",
     ]
+    # Daily discover results are reused from here for the rest of the UTC day
+    arxiv_cache_dir: str = "~/.pie-brain/cache/arxiv"
 
     # Memory / LanceDB
     memory_db_path: str = "~/.pie-brain/memory"
     memory_embedding_model: str = "all-MiniLM-L6-v2"
+    # sentence-transformers inference backend: "torch", or "onnx"/"openvino" for faster
+    # CPU inference (needs sentence-transformers>=3.2 with its onnx/openvino extra)
+    memory_embedding_backend: str = "torch"
+    # IVF partitions probed per search once the memory table is indexed
+    memory_nprobes: int = 20
+    # Memory store/query workers (each runs an embedding) allowed at once. The encoder
+    # already spreads one batch over every core, so more only adds contention on a Pi.
+    memory_embed_concurrency: int = 1
 
     # Paths
     db_path: str = "~/.pie-brain/tasks.db"
@@ -49,10 +90,14 @@ class Settings(BaseSettings):
 
     # Telegram
     telegram_bot_token: str = ""
-    # Comma-separated list of allowed Telegram user IDs (empty = allow all — not recommended)
-    telegram_allowed_user_ids: list[int] = []
-    # How often (seconds) the bot polls for completed tasks to deliver results
-    telegram_result_poll_interval: int = 5
+    # Allowed Telegram user IDs (empty = allow all — not recommended). A frozenset,
+    # so the per-update authorization check is a hash lookup.
+    telegram_allowed_user_ids: frozenset[int] = frozenset()
+    # Safety-net interval (seconds) for re-checking undelivered results; deliveries
+    # are normally triggered as soon as a cloud brain exits
+    telegram_result_poll_interval: int = 60
+    # New messages are turned away while this many tasks are still pending (0 = no cap)
+    telegram_max_pending_tasks: int = 50
 
     # Guardian
     guardian_poll_interval: int = 60
@@ -63,16 +108,17 @@ class Settings(BaseSettings):
     dev_mode_poll_interval: int = 300  # seconds between git fetch checks (default 5 min)
 
     @field_validator(
-        "db_path", "log_dir", "brain_inbox", "user_prefs_path", "memory_db_path", mode="before"
+        "db_path", "log_dir", "brain_inbox", "user_prefs_path", "memory_db_path",
+        "arxiv_cache_dir", mode="before",
     )
     @classmethod
     def expand_path(cls, v: str) -> str:
-        return str(Path(v).expanduser())
+        return _expand(v)
 
     @field_validator("guardian_allowed_write_paths", mode="before")
     @classmethod
     def expand_paths(cls, v: list) -> list[str]:
-        return [str(Path(p).expanduser()) for p in v]
+        return [_expand(p) for p in v]
 
     @classmethod
     def from_yaml(cls, path: str | Path = "config.yaml") -> "Settings":
@@ -82,8 +128,7 @@ class Settings(BaseSettings):
             yaml_path = _PROJECT_ROOT / yaml_path
         overrides: dict = {}
         if yaml_path.exists():
-            with yaml_path.open() as f:
-                overrides = yaml.safe_load(f) or {}
+            overrides = _load_yaml(yaml_path)
         return cls(**overrides)
 
     def build_semaphores(self) -> tuple[asyncio.Semaphore, asyncio.Semaphore]:
@@ -9,6 +9,23 @@ from pydantic import BaseModel, Field
 
 logger = logging.getLogger(__name__)
 
+try:  # optional C-accelerated JSON; stdlib json is the fallback
+    import orjson
+
+    def _dumps(obj: Any) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    _loads = orjson.loads
+except ImportError:
+    _dumps = json.dumps
+    _loads = json.loads
+
+
+def encode_metadata(metadata: dict) -> str:
+    """Serialise task metadata exactly as Database stores it."""
+    return _dumps(metadata)
+
+
 DB_SCHEMA = """
 CREATE TABLE IF NOT EXISTS tasks (
     id          INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -20,8 +37,13 @@ CREATE TABLE IF NOT EXISTS tasks (
     notified    INTEGER NOT NULL DEFAULT 0,
     result      TEXT,
     attempt     INTEGER NOT NULL DEFAULT 0,
-    retry_after TEXT
+    retry_after TEXT,
+    result_path TEXT
 );
+CREATE INDEX IF NOT EXISTS idx_tasks_status_id ON tasks (status, id);
+-- Only undelivered chat results; stays tiny however many tasks have completed.
+CREATE INDEX IF NOT EXISTS idx_tasks_undelivered ON tasks (status, id)
+    WHERE notified = 0 AND chat_id IS NOT NULL;
 """
 
 
@@ -45,6 +67,7 @@ class Task(BaseModel):
     result: str | None = None
     attempt: int = 0
     retry_after: str | None = None  # ISO-8601 UTC; None means "ready now"
+    result_path: str | None = None  # file a cloud brain writes its result to
 
     @classmethod
     def from_row(cls, row: aiosqlite.Row) -> "Task":
@@ -53,155 +76,245 @@ class Task(BaseModel):
             request_text=row["request_text"],
             status=TaskStatus(row["status"]),
             tool_name=row["tool_name"],
-            metadata=json.loads(row["metadata"] or "{}"),
+            metadata=_loads(row["metadata"] or "{}"),
             chat_id=row["chat_id"],
             notified=bool(row["notified"]),
             result=row["result"],
             attempt=row["attempt"] or 0,
             retry_after=row["retry_after"],
+            result_path=row["result_path"],
         )
 
 
-async def init_db(db_path: str) -> None:
-    """Create DB file + schema if not present."""
-    Path(db_path).parent.mkdir(parents=True, exist_ok=True)
-    async with aiosqlite.connect(db_path) as db:
-        await db.executescript(DB_SCHEMA)
+_UPDATE_STATUS_SQL = """
+UPDATE tasks SET
+    status    = ?,
+    tool_name = COALESCE(?, tool_name),
+    metadata  = COALESCE(?, metadata),
+    result    = COALESCE(?, result),
+    result_path = COALESCE(?, result_path)
+WHERE id = ?
+"""
+
+_CLAIM_BATCH = 32  # max tasks claimed per poll
+
+_CLAIM_PENDING_SQL = """
+UPDATE tasks SET status = ?
+WHERE id IN (
+    SELECT id FROM tasks
+    WHERE status = ?
+      AND (retry_after IS NULL OR retry_after <= strftime('%Y-%m-%dT%H:%M:%SZ', 'now'))
+    ORDER BY id ASC
+    LIMIT ?
+)
+RETURNING *
+"""
+
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=67108864",  # 64 MiB: reads come straight from the page cache
+)
+
+
+class Database:
+    """Task queue backed by a single long-lived aiosqlite connection.
+
+    Opening a connection per operation forces a fresh page-cache warmup and
+    journal setup every time; the engine polls and updates far too often for
+    that on a Pi 4, so every operation shares one connection instead.
+    """
+
+    def __init__(self, db_path: str) -> None:
+        self.db_path = db_path
+        self._conn: aiosqlite.Connection | None = None
+
+    @property
+    def conn(self) -> aiosqlite.Connection:
+        if self._conn is None:
+            raise RuntimeError(f"Database {self.db_path} is not open; call open() first")
+        return self._conn
+
+    async def open(self) -> None:
+        """Open the connection, apply pragmas, and create/migrate the schema."""
+        if self._conn is not None:
+            return
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit: each write statement is its own transaction, so a write
+        # is one hop to the connection's worker thread instead of execute + commit.
+        self._conn = await aiosqlite.connect(self.db_path, isolation_level=None)
+        self._conn.row_factory = aiosqlite.Row
+        for pragma in _PRAGMAS:
+            await self._conn.execute(pragma)
+        await self._conn.executescript(DB_SCHEMA)
         # Migrate existing databases that predate newer columns.
         for migration in (
             "ALTER TABLE tasks ADD COLUMN result TEXT",
             "ALTER TABLE tasks ADD COLUMN attempt INTEGER NOT NULL DEFAULT 0",
             "ALTER TABLE tasks ADD COLUMN retry_after TEXT",
+            "ALTER TABLE tasks ADD COLUMN result_path TEXT",
         ):
             try:
-                await db.execute(migration)
-                await db.commit()
+                await self._conn.execute(migration)
             except aiosqlite.OperationalError:
                 pass  # column already exists
-    logger.info("Database initialised at %s", db_path)
-
-
-async def enqueue_task(
-    db_path: str,
-    request_text: str,
-    metadata: dict | None = None,
-    chat_id: int | None = None,
-) -> int:
-    """Insert a new pending task; returns its id."""
-    async with aiosqlite.connect(db_path) as db:
-        cursor = await db.execute(
+        logger.info("Database initialised at %s", self.db_path)
+
+    async def close(self) -> None:
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
+
+    async def enqueue_task(
+        self,
+        request_text: str,
+        metadata: dict | None = None,
+        chat_id: int | None = None,
+    ) -> int:
+        """Insert a new pending task; returns its id."""
+        cursor = await self.conn.execute(
             "INSERT INTO tasks (request_text, status, metadata, chat_id) VALUES (?, ?, ?, ?)",
-            (request_text, TaskStatus.pending.value, json.dumps(metadata or {}), chat_id),
+            (request_text, TaskStatus.pending.value, _dumps(metadata or {}), chat_id),
         )
-        await db.commit()
         return cursor.lastrowid  # type: ignore[return-value]
 
+    async def count_pending(self) -> int:
+        """Return the number of tasks still waiting to be routed."""
+        async with self.conn.execute(
+            "SELECT COUNT(*) FROM tasks WHERE status = ?", (TaskStatus.pending.value,)
+        ) as cursor:
+            (count,) = await cursor.fetchone()
+        return count
+
+    async def claim_pending_tasks(self, limit: int = _CLAIM_BATCH) -> list[Task]:
+        """Atomically move up to *limit* ready pending tasks to routing and return them.
 
-async def get_pending_tasks(db_path: str) -> list[Task]:
-    """Fetch pending tasks that are ready to run (retry_after has elapsed or is unset)."""
-    async with aiosqlite.connect(db_path) as db:
-        db.row_factory = aiosqlite.Row
-        async with db.execute(
-            """SELECT * FROM tasks
-               WHERE status = ?
-                 AND (retry_after IS NULL OR retry_after <= strftime('%Y-%m-%dT%H:%M:%SZ', 'now'))
-               ORDER BY id ASC""",
-            (TaskStatus.pending.value,),
+        A single UPDATE … RETURNING both fetches and claims, so a task can never
+        be handed out twice even if polls overlap with slow routing calls.
+        """
+        async with self.conn.execute(
+            _CLAIM_PENDING_SQL, (TaskStatus.routing.value, TaskStatus.pending.value, limit)
         ) as cursor:
             rows = await cursor.fetchall()
-    return [Task.from_row(r) for r in rows]
-
-
-async def reset_for_retry(
-    db_path: str,
-    task_id: int,
-    next_attempt: int,
-    retry_after: str,
-    metadata: dict | None = None,
-) -> None:
-    """Reset a failed task back to pending for its next retry attempt."""
-    fields = ["status = ?", "attempt = ?", "retry_after = ?"]
-    values: list = [TaskStatus.pending.value, next_attempt, retry_after]
-    if metadata is not None:
-        fields.append("metadata = ?")
-        values.append(json.dumps(metadata))
-    values.append(task_id)
-    async with aiosqlite.connect(db_path) as db:
-        await db.execute(f"UPDATE tasks SET {', '.join(fields)} WHERE id = ?", values)
-        await db.commit()
-
-
-async def update_task_status(
-    db_path: str,
-    task_id: int,
-    status: TaskStatus,
-    tool_name: str | None = None,
-    metadata: dict | None = None,
-    result: str | None = None,
-) -> None:
-    """Atomically update a task's status (and optionally tool_name/metadata/result)."""
-    fields = ["status = ?"]
-    values: list = [status.value]
-    if tool_name is not None:
-        fields.append("tool_name = ?")
-        values.append(tool_name)
-    if metadata is not None:
-        fields.append("metadata = ?")
-        values.append(json.dumps(metadata))
-    if result is not None:
-        fields.append("result = ?")
-        values.append(result)
-    values.append(task_id)
-    async with aiosqlite.connect(db_path) as db:
-        await db.execute(
-            f"UPDATE tasks SET {', '.join(fields)} WHERE id = ?",
-            values,
+        # RETURNING row order is unspecified; dispatch oldest first.
+        return sorted((Task.from_row(r) for r in rows), key=lambda t: t.id)
+
+    async def reset_for_retry(
+        self,
+        task_id: int,
+        next_attempt: int,
+        retry_after: str,
+        metadata: dict | None = None,
+    ) -> None:
+        """Reset a failed task back to pending for its next retry attempt."""
+        fields = ["status = ?", "attempt = ?", "retry_after = ?"]
+        values: list = [TaskStatus.pending.value, next_attempt, retry_after]
+        if metadata is not None:
+            fields.append("metadata = ?")
+            values.append(_dumps(metadata))
+        values.append(task_id)
+        await self.conn.execute(f"UPDATE tasks SET {', '.join(fields)} WHERE id = ?", values)
+
+    async def update_task_status(
+        self,
+        task_id: int,
+        status: TaskStatus,
+        tool_name: str | None = None,
+        metadata: dict | None = None,
+        result: str | None = None,
+        metadata_json: str | None = None,
+        result_path: str | None = None,
+    ) -> None:
+        """Atomically update a task's status (and optionally tool_name/metadata/result/result_path).
+
+        Optional fields left as None keep their stored value via COALESCE, so the
+        SQL text is constant and SQLite's statement cache hits on every call.
+        Pass *metadata_json* (see encode_metadata) instead of *metadata* when the
+        caller has already serialised it.
+        """
+        if metadata_json is None and metadata is not None:
+            metadata_json = _dumps(metadata)
+        await self.conn.execute(
+            _UPDATE_STATUS_SQL,
+            (status.value, tool_name, metadata_json, result, result_path, task_id),
         )
-        await db.commit()
 
-
-async def get_task_by_id(db_path: str, task_id: int) -> Task | None:
-    """Fetch a single task by id, or None if not found."""
-    async with aiosqlite.connect(db_path) as db:
-        db.row_factory = aiosqlite.Row
-        async with db.execute("SELECT * FROM tasks WHERE id = ?", (task_id,)) as cursor:
+    async def get_task_by_id(self, task_id: int) -> Task | None:
+        """Fetch a single task by id, or None if not found."""
+        async with self.conn.execute("SELECT * FROM tasks WHERE id = ?", (task_id,)) as cursor:
             row = await cursor.fetchone()
-    return Task.from_row(row) if row else None
-
+        return Task.from_row(row) if row else None
 
-async def get_completed_unnotified(db_path: str) -> list[Task]:
-    """Return done tasks that have a chat_id but haven't been notified yet."""
-    async with aiosqlite.connect(db_path) as db:
-        db.row_factory = aiosqlite.Row
-        async with db.execute(
+    async def get_completed_unnotified(self) -> list[Task]:
+        """Return done tasks that have a chat_id but haven't been notified yet."""
+        async with self.conn.execute(
             "SELECT * FROM tasks WHERE status = ? AND chat_id IS NOT NULL AND notified = 0",
             (TaskStatus.done.value,),
         ) as cursor:
             rows = await cursor.fetchall()
-    return [Task.from_row(r) for r in rows]
-
-
-async def mark_notified(db_path: str, task_id: int) -> None:
-    """Set notified=1 for a task."""
-    async with aiosqlite.connect(db_path) as db:
-        await db.execute("UPDATE tasks SET notified = 1 WHERE id = ?", (task_id,))
-        await db.commit()
-
+        return [Task.from_row(r) for r in rows]
+
+    async def mark_notified(self, task_id: int) -> None:
+        """Set notified=1 for a task."""
+        await self.conn.execute("UPDATE tasks SET notified = 1 WHERE id = ?", (task_id,))
+
+    async def mark_notified_many(self, task_ids: list[int]) -> None:
+        """Set notified=1 for every task in *task_ids* in one statement (one transaction)."""
+        if not task_ids:
+            return
+        await self.conn.execute(
+            "UPDATE tasks SET notified = 1 WHERE id IN (SELECT value FROM json_each(?))",
+            (_dumps(task_ids),),
+        )
 
-async def get_recent_tasks(db_path: str, limit: int = 5) -> list[Task]:
-    """Fetch the most recently created tasks, newest first."""
-    async with aiosqlite.connect(db_path) as db:
-        db.row_factory = aiosqlite.Row
-        async with db.execute(
+    async def get_recent_tasks(self, limit: int = 5) -> list[Task]:
+        """Fetch the most recently created tasks, newest first."""
+        async with self.conn.execute(
             "SELECT * FROM tasks ORDER BY id DESC LIMIT ?", (limit,)
         ) as cursor:
             rows = await cursor.fetchall()
-    return [Task.from_row(r) for r in rows]
+        return [Task.from_row(r) for r in rows]
+
+    async def get_recent_task_snippets(
+        self, limit: int = 5, width: int = 60
+    ) -> list[tuple[int, TaskStatus, str]]:
+        """Return (id, status, request prefix) for the newest tasks, newest first.
+
+        Only the first *width* + 1 characters of each request are read, so a
+        caller can tell a truncated request without loading the full text.
+        """
+        async with self.conn.execute(
+            "SELECT id, status, substr(request_text, 1, ?) FROM tasks ORDER BY id DESC LIMIT ?",
+            (width + 1, limit),
+        ) as cursor:
+            rows = await cursor.fetchall()
+        return [(r[0], TaskStatus(r[1]), r[2]) for r in rows]
+
+
+async def init_db(db_path: str) -> Database:
+    """Open (creating if needed) the task database at *db_path*."""
+    db = Database(db_path)
+    await db.open()
+    return db
+
+
+# Background thread draining the log queue, and the root handler feeding it.
+_log_listener = None
+_log_queue_handler: logging.Handler | None = None
 
 
 def setup_logging(log_dir: str, level: int = logging.INFO) -> None:
-    """Configure rotating file + stderr logging."""
+    """Configure rotating file + stderr logging.
+
+    Handlers run on a QueueListener thread; the root logger only gets a
+    QueueHandler, so a log call on the event loop is just a queue put and
+    never blocks on an SD-card write or rotation.
+    """
     import logging.handlers
+    import queue
+
+    global _log_listener, _log_queue_handler
 
     log_path = Path(log_dir)
     log_path.mkdir(parents=True, exist_ok=True)
@@ -221,11 +334,30 @@ def setup_logging(log_dir: str, level: int = logging.INFO) -> None:
     stream_handler = logging.StreamHandler()
     stream_handler.setFormatter(formatter)
 
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    stop_logging()  # don't leak a previous listener if called twice
+    _log_listener = logging.handlers.QueueListener(
+        log_queue, handler, stream_handler, respect_handler_level=True
+    )
+    _log_listener.start()
+
+    _log_queue_handler = logging.handlers.QueueHandler(log_queue)
+
     root = logging.getLogger()
     root.setLevel(level)
-    root.addHandler(handler)
-    root.addHandler(stream_handler)
+    root.addHandler(_log_queue_handler)
 
     # Silence chatty third-party libraries (httpx fires on every Telegram poll tick).
     for noisy in ("httpx", "httpcore", "telegram", "apscheduler"):
         logging.getLogger(noisy).setLevel(logging.WARNING)
+
+
+def stop_logging() -> None:
+    """Flush queued log records and stop the listener thread started by setup_logging()."""
+    global _log_listener, _log_queue_handler
+    if _log_queue_handler is not None:
+        logging.getLogger().removeHandler(_log_queue_handler)
+        _log_queue_handler = None
+    if _log_listener is not None:
+        _log_listener.stop()
+        _log_listener = None
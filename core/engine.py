@@ -1,6 +1,7 @@
 """Main async engine loop."""
 import asyncio
 import logging
+import shlex
 from collections.abc import Callable
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
@@ -8,20 +9,7 @@ from typing import Awaitable
 
 import guardian
 from config.settings import get_settings
-from core.db import (
-    Task,
-    TaskStatus,
-    init_db,
-    enqueue_task,
-    get_pending_tasks,
-    get_task_by_id,
-    get_recent_tasks as _db_get_recent_tasks,
-    get_completed_unnotified,
-    mark_notified,
-    reset_for_retry,
-    update_task_status,
-    setup_logging,
-)
+from core.db import Database, Task, TaskStatus, encode_metadata, setup_logging, stop_logging
 from core.router import Router, RouterOutput
 from core.watchdog import sd_notify, watchdog_heartbeat
 from tools import TOOL_REGISTRY
@@ -30,7 +18,7 @@ from brains.registry import BrainRegistry
 
 logger = logging.getLogger(__name__)
 
-POLL_INTERVAL = 2.0  # seconds between DB polls
+POLL_INTERVAL = 30.0  # fallback DB poll when no wake-up arrives (e.g. out-of-process writers)
 MAX_ATTEMPTS = 3     # tasks that fail this many times are moved to dead status
 
 
@@ -45,12 +33,20 @@ class Engine:
             base_url=self.settings.ollama_base_url,
             timeout=self.settings.ollama_timeout,
             max_retries=self.settings.ollama_max_retries,
+            cache_ttl=self.settings.router_cache_ttl,
+            keep_alive=self.settings.ollama_keep_alive,
+            num_ctx=self.settings.ollama_num_ctx,
         )
         self.brain_registry = BrainRegistry(cloud_brain_semaphore=self.brain_sem)
+        self.db = Database(self.settings.db_path)  # opened in run()
         self._running = False
         self._scheduler = None  # set in run()
+        self._wake = asyncio.Event()  # set whenever a task becomes ready to run
         self._notify_callbacks: list[Callable[..., Awaitable[None]]] = []
         self._broadcast_callbacks: list[Callable[[str], Awaitable[None]]] = []
+        self._result_callbacks: list[Callable[[int], Awaitable[None]]] = []
+        # Brain-exit waiters; the event loop only holds tasks weakly.
+        self._brain_waiters: set[asyncio.Task] = set()
 
     def register_notify_callback(self, cb: Callable[..., Awaitable[None]]) -> None:
         """Register a coroutine called on every task status transition."""
@@ -60,6 +56,10 @@ class Engine:
         """Register a coroutine called when the engine broadcasts a system message."""
         self._broadcast_callbacks.append(cb)
 
+    def register_result_callback(self, cb: Callable[[int], Awaitable[None]]) -> None:
+        """Register a coroutine called with a task id when its cloud brain exits."""
+        self._result_callbacks.append(cb)
+
     async def broadcast_all(self, message: str) -> None:
         """Fan a system message out to all registered providers."""
         for cb in self._broadcast_callbacks:
@@ -76,23 +76,43 @@ class Engine:
         self, text: str, chat_id: int | None = None, metadata: dict | None = None
     ) -> int:
         """Enqueue a new task and return its ID."""
-        return await enqueue_task(self.settings.db_path, text, metadata=metadata, chat_id=chat_id)
+        task_id = await self.db.enqueue_task(text, metadata=metadata, chat_id=chat_id)
+        self.notify_new_task()
+        return task_id
+
+    async def pending_count(self) -> int:
+        """Return how many queued tasks haven't been picked up yet."""
+        return await self.db.count_pending()
+
+    def notify_new_task(self) -> None:
+        """Wake the worker loop so a freshly queued task is picked up immediately."""
+        self._wake.set()
 
     async def get_task(self, task_id: int) -> Task | None:
         """Fetch a single task by ID."""
-        return await get_task_by_id(self.settings.db_path, task_id)
+        return await self.db.get_task_by_id(task_id)
 
     async def get_recent_tasks(self, limit: int = 5) -> list[Task]:
         """Fetch the most recently created tasks, newest first."""
-        return await _db_get_recent_tasks(self.settings.db_path, limit=limit)
+        return await self.db.get_recent_tasks(limit=limit)
+
+    async def get_recent_task_snippets(
+        self, limit: int = 5, width: int = 60
+    ) -> list[tuple[int, TaskStatus, str]]:
+        """Fetch (id, status, request prefix) for the newest tasks, newest first."""
+        return await self.db.get_recent_task_snippets(limit=limit, width=width)
 
     async def get_deliverable_results(self) -> list[Task]:
         """Return completed tasks that have a chat_id but haven't been notified."""
-        return await get_completed_unnotified(self.settings.db_path)
+        return await self.db.get_completed_unnotified()
 
     async def mark_result_delivered(self, task_id: int) -> None:
         """Mark a task's result as delivered to the user."""
-        await mark_notified(self.settings.db_path, task_id)
+        await self.db.mark_notified(task_id)
+
+    async def mark_results_delivered(self, task_ids: list[int]) -> None:
+        """Mark a batch of task results as delivered in one transaction."""
+        await self.db.mark_notified_many(task_ids)
 
     def schedule_daily(self, utc_time: str, description: str, metadata: dict) -> None:
         """Register a new daily recurring job with the running scheduler."""
@@ -105,19 +125,23 @@ class Engine:
         """Fetch the current task state and fan-out to all registered callbacks."""
         if not self._notify_callbacks:
             return
-        task = await get_task_by_id(self.settings.db_path, task_id)
+        task = await self.db.get_task_by_id(task_id)
         if task is None:
             return
+        await self._notify_task(task)
+
+    async def _notify_task(self, task: Task) -> None:
+        """Fan-out an already-known task state to all registered callbacks."""
         for cb in self._notify_callbacks:
             try:
                 await cb(task)
             except Exception:
-                logger.exception("Notify callback error for task %d", task_id)
+                logger.exception("Notify callback error for task %d", task.id)
 
     async def run(self) -> None:
         """Start the engine; polls DB and dispatches tasks indefinitely."""
         setup_logging(self.settings.log_dir)
-        await init_db(self.settings.db_path)
+        await self.db.open()
         self._running = True
 
         # Start scheduler (always; jobs are added dynamically via ScheduleTool)
@@ -138,9 +162,21 @@ class Engine:
             except ImportError:
                 logger.warning("Telegram provider not available (not installed).")
 
+        # Import the configured brain up front so guardian validates it before first use
+        try:
+            self.brain_registry.load(self.settings.default_cloud_brain)
+        except (KeyError, ImportError):
+            logger.exception("Failed to load cloud brain %r", self.settings.default_cloud_brain)
+
         # Validate all registered modules at startup
         guardian.validate_registries(TOOL_REGISTRY, self.brain_registry)
 
+        # Load the embedding model in the background; the first memory task would
+        # otherwise pay for it.
+        if "memory" in TOOL_REGISTRY:
+            from tools.memory import preload_encoder
+            asyncio.create_task(preload_encoder())
+
         logger.info(
             "Engine started. model=%s brain=%s",
             self.settings.ollama_model,
@@ -173,21 +209,29 @@ class Engine:
             logger.info("Dev mode active: auto-pull enabled.")
 
         while self._running:
-            tasks = await get_pending_tasks(self.settings.db_path)
-            for task in tasks:
+            # Claiming marks tasks as routing in the same statement that fetches them
+            claimed = await self.db.claim_pending_tasks()
+            for task in claimed:
                 asyncio.create_task(self._handle(task))
-            await asyncio.sleep(POLL_INTERVAL)
+            if claimed:
+                continue  # claims are batched; drain any backlog before sleeping
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
 
     async def stop(self) -> None:
         self._running = False
+        await self.db.close()
         logger.info("Engine stopping.")
+        stop_logging()
 
-    async def _handle(self, task) -> None:
-        db = self.settings.db_path
+    async def _handle(self, task: Task) -> None:
+        """Route and execute a task already claimed (status=routing) by claim_pending_tasks."""
+        db = self.db
         try:
-            # Mark as routing
-            await update_task_status(db, task.id, TaskStatus.routing)
-            await self._notify(task.id)
+            await self._notify_task(task)
 
             # Route via Ollama — fall back to query on parse/timeout failures
             try:
@@ -210,16 +254,27 @@ class Engine:
             )
 
             # Mark as executing
-            await update_task_status(
-                db, task.id, TaskStatus.executing,
+            # Serialised once here; router_output.params stays the live dict for the tool.
+            await db.update_task_status(
+                task.id, TaskStatus.executing,
                 tool_name=router_output.tool_name,
-                metadata={"params": router_output.params, "handoff": router_output.handoff},
+                metadata_json=encode_metadata(
+                    {"params": router_output.params, "handoff": router_output.handoff}
+                ),
             )
             await self._notify(task.id)
 
             result: str | None = None
+            result_path: str | None = None  # where a spawned brain will write its result
+            done_metadata: dict | None = None  # replaces metadata on done; records brain PID
             if router_output.handoff:
-                await self._spawn_brain(router_output.tool_name, router_output.params)
+                params = {**router_output.params, "_task_id": task.id}
+                pid, result_path = await self._spawn_brain(
+                    task.id, router_output.tool_name, params
+                )
+                done_metadata = {
+                    "params": router_output.params, "handoff": True, "pid": pid,
+                }
             else:
                 tool_cls = TOOL_REGISTRY.get(router_output.tool_name)
                 if tool_cls is None:
@@ -254,16 +309,22 @@ class Engine:
                         "Task %d: local inference failed (%s); escalating to cloud brain",
                         task.id, exc,
                     )
-                    await update_task_status(
-                        db, task.id, TaskStatus.executing,
+                    await db.update_task_status(
+                        task.id, TaskStatus.executing,
                         tool_name=f"{router_output.tool_name}→cloud",
                         metadata={"fallback_reason": str(exc)},
                     )
                     await self._notify(task.id)
-                    await self._spawn_brain(router_output.tool_name, params)
-                    # nohup subprocess writes result to inbox; task marked done below
+                    pid, result_path = await self._spawn_brain(
+                        task.id, router_output.tool_name, params
+                    )
+                    done_metadata = {"fallback_reason": str(exc), "pid": pid}
+                    # detached subprocess writes result to inbox; task marked done below
 
-            await update_task_status(db, task.id, TaskStatus.done, result=result)
+            await db.update_task_status(
+                task.id, TaskStatus.done,
+                result=result, metadata=done_metadata, result_path=result_path,
+            )
             await self._notify(task.id)
 
         except Exception as exc:
@@ -277,43 +338,69 @@ class Engine:
                     "Task %d failed (attempt %d/%d): %s — retrying in %ds",
                     task.id, next_attempt, MAX_ATTEMPTS, exc, delay,
                 )
-                await reset_for_retry(
-                    db, task.id, next_attempt, retry_after,
+                await db.reset_for_retry(
+                    task.id, next_attempt, retry_after,
                     metadata={"error": str(exc), "attempt": next_attempt},
                 )
+                asyncio.get_running_loop().call_later(delay, self.notify_new_task)
             else:
                 logger.error(
                     "Task %d permanently failed after %d attempts: %s",
                     task.id, MAX_ATTEMPTS, exc,
                 )
-                await update_task_status(
-                    db, task.id, TaskStatus.dead,
+                await db.update_task_status(
+                    task.id, TaskStatus.dead,
                     metadata={"error": str(exc), "attempt": next_attempt},
                 )
             await self._notify(task.id)
 
-    async def _spawn_brain(self, tool_name: str, params: dict) -> None:
-        """Spawn a cloud brain subprocess; uses nohup for harness-restart survival."""
-        brain = self.brain_registry.get(self.settings.default_cloud_brain)
-        cmd_str = brain.get_spawn_cmd(tool_name, params)
+    async def _spawn_brain(
+        self, task_id: int, tool_name: str, params: dict
+    ) -> tuple[int, str | None]:
+        """Spawn a detached cloud brain subprocess; return (PID, result file path).
 
-        # Wrap in nohup so the child outlives a harness restart
-        full_cmd = f"nohup {cmd_str} &"
+        The child runs in its own session (no shell, no nohup) so it outlives a
+        harness restart; its output is appended to ``<log_dir>/brains/<task_id>.log``.
+        """
+        brain = self.brain_registry.get(self.settings.default_cloud_brain)
+        argv = brain.get_spawn_argv(tool_name, params)
 
-        # Safety check before execution
-        result = guardian.check_spawn_cmd(full_cmd)
+        # Safety check before execution — the quoted form is what a shell would have seen
+        cmd_str = shlex.join(argv)
+        result = guardian.check_spawn_cmd(cmd_str)
         if not result.ok:
             raise RuntimeError(f"spawn blocked by guardian: {'; '.join(result.violations)}")
 
-        logger.info("Spawning brain: %s", full_cmd)
+        log_path = Path(self.settings.log_dir) / "brains" / f"{task_id}.log"
+        log_path.parent.mkdir(parents=True, exist_ok=True)
+        logger.info("Spawning brain for task %d: %s (log: %s)", task_id, cmd_str, log_path)
 
+        # The brain writes its result to the inbox when done; we don't wait for it
+        # here, but a watcher task reaps it and tells providers the result is in.
+        # Our copy of the log fd is closed as soon as the child has inherited it.
         async with self.brain_sem:
-            proc = await asyncio.create_subprocess_exec(
-                "bash", "-c", full_cmd,
-                stdout=asyncio.subprocess.DEVNULL,
-                stderr=asyncio.subprocess.DEVNULL,
-            )
-            await proc.wait()
+            with log_path.open("ab") as log_file:
+                proc = await asyncio.create_subprocess_exec(
+                    *argv,
+                    stdin=asyncio.subprocess.DEVNULL,
+                    stdout=log_file,
+                    stderr=asyncio.subprocess.STDOUT,
+                    start_new_session=True,
+                )
+        waiter = asyncio.create_task(self._await_brain_exit(task_id, proc))
+        self._brain_waiters.add(waiter)
+        waiter.add_done_callback(self._brain_waiters.discard)
+        return proc.pid, brain.get_result_path(task_id)
+
+    async def _await_brain_exit(self, task_id: int, proc: asyncio.subprocess.Process) -> None:
+        """Wait for a spawned brain to exit, then fire the result callbacks."""
+        returncode = await proc.wait()
+        logger.info("Brain for task %d exited with code %d", task_id, returncode)
+        for cb in self._result_callbacks:
+            try:
+                await cb(task_id)
+            except Exception:
+                logger.exception("Result callback error for task %d", task_id)
 
 
 def main() -> None:
@@ -322,6 +409,8 @@ def main() -> None:
         asyncio.run(engine.run())
     except KeyboardInterrupt:
         logger.info("Interrupted.")
+    finally:
+        stop_logging()
 
 
 if __name__ == "__main__":
@@ -1,18 +1,29 @@
 import asyncio
-import json
+import hashlib
 import logging
+import os
+import re
+import time
+from collections import OrderedDict
 from pathlib import Path
 
-import ollama
-from pydantic import BaseModel, ValidationError
+from pydantic import BaseModel, Field, ValidationError
 
 logger = logging.getLogger(__name__)
 
+ROUTE_CACHE_SIZE = 256  # max distinct requests remembered by Router.route
+ROUTE_NUM_PREDICT = 256  # a routing decision is one small JSON object; cap generation
+
+# Any line opening or closing a markdown code fence (```json, ```, …), with its newline.
+_FENCE_RE = re.compile(r"^```[^\n]*\n?", re.MULTILINE)
+
 
 class RouterOutput(BaseModel):
     tool_name: str
-    params: dict
-    handoff: bool
+    # Small models sometimes drop these; accepting the defaults is far cheaper
+    # than re-prompting. Without a tool_name the output is still rejected.
+    params: dict = Field(default_factory=dict)
+    handoff: bool = False
 
 
 class Router:
@@ -64,19 +75,73 @@ class Router:
         base_url: str = "http://localhost:11434",
         timeout: float = 300.0,
         max_retries: int = 3,
+        cache_ttl: float = 300.0,
+        keep_alive: str = "10m",
+        num_ctx: int = 2048,
     ) -> None:
         self.model = model
         self.user_prefs_path = Path(user_prefs_path)
         self.llm_semaphore = llm_semaphore
-        self.client = ollama.AsyncClient(host=base_url)
+        import ollama  # deferred: pulls in httpx, which short-lived CLI paths never need
+
+        # One pooled keep-alive HTTP client for the Router's lifetime; the httpx
+        # timeout backs up the asyncio.wait_for below.
+        self.client = ollama.AsyncClient(host=base_url, timeout=timeout)
         self.timeout = timeout
         self.max_retries = max_retries
+        # keep_alive keeps the model resident in Ollama between polls so routes
+        # don't pay a multi-second model reload on the Pi.
+        self.keep_alive = keep_alive
+        self._options = {"num_ctx": num_ctx, "num_predict": ROUTE_NUM_PREDICT}
+        # (st_mtime, st_size, content) of the last prefs read; None until first load.
+        self._prefs_cache: tuple[float, int, str] | None = None
+        # (model, prompt digest, request_text) → (expires_at, output); 0 TTL disables.
+        self.cache_ttl = cache_ttl
+        self._route_cache: OrderedDict[tuple[str, str, str], tuple[float, RouterOutput]] = (
+            OrderedDict()
+        )
+        # (prefs text, tool registry snapshot, rendered parts) — see _render_prompt_parts.
+        self._rendered: tuple[str, tuple, tuple[dict, str, str]] | None = None
 
     def _load_user_prefs(self) -> str:
-        if self.user_prefs_path.exists():
-            return self.user_prefs_path.read_text(encoding="utf-8")
-        logger.warning("user_prefs not found at %s", self.user_prefs_path)
-        return ""
+        """Return the user prefs text, re-reading only when mtime or size changes."""
+        try:
+            st = os.stat(self.user_prefs_path)
+        except FileNotFoundError:
+            if self._prefs_cache != (-1.0, -1, ""):
+                logger.warning("user_prefs not found at %s", self.user_prefs_path)
+                self._prefs_cache = (-1.0, -1, "")
+            return ""
+
+        cached = self._prefs_cache
+        if cached is not None and cached[0] == st.st_mtime and cached[1] == st.st_size:
+            return cached[2]
+
+        content = self.user_prefs_path.read_text(encoding="utf-8")
+        self._prefs_cache = (st.st_mtime, st.st_size, content)
+        return content
+
+    def _render_prompt_parts(self) -> tuple[dict, str, str]:
+        """Return (system message, user-content prefix, prompt digest).
+
+        Rendered once and reused until the prefs file or the tool registry
+        changes, so route() only has to append the request text.
+        """
+        from tools import TOOL_REGISTRY
+
+        prefs = self._load_user_prefs()
+        tools_key = tuple(TOOL_REGISTRY.items())
+        rendered = self._rendered
+        # _load_user_prefs returns the very same str object while the file is unchanged
+        if rendered is not None and rendered[0] is prefs and rendered[1] == tools_key:
+            return rendered[2]
+
+        system_prompt = self._build_system_prompt()
+        prefix = f"{prefs}\n\n---\nUser request: " if prefs else ""
+        digest = hashlib.blake2b(f"{prefs}\0{system_prompt}".encode(), digest_size=8).hexdigest()
+        parts = ({"role": "system", "content": system_prompt}, prefix, digest)
+        self._rendered = (prefs, tools_key, parts)
+        return parts
 
     async def route(self, request_text: str) -> RouterOutput:
         """Route *request_text* to a tool via Ollama; acquires LLM semaphore.
@@ -84,8 +149,19 @@ class Router:
         Retries up to *max_retries* times on timeout or transient errors, with
         exponential backoff between attempts (1 s, 2 s, 4 s, …).
         """
-        user_prefs = self._load_user_prefs()
-        prompt = f"{user_prefs}\n\n---\nUser request: {request_text}" if user_prefs else request_text
+        system_message, user_prefix, digest = self._render_prompt_parts()
+        prompt = f"{user_prefix}{request_text}"
+
+        # Identical requests (retries, replays) within the TTL skip the LLM call.
+        # The digest covers prefs and the tool list, so either changing misses.
+        cache_key: tuple[str, str, str] | None = None
+        if self.cache_ttl > 0:
+            cache_key = (self.model, digest, request_text)
+            hit = self._route_cache.get(cache_key)
+            if hit is not None and hit[0] > time.monotonic():
+                self._route_cache.move_to_end(cache_key)
+                logger.debug("Route cache hit for %r", request_text)
+                return hit[1].model_copy(deep=True)
 
         last_exc: Exception = RuntimeError("No attempts made")
         for attempt in range(1, self.max_retries + 1):
@@ -99,15 +175,20 @@ class Router:
                         self.client.chat(
                             model=self.model,
                             messages=[
-                                {"role": "system", "content": self._build_system_prompt()},
+                                system_message,
                                 {"role": "user", "content": prompt},
                             ],
+                            keep_alive=self.keep_alive,
+                            options=self._options,
                         ),
                         timeout=self.timeout,
                     )
                 raw = response["message"]["content"].strip()
                 logger.debug("Ollama raw response: %s", raw)
-                return self._parse(raw)
+                output = self._parse(raw)
+                if cache_key is not None:
+                    self._remember(cache_key, output)
+                return output
             except asyncio.TimeoutError as exc:
                 logger.warning(
                     "Ollama timed out after %ss (attempt %d/%d)",
@@ -130,16 +211,27 @@ class Router:
             f"Ollama failed after {self.max_retries} attempt(s)"
         ) from last_exc
 
+    def _remember(self, key: tuple[str, str, str], output: RouterOutput) -> None:
+        """Store a private copy of *output* in the LRU route cache."""
+        self._route_cache[key] = (time.monotonic() + self.cache_ttl, output.model_copy(deep=True))
+        self._route_cache.move_to_end(key)
+        while len(self._route_cache) > ROUTE_CACHE_SIZE:
+            self._route_cache.popitem(last=False)
+
     def _parse(self, raw: str) -> RouterOutput:
         """Parse raw LLM output into a RouterOutput, raising ValueError on failure."""
-        # Strip accidental markdown fences
+        # Strip accidental markdown fences. The usual shape — an opening fence
+        # line and a closing fence — is sliced off; anything else (fences mid-text,
+        # several blocks) falls back to the regex.
         if raw.startswith("```"):
-            lines = raw.splitlines()
-            raw = "\n".join(
-                line for line in lines if not line.startswith("```")
-            ).strip()
+            nl = raw.find("\n")
+            body = raw[nl + 1:].rstrip() if nl >= 0 else ""
+            if body.endswith("```"):
+                body = body[:-3]
+            raw = body.strip() if "```" not in body else _FENCE_RE.sub("", raw).strip()
         try:
-            data = json.loads(raw)
-            return RouterOutput(**data)
-        except (json.JSONDecodeError, ValidationError) as exc:
+            # Parsed and validated in one pass by pydantic-core; malformed JSON
+            # surfaces as a ValidationError too.
+            return RouterOutput.model_validate_json(raw)
+        except ValidationError as exc:
             raise ValueError(f"Invalid router output: {raw!r}") from exc
@@ -1,18 +1,32 @@
 """Shared filesystem utilities used across core and tools."""
 import os
 import tempfile
+from collections.abc import Iterator
+from contextlib import contextmanager
 from pathlib import Path
+from typing import TextIO
 
 
-def atomic_write(path: str | Path, content: str) -> None:
-    """Write *content* to *path* atomically using a temp file + os.replace."""
+@contextmanager
+def atomic_writer(path: str | Path) -> Iterator[TextIO]:
+    """Yield a text file that atomically replaces *path* when the block exits cleanly.
+
+    Lets large output be written piece by piece instead of built up in memory
+    first. If the block raises, *path* is left untouched and the temp file removed.
+    """
     path = Path(path)
     path.parent.mkdir(parents=True, exist_ok=True)
     fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp_")
     try:
         with os.fdopen(fd, "w", encoding="utf-8") as f:
-            f.write(content)
+            yield f
         os.replace(tmp_path, path)
-    except Exception:
+    except BaseException:
         os.unlink(tmp_path)
         raise
+
+
+def atomic_write(path: str | Path, content: str) -> None:
+    """Write *content* to *path* atomically using a temp file + os.replace."""
+    with atomic_writer(path) as f:
+        f.write(content)
@@ -2,7 +2,10 @@
 import inspect
 import logging
 import re
+import weakref
+from collections.abc import Callable
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 
 from brains.base import BaseBrain
@@ -11,6 +14,47 @@ from tools.base import BaseTool
 logger = logging.getLogger(__name__)
 
 SYSTEM_PATH_RE = re.compile(r'["\'/](etc|usr|var|sys|proc|root|boot|lib|bin|sbin)/')
+# Same pattern over raw bytes, so sources are scanned without decoding.
+_SYSTEM_PATH_BYTES_RE = re.compile(SYSTEM_PATH_RE.pattern.encode())
+
+
+# fn → (is coroutine function, parameter names). Weak keys so classes replaced by
+# watcher hot-reloads don't stay alive just because they were validated once.
+_SIG_CACHE: "weakref.WeakKeyDictionary[Callable, tuple[bool, tuple[str, ...]]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _param_names(fn: Callable) -> tuple[str, ...]:
+    """Return *fn*'s parameter names, reading ``__code__`` directly when possible.
+
+    Plain functions with only positional-or-keyword parameters skip building a
+    Signature; anything else (builtins, partials, wrapped or *args functions)
+    falls back to inspect.signature.
+    """
+    code = getattr(fn, "__code__", None)
+    if (
+        code is not None
+        and not hasattr(fn, "__wrapped__")
+        and not code.co_kwonlyargcount
+        and not code.co_flags & (inspect.CO_VARARGS | inspect.CO_VARKEYWORDS)
+    ):
+        return code.co_varnames[: code.co_argcount]
+    return tuple(inspect.signature(fn).parameters)
+
+
+def _signature_info(fn: Callable) -> tuple[bool, tuple[str, ...]]:
+    """Return (is async, parameter names) for *fn*, memoized per function object."""
+    try:
+        return _SIG_CACHE[fn]
+    except (KeyError, TypeError):  # TypeError: not weak-referenceable
+        pass
+    info = (inspect.iscoroutinefunction(fn), _param_names(fn))
+    try:
+        _SIG_CACHE[fn] = info
+    except TypeError:
+        pass
+    return info
 
 
 @dataclass
@@ -20,104 +64,109 @@ class ValidationIssue:
     severity: str  # "error" | "warning"
 
 
-def _check_tool(cls: type) -> list[ValidationIssue]:
+@dataclass(frozen=True)
+class _MethodRule:
+    """Expected shape of one method: async-ness and leading parameters after self."""
+
+    attr: str
+    must_be_async: bool
+    params: tuple[str, ...]
+    signature_error: str
+    exact: bool = False  # no parameters allowed beyond *params*
+    label: str = ""  # name used in messages; defaults to attr
+
+    @property
+    def name(self) -> str:
+        return self.label or self.attr
+
+
+_TOOL_RULES = (
+    _MethodRule("run_local", True, ("params",), "run_local must accept (self, params: dict)"),
+    _MethodRule(
+        "get_spawn_cmd", False, ("params",), "get_spawn_cmd must accept (self, params: dict)"
+    ),
+)
+_BRAIN_RULES = (
+    _MethodRule(
+        "get_spawn_argv",
+        False,
+        ("tool_name", "params"),
+        "get_spawn_argv must accept (self, tool_name: str, params: dict)",
+    ),
+)
+_PROVIDER_RULES = (
+    _MethodRule("run", True, (), "run() must have signature (self)", exact=True, label="run()"),
+)
+
+
+def _check_methods(cls: type, rules: tuple[_MethodRule, ...]) -> list[ValidationIssue]:
+    """Check each method named in *rules* exists with the expected shape."""
     issues: list[ValidationIssue] = []
-    name = getattr(cls, "tool_name", None)
     mod = cls.__module__
+    for rule in rules:
+        fn = getattr(cls, rule.attr, None)
+        if fn is None:
+            issues.append(ValidationIssue(mod, f"missing {rule.name} method", "error"))
+            continue
+        is_async, params = _signature_info(fn)
+        if is_async != rule.must_be_async:
+            need = "be async" if rule.must_be_async else "not be async"
+            issues.append(ValidationIssue(mod, f"{rule.name} must {need}", "error"))
+        # params[0] is self
+        rest = params[1:]
+        if (rest if rule.exact else rest[: len(rule.params)]) != rule.params:
+            issues.append(ValidationIssue(mod, rule.signature_error, "error"))
+    return issues
+
 
-    # tool_name must be a non-empty string
+def _check_name(cls: type, attr: str) -> list[ValidationIssue]:
+    """*attr* (tool_name / brain_name) must be a non-empty string."""
+    name = getattr(cls, attr, None)
     if not isinstance(name, str) or not name.strip():
-        issues.append(ValidationIssue(mod, "tool_name is missing or empty", "error"))
-
-    # run_local must be an async method accepting (self, params: dict)
-    run_local = getattr(cls, "run_local", None)
-    if run_local is None:
-        issues.append(ValidationIssue(mod, "missing run_local method", "error"))
-    else:
-        if not inspect.iscoroutinefunction(run_local):
-            issues.append(ValidationIssue(mod, "run_local must be async", "error"))
-        sig = inspect.signature(run_local)
-        params = list(sig.parameters.keys())
-        # params[0] = self, params[1] = params
-        if len(params) < 2 or params[1] != "params":
-            issues.append(
-                ValidationIssue(mod, "run_local must accept (self, params: dict)", "error")
-            )
+        return [ValidationIssue(cls.__module__, f"{attr} is missing or empty", "error")]
+    return []
 
-    # get_spawn_cmd must be a method accepting (self, params: dict) returning str
-    get_spawn_cmd = getattr(cls, "get_spawn_cmd", None)
-    if get_spawn_cmd is None:
-        issues.append(ValidationIssue(mod, "missing get_spawn_cmd method", "error"))
-    else:
-        if inspect.iscoroutinefunction(get_spawn_cmd):
-            issues.append(ValidationIssue(mod, "get_spawn_cmd must not be async", "error"))
-        sig = inspect.signature(get_spawn_cmd)
-        params = list(sig.parameters.keys())
-        if len(params) < 2 or params[1] != "params":
-            issues.append(
-                ValidationIssue(mod, "get_spawn_cmd must accept (self, params: dict)", "error")
-            )
 
-    return issues
+def _check_tool(cls: type) -> list[ValidationIssue]:
+    return _check_name(cls, "tool_name") + _check_methods(cls, _TOOL_RULES)
 
 
 def _check_brain(cls: type) -> list[ValidationIssue]:
-    issues: list[ValidationIssue] = []
-    name = getattr(cls, "brain_name", None)
-    mod = cls.__module__
+    return _check_name(cls, "brain_name") + _check_methods(cls, _BRAIN_RULES)
 
-    if not isinstance(name, str) or not name.strip():
-        issues.append(ValidationIssue(mod, "brain_name is missing or empty", "error"))
-
-    get_spawn_cmd = getattr(cls, "get_spawn_cmd", None)
-    if get_spawn_cmd is None:
-        issues.append(ValidationIssue(mod, "missing get_spawn_cmd method", "error"))
-    else:
-        if inspect.iscoroutinefunction(get_spawn_cmd):
-            issues.append(ValidationIssue(mod, "get_spawn_cmd must not be async", "error"))
-        sig = inspect.signature(get_spawn_cmd)
-        param_names = list(sig.parameters.keys())
-        # Expected: (self, tool_name: str, params: dict)
-        if len(param_names) < 3 or param_names[1] != "tool_name" or param_names[2] != "params":
-            issues.append(
-                ValidationIssue(
-                    mod,
-                    "get_spawn_cmd must accept (self, tool_name: str, params: dict)",
-                    "error",
-                )
-            )
 
-    return issues
+def _check_provider(cls: type) -> list[ValidationIssue]:
+    return _check_methods(cls, _PROVIDER_RULES)
 
 
-def _check_provider(cls: type) -> list[ValidationIssue]:
-    issues: list[ValidationIssue] = []
-    mod = cls.__module__
+@lru_cache(maxsize=128)
+def _module_danger(mod_file: str, mtime_ns: int, size: int) -> bool:
+    """Return True if *mod_file* references a system path.
 
-    run = getattr(cls, "run", None)
-    if run is None:
-        issues.append(ValidationIssue(mod, "missing run() method", "error"))
-    else:
-        if not inspect.iscoroutinefunction(run):
-            issues.append(ValidationIssue(mod, "run() must be async", "error"))
-        sig = inspect.signature(run)
-        param_names = list(sig.parameters.keys())
-        # Only self allowed
-        if len(param_names) != 1:
-            issues.append(
-                ValidationIssue(mod, "run() must have signature (self)", "error")
-            )
+    Keyed on (path, mtime, size) so a module shared by several classes is read
+    once per validation pass, while an edited file is rescanned.
+    """
+    return _SYSTEM_PATH_BYTES_RE.search(Path(mod_file).read_bytes()) is not None
 
-    return issues
 
+def _scan_source_for_danger(
+    cls: type, seen: dict[str, bool] | None = None
+) -> list[ValidationIssue]:
+    """Scan module source for writes to system paths (warning only).
 
-def _scan_source_for_danger(cls: type) -> list[ValidationIssue]:
-    """Scan module source for writes to system paths (warning only)."""
+    *seen* maps module file → result for the current validation pass, so
+    classes sharing a module cost one stat and one lookup between them.
+    """
     issues: list[ValidationIssue] = []
     try:
         mod_file = inspect.getfile(cls)
-        source = Path(mod_file).read_text(encoding="utf-8", errors="replace")
-        if SYSTEM_PATH_RE.search(source):
+        danger = seen.get(mod_file) if seen is not None else None
+        if danger is None:
+            st = Path(mod_file).stat()
+            danger = _module_danger(mod_file, st.st_mtime_ns, st.st_size)
+            if seen is not None:
+                seen[mod_file] = danger
+        if danger:
             issues.append(
                 ValidationIssue(
                     cls.__module__,
@@ -130,6 +179,27 @@ def _scan_source_for_danger(cls: type) -> list[ValidationIssue]:
     return issues
 
 
+def _validate_entries(
+    kind: str,
+    registry: dict[str, type],
+    check: Callable[[type], list[ValidationIssue]],
+    seen: dict[str, bool],
+) -> list[ValidationIssue]:
+    """Check every class in *registry*, popping error entries as they are found."""
+    all_issues: list[ValidationIssue] = []
+    for name, cls in list(registry.items()):
+        issues = check(cls) + _scan_source_for_danger(cls, seen)
+        all_issues.extend(issues)
+        errors = [i.issue_text for i in issues if i.severity == "error"]
+        if errors:
+            registry.pop(name, None)
+            logger.error("Guardian: quarantining %s %r — %s", kind, name, "; ".join(errors))
+        for issue in issues:
+            log = logger.error if issue.severity == "error" else logger.warning
+            log("Guardian [%s:%s] %s: %s", kind, name, issue.severity, issue.issue_text)
+    return all_issues
+
+
 def validate_registries(
     tool_registry: dict,
     brain_registry,  # BrainRegistry — avoid circular import
@@ -144,45 +214,10 @@ def validate_registries(
 
     all_issues: list[ValidationIssue] = []
 
-    # --- Tools ---
-    bad_tool_keys: list[str] = []
-    for tool_name, cls in list(tool_registry.items()):
-        issues = _check_tool(cls) + _scan_source_for_danger(cls)
-        all_issues.extend(issues)
-        has_error = any(i.severity == "error" for i in issues)
-        if has_error:
-            bad_tool_keys.append(tool_name)
-            logger.error(
-                "Guardian: quarantining tool %r — %s",
-                tool_name,
-                "; ".join(i.issue_text for i in issues if i.severity == "error"),
-            )
-        for issue in issues:
-            log = logger.error if issue.severity == "error" else logger.warning
-            log("Guardian [tool:%s] %s: %s", tool_name, issue.severity, issue.issue_text)
-
-    for key in bad_tool_keys:
-        del tool_registry[key]
-
-    # --- Brains ---
-    bad_brain_keys: list[str] = []
-    for brain_name, cls in list(brain_registry._registry.items()):
-        issues = _check_brain(cls) + _scan_source_for_danger(cls)
-        all_issues.extend(issues)
-        has_error = any(i.severity == "error" for i in issues)
-        if has_error:
-            bad_brain_keys.append(brain_name)
-            logger.error(
-                "Guardian: quarantining brain %r — %s",
-                brain_name,
-                "; ".join(i.issue_text for i in issues if i.severity == "error"),
-            )
-        for issue in issues:
-            log = logger.error if issue.severity == "error" else logger.warning
-            log("Guardian [brain:%s] %s: %s", brain_name, issue.severity, issue.issue_text)
-
-    for key in bad_brain_keys:
-        del brain_registry._registry[key]
+    # --- Tools / Brains ---
+    seen: dict[str, bool] = {}  # module file → references a system path
+    all_issues.extend(_validate_entries("tool", tool_registry, _check_tool, seen))
+    all_issues.extend(_validate_entries("brain", brain_registry._registry, _check_brain, seen))
 
     # --- Providers ---
     for cls in (provider_classes or []):
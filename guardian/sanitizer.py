@@ -9,65 +9,41 @@ class SanitizeResult:
     violations: list[str] = field(default_factory=list)
 
 
-# Patterns that are always dangerous regardless of quoting
-_RECURSIVE_SPAWN_RE = re.compile(r"core[./]engine")
-_SYSTEM_PATH_WRITE_RE = re.compile(r"/(etc|usr|sys|proc|root)(?:[/ \t]|$)")
-# Command substitution (outside quoting context doesn't matter — always dangerous)
-_CMD_SUBSTITUTION_RE = re.compile(r"\$\(|`")
-
-
-def _tokenize_unquoted(cmd: str) -> list[str]:
-    """
-    Return only the unquoted portions of *cmd*.
-
-    Tracks single/double quote depth so that operators inside quotes are ignored.
-    Handles basic backslash escaping inside double quotes.
+# Patterns that are always dangerous regardless of quoting, as one alternation so
+# the command is walked once.  Keys are group names → violation message, in the
+# order violations are reported.
+_ALWAYS_BLOCKED: dict[str, str] = {
+    # Command substitution (outside quoting context doesn't matter — always dangerous)
+    "sub": "command substitution ($(...) or backtick) is not allowed",
+    "engine": "recursive engine spawn (core.engine / core/engine) is not allowed",
+    "sys": "write to system path (/etc, /usr, /sys, /proc, /root) is not allowed",
+}
+_ALWAYS_BLOCKED_RE = re.compile(
+    r"(?P<sub>\$\(|`)"
+    r"|(?P<engine>core[./]engine)"
+    r"|(?P<sys>/(?:etc|usr|sys|proc|root)(?:[/ \t]|$))",
+    re.ASCII,
+)
+
+
+# A quoted span: '...' (nothing special inside) or "..." (backslash escapes the
+# next char).  An unterminated quote runs to the end of the command.
+_QUOTED_RE = re.compile(r"""'[^']*'?|"(?:[^"\\]|\\.)*\\?"?""", re.DOTALL)
+
+
+def _strip_quoted(cmd: str) -> str:
+    """Return *cmd* with every quoted span (quotes included) removed.
+
+    Only the unquoted text matters to the operator check, so quoted spans are
+    deleted by one regex substitution in C rather than walked char by char.
     """
-    parts: list[str] = []
-    buf: list[str] = []
-    i = 0
-    in_single = False
-    in_double = False
-
-    while i < len(cmd):
-        ch = cmd[i]
-
-        if in_single:
-            if ch == "'":
-                in_single = False
-            # inside single quotes nothing is special
-            i += 1
-            continue
-
-        if in_double:
-            if ch == "\\" and i + 1 < len(cmd):
-                i += 2  # skip escaped char
-                continue
-            if ch == '"':
-                in_double = False
-            i += 1
-            continue
-
-        # Unquoted context
-        if ch == "'":
-            in_single = True
-            # flush buffer as a separate token for clarity
-            parts.append("".join(buf))
-            buf = []
-        elif ch == '"':
-            in_double = True
-            parts.append("".join(buf))
-            buf = []
-        else:
-            buf.append(ch)
-        i += 1
-
-    parts.append("".join(buf))
-    return parts
+    if "'" not in cmd and '"' not in cmd:
+        return cmd
+    return _QUOTED_RE.sub("", cmd)
 
 
 # Shell operators we block in unquoted context
-_SHELL_OPERATOR_RE = re.compile(r"\||\;|&&|\|\|")
+_SHELL_OPERATOR_RE = re.compile(r"\||\;|&&|\|\|", re.ASCII)
 
 
 def check_spawn_cmd(cmd: str) -> SanitizeResult:
@@ -79,22 +55,13 @@ def check_spawn_cmd(cmd: str) -> SanitizeResult:
     """
     violations: list[str] = []
 
-    # 1. Command substitution — always blocked regardless of quoting
-    if _CMD_SUBSTITUTION_RE.search(cmd):
-        violations.append("command substitution ($(...) or backtick) is not allowed")
-
-    # 2. Recursive engine spawn — always blocked
-    if _RECURSIVE_SPAWN_RE.search(cmd):
-        violations.append("recursive engine spawn (core.engine / core/engine) is not allowed")
-
-    # 3. System path write — always blocked
-    if _SYSTEM_PATH_WRITE_RE.search(cmd):
-        violations.append("write to system path (/etc, /usr, /sys, /proc, /root) is not allowed")
+    # 1–3. Command substitution, recursive engine spawn, system path write —
+    # always blocked regardless of quoting
+    found = {m.lastgroup for m in _ALWAYS_BLOCKED_RE.finditer(cmd)}
+    violations.extend(msg for name, msg in _ALWAYS_BLOCKED.items() if name in found)
 
     # 4. Shell operators in unquoted context
-    unquoted_parts = _tokenize_unquoted(cmd)
-    unquoted_text = "".join(unquoted_parts)
-    if _SHELL_OPERATOR_RE.search(unquoted_text):
+    if _SHELL_OPERATOR_RE.search(_strip_quoted(cmd)):
         violations.append(
             "shell operator (|, ;, &&, ||) in unquoted context is not allowed"
         )
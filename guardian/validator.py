@@ -1,10 +1,14 @@
-"""Message integrity middleware — called in providers before enqueue_task()."""
+"""Message integrity middleware — called in providers before engine.submit_task()."""
 import logging
+import re
 
 logger = logging.getLogger(__name__)
 
 MAX_MESSAGE_LEN = 2000
 
+# A str can only fail to encode as UTF-8 if it holds lone surrogates.
+_SURROGATE_RE = re.compile("[\ud800-\udfff]")
+
 
 def validate_message(text: str) -> tuple[bool, str]:
     """
@@ -16,12 +20,11 @@ def validate_message(text: str) -> tuple[bool, str]:
     if not text:
         return False, "Empty message."
 
-    try:
-        text.encode("utf-8")
-    except UnicodeEncodeError as exc:
-        return False, f"Non-UTF-8 content: {exc}"
-
     if len(text) > MAX_MESSAGE_LEN:
         return False, f"Message too long ({len(text)} chars; limit {MAX_MESSAGE_LEN})."
 
+    # Scan for surrogates in C instead of allocating an encoded copy of the text
+    if (m := _SURROGATE_RE.search(text)) is not None:
+        return False, f"Non-UTF-8 content: lone surrogate {m.group()!r} at position {m.start()}"
+
     return True, ""
@@ -1,40 +1,44 @@
 """Async hot-module watcher — detects new .py files at runtime."""
 import asyncio
 import logging
+import os
 import shutil
+from collections.abc import Iterator
 from pathlib import Path
 
 from guardian import smoke_test
 
+try:  # optional: kernel change notifications (inotify/FSEvents) instead of polling
+    from watchfiles import awatch
+except ImportError:
+    awatch = None
+
 logger = logging.getLogger(__name__)
 
 _WATCH_DIRS = ("tools", "brains", "providers")
+_SKIP = frozenset(("__init__.py", "base.py", "registry.py"))
 _QUARANTINE_DIR = Path("~/.pie-brain/quarantine").expanduser()
 
 
-def _snapshot(base: Path) -> dict[Path, float]:
-    """Return {path: mtime} for all .py files in watched dirs."""
-    result: dict[Path, float] = {}
+def _iter_py(base: Path) -> Iterator[Path]:
+    """Yield every watched .py file under *base*.
+
+    One os.scandir pass per directory with no stat calls (the entry type comes
+    from the directory listing); skipped names never become Path objects.
+    """
     for sub in _WATCH_DIRS:
-        d = base / sub
-        if d.exists():
-            for p in d.glob("*.py"):
-                if p.name not in ("__init__.py", "base.py", "registry.py"):
-                    result[p] = p.stat().st_mtime
-    return result
+        try:
+            with os.scandir(base / sub) as it:
+                for entry in it:
+                    if entry.name.endswith(".py") and entry.name not in _SKIP and entry.is_file():
+                        yield Path(entry.path)
+        except (FileNotFoundError, NotADirectoryError):
+            pass
 
 
-def _new_files(known: dict[Path, float], base: Path) -> list[Path]:
-    """Return paths present on disk but not (yet) in *known*."""
-    new: list[Path] = []
-    for sub in _WATCH_DIRS:
-        d = base / sub
-        if d.exists():
-            for p in d.glob("*.py"):
-                if p.name not in ("__init__.py", "base.py", "registry.py"):
-                    if p not in known:
-                        new.append(p)
-    return new
+def _snapshot(base: Path) -> set[Path]:
+    """Return the set of all .py files currently in watched dirs."""
+    return set(_iter_py(base))
 
 
 def _quarantine(path: Path) -> None:
@@ -48,35 +52,80 @@ def _quarantine(path: Path) -> None:
         logger.error("Guardian: failed to quarantine %s: %s", path, exc)
 
 
-def _hot_register(path: Path, tool_registry: dict, brain_registry) -> None:
-    """Add a successfully smoke-tested module to the appropriate registry."""
-    from tools.base import BaseTool
+def _hot_register(
+    path: Path,
+    tool_registry: dict,
+    brain_registry,
+    tool_cls: type | None = None,
+) -> None:
+    """Add a successfully smoke-tested module to the appropriate registry.
+
+    *tool_cls* is the class the smoke test already loaded and exercised; when
+    given it is registered directly, without importing the module again.
+    """
+    if tool_cls is not None:
+        tool_registry[tool_cls.tool_name] = tool_cls
+        logger.info("Guardian: hot-registered tool %r", tool_cls.tool_name)
+        return
+
+    import importlib
+
     from brains.base import BaseBrain
+    from tools.base import BaseTool
 
     parent = path.parent.name
-    stem = path.stem
-
     if parent == "tools":
-        import importlib
-        try:
-            mod = importlib.import_module(f"tools.{stem}")
-        except ImportError:
-            return
-        for cls in BaseTool.__subclasses__():
-            if cls.__module__ == f"tools.{stem}" and cls.tool_name:
-                tool_registry[cls.tool_name] = cls
-                logger.info("Guardian: hot-registered tool %r", cls.tool_name)
-
+        base, attr, registry = BaseTool, "tool_name", tool_registry
     elif parent == "brains":
-        import importlib
-        try:
-            mod = importlib.import_module(f"brains.{stem}")
-        except ImportError:
-            return
-        for cls in BaseBrain.__subclasses__():
-            if cls.__module__ == f"brains.{stem}" and cls.brain_name:
-                brain_registry._registry[cls.brain_name] = cls
-                logger.info("Guardian: hot-registered brain %r", cls.brain_name)
+        base, attr, registry = BaseBrain, "brain_name", brain_registry._registry
+    else:
+        return
+
+    try:
+        mod = importlib.import_module(f"{parent}.{path.stem}")
+    except ImportError:
+        return
+    for cls in vars(mod).values():
+        if (
+            isinstance(cls, type)
+            and issubclass(cls, base)
+            and cls.__module__ == mod.__name__
+            and getattr(cls, attr)
+        ):
+            registry[getattr(cls, attr)] = cls
+            logger.info("Guardian: hot-registered %s %r", parent[:-1], getattr(cls, attr))
+
+
+async def _process_new(
+    current: set[Path],
+    known: set[Path],
+    tool_registry: dict,
+    brain_registry,
+) -> None:
+    """Smoke-test every path in *current* not yet in *known*, then sync *known*.
+
+    *known* is replaced by *current* rather than grown, so quarantined or
+    deleted modules don't accumulate over the watcher's lifetime.
+    """
+    for path in sorted(current - known):
+        logger.info("Guardian: new module detected: %s", path)
+        result = await smoke_test.run(path)
+        if result.ok:
+            _hot_register(path, tool_registry, brain_registry, result.tool_cls)
+            logger.info("Guardian: hot-registered %s", path.name)
+        else:
+            _quarantine(path)
+            logger.error("Guardian: quarantined %s — %s", path.name, result.reason)
+    # A module that failed but couldn't be moved stays on disk, and so stays
+    # known, so it isn't retried every poll.
+    known.clear()
+    known.update(current)
+
+
+def _is_candidate(_change, path: str) -> bool:
+    """watchfiles filter: only module files we would actually smoke-test."""
+    name = os.path.basename(path)
+    return name.endswith(".py") and name not in _SKIP
 
 
 async def watch_for_new_modules(
@@ -86,7 +135,10 @@ async def watch_for_new_modules(
     poll_interval: int = 60,
 ) -> None:
     """
-    Async task that polls for new .py files in tools/, brains/, providers/.
+    Async task that watches for new .py files in tools/, brains/, providers/.
+
+    With watchfiles installed the task sleeps until the kernel reports a change;
+    otherwise it polls every *poll_interval* seconds.
 
     New files are smoke-tested; passing files are hot-registered, failing files
     are moved to ~/.pie-brain/quarantine/.
@@ -95,17 +147,15 @@ async def watch_for_new_modules(
         base_dir = Path(__file__).parent.parent  # project root
 
     known = _snapshot(base_dir)
-    logger.info("Guardian watcher started (poll_interval=%ds)", poll_interval)
+    watch_dirs = [base_dir / sub for sub in _WATCH_DIRS if (base_dir / sub).is_dir()]
+
+    if awatch is not None and watch_dirs:
+        logger.info("Guardian watcher started (file-change notifications)")
+        async for _changes in awatch(*watch_dirs, watch_filter=_is_candidate, recursive=False):
+            await _process_new(_snapshot(base_dir), known, tool_registry, brain_registry)
+        return
 
+    logger.info("Guardian watcher started (poll_interval=%ds)", poll_interval)
     while True:
         await asyncio.sleep(poll_interval)
-        for path in _new_files(known, base_dir):
-            logger.info("Guardian: new module detected: %s", path)
-            result = await smoke_test.run(path)
-            if result.ok:
-                _hot_register(path, tool_registry, brain_registry)
-                logger.info("Guardian: hot-registered %s", path.name)
-            else:
-                _quarantine(path)
-                logger.error("Guardian: quarantined %s — %s", path.name, result.reason)
-            known[path] = path.stat().st_mtime if path.exists() else 0.0
+        await _process_new(_snapshot(base_dir), known, tool_registry, brain_registry)
@@ -1,18 +1,28 @@
 """Async heartbeat / cron provider."""
 import asyncio
+import heapq
+import itertools
 import logging
-from datetime import datetime, timedelta, timezone
+import time
 
 logger = logging.getLogger(__name__)
 
+_DAY = 24 * 3600
+
 
 def _seconds_until_utc(hour: int, minute: int) -> float:
-    """Return seconds from now until the next HH:MM UTC wall-clock occurrence."""
-    now = datetime.now(tz=timezone.utc)
-    target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
-    if target <= now:
-        target += timedelta(days=1)
-    return (target - now).total_seconds()
+    """Return seconds from now until the next HH:MM UTC wall-clock occurrence.
+
+    POSIX time has exactly 86400 s per UTC day, so this is plain arithmetic on
+    time.time() with no datetime objects. A target of exactly now is tomorrow's.
+    """
+    delay = (hour * 3600 + minute * 60 - time.time()) % _DAY
+    return delay or float(_DAY)
+
+
+# A re-armed job due sooner than this fired a hair early against the wall clock
+# (event-loop and UTC clocks drift apart); its next run is then tomorrow's.
+_MIN_REARM = 60.0
 
 
 class Scheduler:
@@ -21,12 +31,20 @@ class Scheduler:
     Jobs are registered dynamically via add_daily(); the engine starts the
     scheduler and adds jobs in response to provider-submitted 'schedule' tasks.
     No jobs are hardcoded at construction time.
+
+    All jobs share one dispatch loop driven by a min-heap of next-fire times
+    (event-loop clock), so the scheduler costs one task however many jobs exist.
+    Each fire time is derived from the UTC wall clock, so jobs stay on schedule
+    across suspend/resume and clock adjustments.
     """
 
     def __init__(self) -> None:
         self._engine = None  # set by register_engine() before run()
         self._jobs: list[tuple[int, int, str, dict]] = []  # (hour, min, desc, meta)
-        self._job_tasks: list[asyncio.Task] = []
+        # (fire_at, seq, job); seq breaks ties so jobs themselves are never compared
+        self._heap: list[tuple[float, int, tuple[int, int, str, dict]]] = []
+        self._seq = itertools.count()
+        self._wake = asyncio.Event()  # set when the heap head may have changed
         self._running = False
 
     def register_engine(self, engine) -> None:  # noqa: ANN001
@@ -36,47 +54,71 @@ class Scheduler:
     def add_daily(self, utc_time: str, description: str, metadata: dict) -> None:
         """Register a job that fires once a day at *utc_time* (HH:MM UTC).
 
-        Safe to call before or after run() — if already running the job loop
-        is spawned immediately as an asyncio task.
+        Safe to call before or after run() — if already running the job is
+        scheduled immediately and the dispatch loop is woken to account for it.
         """
         hour, minute = (int(x) for x in utc_time.split(":"))
+        # _seconds_until_utc would wrap e.g. 25:99 to 02:39 instead of rejecting it.
+        if not (0 <= hour < 24 and 0 <= minute < 60):
+            raise ValueError(f"Invalid UTC time {utc_time!r}; expected HH:MM")
         entry = (hour, minute, description, metadata)
         self._jobs.append(entry)
         logger.info("Registered daily job at %s UTC: %s", utc_time, description)
         if self._running:
-            t = asyncio.create_task(self._job_loop(*entry))
-            self._job_tasks.append(t)
+            self._schedule(entry)
+            self._wake.set()
+
+    def _schedule(self, entry: tuple[int, int, str, dict]) -> None:
+        """Push *entry*'s first fire time onto the heap."""
+        hour, minute, description, _ = entry
+        initial_delay = _seconds_until_utc(hour, minute)
+        logger.debug(
+            "Scheduler: %r fires in %.0fs (next at %02d:%02d UTC)",
+            description, initial_delay, hour, minute,
+        )
+        fire_at = asyncio.get_running_loop().time() + initial_delay
+        heapq.heappush(self._heap, (fire_at, next(self._seq), entry))
 
     async def run(self) -> None:
         """Start the scheduler. Stays alive indefinitely to accept new jobs."""
         self._running = True
         for entry in self._jobs:
-            t = asyncio.create_task(self._job_loop(*entry))
-            self._job_tasks.append(t)
-        logger.info("Scheduler started with %d pre-registered job(s).", len(self._job_tasks))
-        # Keep-alive loop: engine may add jobs at any time via add_daily()
-        while self._running:
-            await asyncio.sleep(60)
+            self._schedule(entry)
+        logger.info("Scheduler started with %d pre-registered job(s).", len(self._heap))
+        await self._dispatch_loop()
 
     async def stop(self) -> None:
         self._running = False
-        for t in self._job_tasks:
-            t.cancel()
+        self._wake.set()
         logger.info("Scheduler stopped.")
 
-    async def _job_loop(
-        self, hour: int, minute: int, description: str, metadata: dict
-    ) -> None:
-        initial_delay = _seconds_until_utc(hour, minute)
-        logger.debug(
-            "Scheduler: %r fires in %.0fs (next at %02d:%02d UTC)",
-            description, initial_delay, hour, minute,
-        )
-        await asyncio.sleep(initial_delay)
+    async def _dispatch_loop(self) -> None:
+        """Sleep until the earliest job is due (or the heap changes), fire it, re-arm it."""
+        loop = asyncio.get_running_loop()
         while self._running:
+            delay = self._heap[0][0] - loop.time() if self._heap else None
+            if delay is None or delay > 0:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, seq, entry = heapq.heappop(self._heap)
+            description, metadata = entry[2], entry[3]
             logger.info("Scheduler firing: %s", description)
             if self._engine is not None:
-                await self._engine.submit_task(description, metadata=metadata)
+                # One job failing to submit must not end the loop every job shares.
+                try:
+                    await self._engine.submit_task(description, metadata=metadata)
+                except Exception:
+                    logger.exception("Scheduler failed to submit job: %s", description)
             else:
                 logger.error("Scheduler fired but engine is not registered; dropping job: %s", description)
-            await asyncio.sleep(24 * 3600)
+            # Re-armed from the wall clock, not fire_at + 24h: the event-loop clock
+            # stops during suspend and ignores NTP steps, so it drifts from UTC.
+            delay = _seconds_until_utc(entry[0], entry[1])
+            if delay < _MIN_REARM:
+                delay += _DAY
+            heapq.heappush(self._heap, (loop.time() + delay, seq, entry))
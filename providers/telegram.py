@@ -1,9 +1,10 @@
 """Telegram frontend provider."""
 import asyncio
 import logging
+import os
 from pathlib import Path
 
-from telegram import Bot, Update
+from telegram import MessageEntity, Update
 from telegram.ext import Application, CommandHandler, ContextTypes, MessageHandler, filters
 
 import guardian
@@ -13,24 +14,77 @@ from core.db import TaskStatus
 logger = logging.getLogger(__name__)
 
 HELP_TEXT = (
-    "*Pie-Brain* — task routing engine\n\n"
-    "Just send me a message and I'll route it to the right tool\\. "
-    "You'll receive live updates as your task moves through routing → executing → done\\.\n\n"
+    "Pie-Brain — task routing engine\n\n"
+    "Just send me a message and I'll route it to the right tool. "
+    "You'll receive live updates as your task moves through routing → executing → done.\n\n"
     "Commands:\n"
     "/start — welcome message\n"
     "/help — show this message\n"
-    "/status \\[task\\_id\\] — check task status \\(omit id for last 5 tasks\\)\n"
+    "/status [task_id] — check task status (omit id for last 5 tasks)\n"
 )
+# Formatting sent as explicit entities, so the text needs no MarkdownV2 escaping
+# or parsing. Offsets are in UTF-16 code units; the title is plain ASCII.
+_HELP_ENTITIES = (MessageEntity(MessageEntity.BOLD, 0, len("Pie-Brain")),)
+_TEXT_MESSAGES = filters.TEXT & ~filters.COMMAND
+
+
+MAX_RESULT_CHARS = 4000  # Telegram caps messages at 4096 chars
+DELIVERY_CONCURRENCY = 8  # parallel result sends; low enough to respect Telegram rate limits
+LONG_POLL_TIMEOUT = 50  # seconds getUpdates may block server-side (Telegram allows up to 50)
+
+
+def _truncate(text: str) -> str:
+    if len(text) > MAX_RESULT_CHARS:
+        return text[:MAX_RESULT_CHARS] + "\n\n…(truncated)"
+    return text
+
+
+def _read_result_file(path: Path) -> str:
+    """Read just enough of *path* to fill one message, truncated like any result.
+
+    UTF-8 needs at most 4 bytes per char, so this many bytes always covers
+    MAX_RESULT_CHARS + 1 chars — enough to tell whether truncation is needed —
+    without loading multi-MB brain output into memory.
+    """
+    with path.open("rb") as fh:
+        raw = fh.read(4 * (MAX_RESULT_CHARS + 1))
+    return _truncate(raw.decode("utf-8", errors="replace"))
+
+
+def _index_inbox(inbox: Path) -> dict[int, Path]:
+    """Map task id → its newest ``{id}_*.md`` file, from one directory scan.
+
+    Files are only stat'ed when a task has more than one candidate.
+    """
+    index: dict[int, Path] = {}
+    with os.scandir(inbox) as entries:
+        for entry in entries:
+            prefix, sep, _ = entry.name.partition("_")
+            if not sep or not prefix.isdigit() or not entry.name.endswith(".md"):
+                continue
+            path = Path(entry.path)
+            seen = index.get(int(prefix))
+            if seen is None or path.stat().st_mtime > seen.stat().st_mtime:
+                index[int(prefix)] = path
+    return index
 
 
 class TelegramProvider:
     def __init__(self) -> None:
         self.settings = get_settings()
         self._engine = None  # set by register_engine before run() is called
+        self._results_ready = asyncio.Event()  # set when a cloud result may have landed
+        self._delivery_task: asyncio.Task | None = None
+        # Created up front so result lookups never need to check it exists.
+        self._inbox = Path(self.settings.brain_inbox)
+        self._inbox.mkdir(parents=True, exist_ok=True)
+        # task id → inbox result file, rebuilt once per delivery pass (see _deliver_results)
+        self._result_index: dict[int, Path] = {}
         self.app = (
             Application.builder()
             .token(self.settings.telegram_bot_token)
             .post_init(self._on_startup)
+            .post_shutdown(self._on_shutdown)
             .build()
         )
         self._register_handlers()
@@ -44,6 +98,11 @@ class TelegramProvider:
         self._engine = engine
         engine.register_notify_callback(self._on_task_update)
         engine.register_broadcast_callback(self.broadcast)
+        engine.register_result_callback(self._on_result_ready)
+
+    async def _on_result_ready(self, task_id: int) -> None:
+        """Wake the delivery loop: a cloud brain has exited and written its result."""
+        self._results_ready.set()
 
     async def broadcast(self, message: str) -> None:
         """Push an unsolicited message to all allowed user IDs."""
@@ -51,7 +110,7 @@ class TelegramProvider:
         if not recipients:
             logger.warning("broadcast: no telegram_allowed_user_ids configured, skipping")
             return
-        bot = Bot(token=self.settings.telegram_bot_token)
+        bot = self.app.bot  # shares the application's pooled HTTP client
         for uid in recipients:
             try:
                 await bot.send_message(chat_id=uid, text=message)
@@ -63,7 +122,7 @@ class TelegramProvider:
         if task.chat_id is None:
             return  # scheduler task — no user to notify
 
-        bot = Bot(token=self.settings.telegram_bot_token)
+        bot = self.app.bot
         status = task.status
 
         if status == TaskStatus.routing:
@@ -72,18 +131,18 @@ class TelegramProvider:
             tool = task.tool_name or "unknown"
             text = f"Task #{task.id}: executing via {tool}\u2026"
         elif status == TaskStatus.done:
-            # Cloud-brain tasks are spawned via nohup; the subprocess is still
+            # Cloud-brain tasks are spawned detached; the subprocess is still
             # running when we reach this callback.  Skip _send_result (which
             # would race and find no inbox file yet) and instead send a brief
             # acknowledgement *without* calling mark_result_delivered.  The
-            # polling loop in _deliver_results will call _send_result again
-            # every interval until the inbox file appears.
+            # delivery loop in _deliver_results is woken when the brain exits
+            # and calls _send_result again then.
             is_cloud = task.metadata.get("handoff") or (
                 task.tool_name and "\u2192cloud" in task.tool_name
             )
             if is_cloud:
                 logger.info(
-                    "Task #%d (%s): cloud brain running; deferring delivery to polling loop",
+                    "Task #%d (%s): cloud brain running; deferring delivery to delivery loop",
                     task.id, task.tool_name,
                 )
                 try:
@@ -93,10 +152,10 @@ class TelegramProvider:
                     )
                 except Exception:
                     logger.exception("Failed to push cloud-handoff notice for task #%d", task.id)
-                return  # notified stays 0; polling loop delivers the real result
-            # _send_result handles file lookup + mark_notified so the polling
+                return  # notified stays 0; delivery loop sends the real result
+            # _send_result handles file lookup + mark_notified so the delivery
             # fallback won't double-deliver.
-            await self._send_result(bot, task)
+            await self._send_result(task)
             return
         elif status == TaskStatus.failed:
             err = (task.metadata or {}).get("error", "unknown error")
@@ -114,8 +173,25 @@ class TelegramProvider:
 
     async def _on_startup(self, application: Application) -> None:
         """Registered as post_init hook — runs inside run_polling()'s event loop."""
-        asyncio.create_task(self._deliver_results())
-        logger.info("Result-delivery background task started.")
+        self._start_delivery()
+
+    async def _on_shutdown(self, application: Application) -> None:
+        """Registered as post_shutdown hook — stops the delivery loop with the app."""
+        await self._stop_delivery()
+
+    def _start_delivery(self) -> None:
+        """Start the result-delivery loop, keeping a reference so it can't be GC'd."""
+        if self._delivery_task is None or self._delivery_task.done():
+            self._delivery_task = asyncio.create_task(
+                self._deliver_results(), name="telegram-deliver-results"
+            )
+            logger.info("Result-delivery background task started.")
+
+    async def _stop_delivery(self) -> None:
+        task, self._delivery_task = self._delivery_task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
 
     # ------------------------------------------------------------------
     # Handlers
@@ -126,7 +202,7 @@ class TelegramProvider:
         self.app.add_handler(CommandHandler("help", self._cmd_help))
         self.app.add_handler(CommandHandler("status", self._cmd_status))
         self.app.add_handler(
-            MessageHandler(filters.TEXT & ~filters.COMMAND, self._on_message)
+            MessageHandler(_TEXT_MESSAGES, self._on_message)
         )
 
     def _is_authorized(self, update: Update) -> bool:
@@ -143,7 +219,7 @@ class TelegramProvider:
     async def _cmd_help(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         if not self._is_authorized(update) or update.message is None:
             return
-        await update.message.reply_markdown_v2(HELP_TEXT)
+        await update.message.reply_text(HELP_TEXT, entities=_HELP_ENTITIES)
 
     async def _cmd_status(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         if not self._is_authorized(update) or update.message is None:
@@ -168,16 +244,14 @@ class TelegramProvider:
                     f"Request: {task.request_text[:120]}"
                 )
         else:
-            tasks = await self._engine.get_recent_tasks(limit=5)
-            if not tasks:
+            rows = await self._engine.get_recent_task_snippets(limit=5, width=60)
+            if not rows:
                 await update.message.reply_text("No tasks yet.")
                 return
             lines = ["Recent tasks (newest first):"]
-            for t in tasks:
-                snippet = t.request_text[:60]
-                if len(t.request_text) > 60:
-                    snippet += "…"
-                lines.append(f"#{t.id} [{t.status.value}] {snippet}")
+            for task_id, status, text in rows:
+                snippet = text[:60] + ("…" if len(text) > 60 else "")
+                lines.append(f"#{task_id} [{status.value}] {snippet}")
             await update.message.reply_text("\n".join(lines))
 
     async def _on_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -187,7 +261,9 @@ class TelegramProvider:
             await update.message.reply_text("Unauthorized.")
             return
 
-        text = update.message.text or ""
+        text = (update.message.text or "").strip()
+        if not text:
+            return  # nothing to route; skip validation and the DB write
         chat_id = update.effective_chat.id if update.effective_chat else None
         logger.info("Telegram message from user_id=%d: %r", update.effective_user.id, text)
 
@@ -197,6 +273,15 @@ class TelegramProvider:
             await update.message.reply_text(f"Message rejected: {reason}")
             return
 
+        limit = self.settings.telegram_max_pending_tasks
+        if limit and await self._engine.pending_count() >= limit:
+            logger.warning(
+                "Backlog full (%d pending); turning away user_id=%d",
+                limit, update.effective_user.id,
+            )
+            await update.message.reply_text("Busy — too many tasks queued. Try again later.")
+            return
+
         try:
             task_id = await self._engine.submit_task(text, chat_id=chat_id)
             await update.message.reply_text(f"Task #{task_id} queued.")
@@ -209,71 +294,109 @@ class TelegramProvider:
     # ------------------------------------------------------------------
 
     async def _deliver_results(self) -> None:
-        """Fallback polling loop: catches any done tasks missed by push notifications."""
-        bot = Bot(token=self.settings.telegram_bot_token)
+        """Deliver done tasks that push notifications couldn't complete.
+
+        Woken when a cloud brain exits (its inbox file is then ready); the
+        interval is only a safety net, e.g. for brains spawned before a restart.
+        """
         interval = self.settings.telegram_result_poll_interval
+        sem = asyncio.Semaphore(DELIVERY_CONCURRENCY)
         while True:
+            self._results_ready.clear()
             try:
                 tasks = await self._engine.get_deliverable_results()
-                for task in tasks:
-                    await self._send_result(bot, task)
+                if any(not t.result and not t.result_path for t in tasks):
+                    # One scandir for the whole batch instead of a glob per task.
+                    self._result_index = _index_inbox(self._inbox)
+                outcomes = await asyncio.gather(
+                    *(self._send_bounded(sem, t) for t in tasks), return_exceptions=True
+                )
+                sent = [t.id for t, ok in zip(tasks, outcomes) if ok is True]
+                if sent:
+                    await self._engine.mark_results_delivered(sent)
             except Exception:
                 logger.exception("Error in result-delivery loop")
-            await asyncio.sleep(interval)
-
-    async def _send_result(self, bot: Bot, task) -> None:
-        """Send the completed task result to the originating chat.
+            try:
+                await asyncio.wait_for(self._results_ready.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def _find_inbox_result(self, task_id: int) -> Path | None:
+        """Return the newest ``{task_id}_*.md`` in the inbox, or None."""
+        # scandir + a prefix test rather than glob: no fnmatch translation per name.
+        prefix = f"{task_id}_"
+        with os.scandir(self._inbox) as entries:
+            candidates = [
+                Path(e.path) for e in entries
+                if e.name.startswith(prefix) and e.name.endswith(".md")
+            ]
+        if not candidates:
+            return None
+        # Usually exactly one file; only stat when there's a choice to make.
+        if len(candidates) == 1:
+            return candidates[0]
+        return max(candidates, key=lambda p: p.stat().st_mtime)
+
+    async def _send_bounded(self, sem: asyncio.Semaphore, task) -> bool:
+        async with sem:
+            return await self._send_result(task, mark=False)
+
+    async def _send_result(self, task, mark: bool = True) -> bool:
+        """Send the completed task result to the originating chat; True if sent.
+
+        With *mark* the task is marked delivered straight away; the delivery
+        loop passes False and marks its whole batch in one transaction instead.
 
         For cloud-brain tasks the inbox file may not exist yet when this is
-        called from the polling loop.  If no content is found for a cloud task,
+        called from the delivery loop.  If no content is found for a cloud task,
         the method returns without sending or marking notified so the loop
-        retries on the next interval.  For local-tool tasks a bare completion
+        retries the next time it wakes.  For local-tool tasks a bare completion
         notice is sent as a final fallback.
         """
         result_text: str | None = None
 
         if task.result:
-            result_text = task.result
-            if len(result_text) > 4000:
-                result_text = result_text[:4000] + "\n\n…(truncated)"
+            result_text = _truncate(task.result)
             logger.info(
                 "Task #%d: result from task record (%d chars)", task.id, len(result_text)
             )
-        else:
-            inbox = Path(self.settings.brain_inbox)
-            if not inbox.exists():
-                logger.warning(
-                    "Task #%d: brain inbox directory missing: %s", task.id, inbox
-                )
+        elif task.result_path:
+            # The brain told us exactly where it writes; no inbox scan needed.
+            path = Path(task.result_path)
+            try:
+                result_text = await asyncio.to_thread(_read_result_file, path)
+            except FileNotFoundError:
+                logger.debug("Task #%d: %s not written yet", task.id, path)
             else:
-                candidates = sorted(
-                    inbox.glob(f"{task.id}_*.md"),
-                    key=lambda p: p.stat().st_mtime,
-                    reverse=True,
+                logger.info(
+                    "Task #%d: result from %s (%d chars)", task.id, path.name, len(result_text)
                 )
-                if candidates:
-                    content = candidates[0].read_text(encoding="utf-8")
-                    if len(content) > 4000:
-                        content = content[:4000] + "\n\n…(truncated)"
-                    result_text = content
+        else:
+            path = self._result_index.pop(task.id, None) or self._find_inbox_result(task.id)
+            if path is not None:
+                try:
+                    result_text = await asyncio.to_thread(_read_result_file, path)
+                except FileNotFoundError:
+                    logger.debug("Task #%d: %s vanished before it was read", task.id, path)
+                else:
                     logger.info(
                         "Task #%d: result from inbox file %s (%d chars)",
-                        task.id, candidates[0].name, len(result_text),
-                    )
-                else:
-                    logger.debug(
-                        "Task #%d: no %d_*.md files in %s — not ready yet",
-                        task.id, task.id, inbox,
+                        task.id, path.name, len(result_text),
                     )
+            else:
+                logger.debug(
+                    "Task #%d: no %d_*.md files in %s — not ready yet",
+                    task.id, task.id, self._inbox,
+                )
 
         if result_text is None:
             is_cloud = task.metadata.get("handoff") or (
                 task.tool_name and "\u2192cloud" in task.tool_name
             )
             if is_cloud:
-                # Subprocess hasn't written to inbox yet; polling loop will retry.
+                # Subprocess hasn't written to inbox yet; delivery loop will retry.
                 logger.debug("Task #%d: cloud result not ready, will retry", task.id)
-                return
+                return False
             # Local tool produced no structured result — send bare notice.
             tool = task.tool_name or "unknown"
             result_text = f"Task #{task.id} complete (tool: {tool})."
@@ -283,11 +406,14 @@ class TelegramProvider:
             )
 
         try:
-            await bot.send_message(chat_id=task.chat_id, text=result_text)
-            await self._engine.mark_result_delivered(task.id)
+            await self.app.bot.send_message(chat_id=task.chat_id, text=result_text)
+            if mark:
+                await self._engine.mark_result_delivered(task.id)
             logger.info("Delivered result for task #%d to chat_id=%d", task.id, task.chat_id)
         except Exception:
             logger.exception("Failed to deliver result for task #%d", task.id)
+            return False
+        return True
 
     # ------------------------------------------------------------------
     # Entry point
@@ -297,6 +423,21 @@ class TelegramProvider:
         """Start polling and result-delivery loop (runs inside the engine's event loop)."""
         logger.info("Telegram bot starting…")
         async with self.app:
-            await self.app.updater.start_polling()
-            await self.app.start()
-            await asyncio.Event().wait()  # run until cancelled
+            # post_init/post_shutdown only fire under run_polling(), so the
+            # delivery loop is managed here directly.
+            self._start_delivery()
+            try:
+                # Long polls mean ~1 getUpdates round trip per idle minute instead of 6;
+                # commands arrive as "message" updates, so nothing else is needed.
+                await self.app.updater.start_polling(
+                    timeout=LONG_POLL_TIMEOUT,
+                    allowed_updates=[Update.MESSAGE],
+                )
+                await self.app.start()
+                await asyncio.Event().wait()  # run until cancelled
+            finally:
+                await self._stop_delivery()
+                if self.app.updater.running:
+                    await self.app.updater.stop()
+                if self.app.running:
+                    await self.app.stop()
@@ -0,0 +1,28 @@
+"""Write tools/_manifest.py so the tool registry can skip scanning its directory.
+
+Run after the set of tool files changes (setup.sh does so after pruning):
+
+    python scripts/gen_tool_manifest.py
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from tools import scan_tool_modules  # noqa: E402
+
+MANIFEST = Path(__file__).resolve().parent.parent / "tools" / "_manifest.py"
+
+
+def main() -> None:
+    modules = scan_tool_modules()
+    MANIFEST.write_text(
+        "# Generated by scripts/gen_tool_manifest.py — do not edit.\n"
+        f"MODULES = {modules!r}\n",
+        encoding="utf-8",
+    )
+    print(f"Wrote {MANIFEST} ({len(modules)} tools)")
+
+
+if __name__ == "__main__":
+    main()
@@ -432,8 +432,8 @@ if [[ " ${TOOLS[*]} " == *" git_sync "* ]] && ! command -v gh &>/dev/null; then
 fi
 
 # ─── Prune unselected files ───────────────────────────────────────────────────
-# The auto-discovery registries (tools/__init__.py, brains/registry.py) use
-# pkgutil.iter_modules, so absent files are simply never loaded.
+# Absent files are simply never loaded: brains/registry.py imports lazily and
+# tools/__init__.py reads the manifest written below (or scans the directory).
 info "Removing unneeded files for selected configuration…"
 
 # Brains — remove all except the chosen one
@@ -467,6 +467,9 @@ done
 
 success "Repository trimmed to selected modules."
 
+# Record the surviving tool modules so the registry skips a directory scan at startup.
+python3 scripts/gen_tool_manifest.py >/dev/null
+
 # ─── Build extras list & install dependencies ─────────────────────────────────
 echo
 info "Installing Python dependencies…"
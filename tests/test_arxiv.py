@@ -6,7 +6,7 @@ from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
-from tools.arxiv import ArxivTool
+from tools.arxiv import ArxivTool, _checkout_client
 
 
 # ---------------------------------------------------------------------------
@@ -46,11 +46,17 @@ _TO_THREAD = "tools.arxiv.asyncio.to_thread"
 _GET_SETTINGS = "tools.arxiv.get_settings"
 
 
+@pytest.fixture(autouse=True)
+def reset_clients(monkeypatch):
+    monkeypatch.setattr("tools.arxiv._idle_clients", {})
+
+
 @pytest.fixture
 def mock_settings(tmp_path):
     s = MagicMock()
     s.brain_inbox = str(tmp_path)
     s.arxiv_discover_keywords = ["machine learning"]
+    s.arxiv_cache_dir = str(tmp_path / "cache")
     return s
 
 
@@ -90,11 +96,35 @@ async def test_specific_search_by_id_uses_id_list(tmp_path, mock_settings):
     call_args = mock_cls.return_value.results.call_args
     search_obj = call_args[0][0]
     assert search_obj.id_list == ["1706.03762"]
+    assert mock_cls.call_args.kwargs["page_size"] == 1  # one row requested, not a full page
 
     out = tmp_path / "arxiv_search_1706.03762.md"
     assert out.exists()
 
 
+@pytest.mark.parametrize("max_results,page_size", [(10, 10), (1000, 500)])
+async def test_specific_search_sizes_pages_to_max_results(mock_settings, max_results, page_size):
+    with patch("tools.arxiv.arxiv.Client") as mock_cls, \
+         patch(_TO_THREAD, new=AsyncMock(side_effect=fake_to_thread)), \
+         patch(_GET_SETTINGS, return_value=mock_settings):
+        mock_cls.return_value.results.return_value = []
+        await ArxivTool()._specific_search({"query": "rl", "max_results": max_results})
+
+    assert mock_cls.call_args.kwargs["page_size"] == page_size
+
+
+def test_checkout_client_never_lends_one_client_twice_at_once():
+    with patch("tools.arxiv.arxiv.Client") as mock_cls:
+        mock_cls.side_effect = lambda page_size: MagicMock(page_size=page_size)
+        with _checkout_client(50) as first, _checkout_client(50) as second:
+            assert first is not second  # concurrent searches get their own client
+        with _checkout_client(50) as again:
+            assert again in (first, second)  # returned clients are reused
+        with _checkout_client(10) as small:
+            assert small.page_size == 10
+    assert mock_cls.call_count == 3
+
+
 async def test_specific_search_no_params_raises():
     with pytest.raises(ValueError, match="requires 'query' or 'id'"):
         await ArxivTool()._specific_search({})
@@ -131,6 +161,22 @@ async def test_daily_discover_includes_recent_papers(tmp_path, mock_settings):
     assert "Fresh Paper" in content
 
 
+async def test_daily_discover_asks_api_for_last_24h_only(mock_settings):
+    mock_client = MagicMock()
+    mock_client.results.return_value = []
+
+    with patch("tools.arxiv.arxiv.Client", return_value=mock_client), \
+         patch(_TO_THREAD, new=AsyncMock(side_effect=fake_to_thread)), \
+         patch(_GET_SETTINGS, return_value=mock_settings):
+        await ArxivTool()._daily_discover({"keywords": ["graph neural networks"]})
+
+    query = mock_client.results.call_args[0][0].query
+    assert query.startswith("(graph neural networks) AND submittedDate:[")
+    start, end = query.split("[")[1].rstrip("]").split(" TO ")
+    span = datetime.strptime(end, "%Y%m%d%H%M") - datetime.strptime(start, "%Y%m%d%H%M")
+    assert span == timedelta(hours=24)
+
+
 async def test_daily_discover_excludes_old_papers(tmp_path, mock_settings):
     old = make_paper(title="Old Paper", hours_ago=30)
     mock_client = MagicMock()
@@ -165,6 +211,104 @@ async def test_daily_discover_deduplicates(tmp_path, mock_settings):
     assert "Unique Paper" in content
 
 
+async def test_daily_discover_runs_keyword_searches_concurrently(tmp_path, mock_settings):
+    mock_settings.arxiv_discover_keywords = ["a", "b", "c"]
+    active = peak = 0
+
+    async def slow_to_thread(fn, *args):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return fn(*args)
+
+    mock_client = MagicMock()
+    mock_client.results.side_effect = [[make_paper(paper_id=f"2301.0000{i}")] for i in range(3)]
+
+    with patch("tools.arxiv.arxiv.Client", return_value=mock_client), \
+         patch(_TO_THREAD, new=slow_to_thread), \
+         patch(_GET_SETTINGS, return_value=mock_settings):
+        await ArxivTool()._daily_discover({})
+
+    assert peak == 3
+    assert (tmp_path / "arxiv_daily_discover.md").read_text().count("## ") == 3
+
+
+async def test_daily_discover_skips_failed_keyword(tmp_path, mock_settings):
+    mock_settings.arxiv_discover_keywords = ["broken", "fine"]
+    mock_client = MagicMock()
+    mock_client.results.side_effect = [RuntimeError("HTTP 503"), [make_paper(title="Kept")]]
+
+    with patch("tools.arxiv.arxiv.Client", return_value=mock_client), \
+         patch(_TO_THREAD, new=AsyncMock(side_effect=fake_to_thread)), \
+         patch(_GET_SETTINGS, return_value=mock_settings):
+        await ArxivTool()._daily_discover({})
+
+    assert "Kept" in (tmp_path / "arxiv_daily_discover.md").read_text()
+
+
+async def test_daily_discover_raises_when_every_keyword_fails(mock_settings):
+    mock_client = MagicMock()
+    mock_client.results.side_effect = RuntimeError("HTTP 503")
+
+    with patch("tools.arxiv.arxiv.Client", return_value=mock_client), \
+         patch(_TO_THREAD, new=AsyncMock(side_effect=fake_to_thread)), \
+         patch(_GET_SETTINGS, return_value=mock_settings):
+        with pytest.raises(RuntimeError, match="503"):
+            await ArxivTool()._daily_discover({})
+
+
+async def test_daily_discover_reuses_same_day_cache(tmp_path, mock_settings):
+    mock_settings.arxiv_discover_keywords = ["ml", "dl"]
+    mock_client = MagicMock()
+    mock_client.results.return_value = [make_paper(title="Cached Paper", n_authors=4)]
+
+    with patch("tools.arxiv.arxiv.Client", return_value=mock_client), \
+         patch(_TO_THREAD, new=AsyncMock(side_effect=fake_to_thread)), \
+         patch(_GET_SETTINGS, return_value=mock_settings):
+        await ArxivTool()._daily_discover({})
+        first = (tmp_path / "arxiv_daily_discover.md").read_text()
+        tool = ArxivTool()
+        await tool._daily_discover({"keywords": ["dl", "ml"]})  # same set, other order
+
+    assert mock_client.results.call_count == 2  # first run only, one per keyword
+    second = (tmp_path / "arxiv_daily_discover.md").read_text()
+    assert second.split("\n", 3)[3] == first.split("\n", 3)[3]  # past the timestamp
+    assert tool._fetched_papers[0].authors[3].name == "Author 3"
+
+
+async def test_daily_discover_ignores_stale_cache(tmp_path, mock_settings):
+    import os
+
+    mock_client = MagicMock()
+    mock_client.results.return_value = [make_paper(title="Fresh")]
+
+    with patch("tools.arxiv.arxiv.Client", return_value=mock_client), \
+         patch(_TO_THREAD, new=AsyncMock(side_effect=fake_to_thread)), \
+         patch(_GET_SETTINGS, return_value=mock_settings):
+        await ArxivTool()._daily_discover({})
+        (cache_file,) = (tmp_path / "cache").iterdir()
+        os.utime(cache_file, (1, 1))
+        await ArxivTool()._daily_discover({})
+
+    assert mock_client.results.call_count == 2
+    assert cache_file.stat().st_mtime > 1  # rewritten by the second fetch
+
+
+async def test_daily_discover_partial_failure_is_not_cached(tmp_path, mock_settings):
+    mock_settings.arxiv_discover_keywords = ["broken", "fine"]
+    mock_client = MagicMock()
+    mock_client.results.side_effect = [RuntimeError("HTTP 503"), [make_paper()]]
+
+    with patch("tools.arxiv.arxiv.Client", return_value=mock_client), \
+         patch(_TO_THREAD, new=AsyncMock(side_effect=fake_to_thread)), \
+         patch(_GET_SETTINGS, return_value=mock_settings):
+        await ArxivTool()._daily_discover({})
+
+    assert not (tmp_path / "cache").exists()
+
+
 async def test_daily_discover_keywords_from_params(tmp_path, mock_settings):
     """params["keywords"] takes priority over settings."""
     paper = make_paper(title="Custom KW Paper", hours_ago=1)
@@ -180,6 +324,17 @@ async def test_daily_discover_keywords_from_params(tmp_path, mock_settings):
     assert mock_client.results.call_count == 1
 
 
+def test_write_output_leaves_no_file_when_formatting_fails(tmp_path, mock_settings):
+    broken = make_paper()
+    broken.authors = None  # fails mid-stream, after the first paper was written
+
+    with patch(_GET_SETTINGS, return_value=mock_settings):
+        with pytest.raises(TypeError):
+            ArxivTool()._write_output("out.md", "Heading", [make_paper(), broken])
+
+    assert [p.name for p in tmp_path.iterdir()] == []
+
+
 # ---------------------------------------------------------------------------
 # _format_papers
 # ---------------------------------------------------------------------------
@@ -199,6 +354,13 @@ def test_format_papers_truncates_long_summary():
     assert "x" * 401 not in content
 
 
+def test_format_papers_collapses_summary_whitespace():
+    paper = make_paper()
+    paper.summary = "  Line one\r\nline  two\n\tline three\n"
+    content = ArxivTool()._format_papers("Heading", [paper])
+    assert "> Line one line two line three\n" in content
+
+
 def test_format_papers_et_al_for_many_authors():
     paper = make_paper(n_authors=5)
     content = ArxivTool()._format_papers("Heading", [paper])
@@ -211,3 +373,23 @@ def test_format_papers_generated_at_present():
     assert "2026-02-26T12:00 UTC" in content
 
 
+
+
+# ---------------------------------------------------------------------------
+# post_task
+# ---------------------------------------------------------------------------
+
+async def test_post_task_stores_all_papers_in_one_batch():
+    tool = ArxivTool()
+    tool._fetched_papers = [make_paper(title="One", paper_id="2301.00001"),
+                            make_paper(title="Two", paper_id="2301.00002")]
+
+    with patch("tools.memory.MemoryTool._store_many", new=AsyncMock()) as store_many, \
+         patch("tools.memory.MemoryTool._store", new=AsyncMock()) as store:
+        await tool.post_task({}, None)
+
+    store.assert_not_awaited()
+    store_many.assert_awaited_once()
+    items = store_many.await_args.args[0]
+    assert [i["source_path"] for i in items] == ["2301.00001v1", "2301.00002v1"]
+    assert items[0]["content"].startswith("One\n\n")
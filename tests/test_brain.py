@@ -1,7 +1,10 @@
-"""Tests for brains/claude_code.py."""
+"""Tests for brains/claude_code.py and brains/registry.py."""
 import asyncio
 
+import pytest
+
 from brains.claude_code import ClaudeCodeBrain
+from brains.registry import BrainRegistry
 
 
 def make_brain() -> ClaudeCodeBrain:
@@ -9,35 +12,78 @@ def make_brain() -> ClaudeCodeBrain:
 
 
 # ---------------------------------------------------------------------------
-# get_spawn_cmd / _build_prompt
+# get_spawn_argv / _build_prompt
 # ---------------------------------------------------------------------------
 
 def test_prompt_includes_task_id_in_output_path():
     brain = make_brain()
-    cmd = brain.get_spawn_cmd("arxiv", {"query": "RL", "_task_id": 42})
-    assert "42_result.md" in cmd
+    argv = brain.get_spawn_argv("arxiv", {"query": "RL", "_task_id": 42})
+    assert "42_result.md" in argv[-1]
 
 
 def test_prompt_fallback_when_no_task_id():
     brain = make_brain()
-    cmd = brain.get_spawn_cmd("arxiv", {"query": "RL"})
-    assert "unknown_result.md" in cmd
+    argv = brain.get_spawn_argv("arxiv", {"query": "RL"})
+    assert "unknown_result.md" in argv[-1]
+
+
+def test_result_path_matches_path_in_prompt():
+    brain = make_brain()
+    argv = brain.get_spawn_argv("arxiv", {"query": "RL", "_task_id": 42})
+    assert brain.get_result_path(42).endswith("/42_result.md")
+    assert brain.get_result_path(42) in argv[-1]
 
 
 def test_prompt_contains_tool_name_and_params():
     brain = make_brain()
-    cmd = brain.get_spawn_cmd("memory", {"action": "query", "query": "test", "_task_id": 7})
-    assert "memory" in cmd
-    assert "query" in cmd
+    argv = brain.get_spawn_argv("memory", {"action": "query", "query": "test", "_task_id": 7})
+    assert "memory" in argv[-1]
+    assert "query" in argv[-1]
 
 
-def test_get_spawn_cmd_escapes_single_quotes():
-    """Single quotes in the prompt are shell-escaped."""
+def test_get_spawn_argv_passes_prompt_as_single_unescaped_arg():
+    """The prompt is one argv element; quotes reach the CLI verbatim, with no shell escaping."""
     brain = make_brain()
-    # _build_prompt will include params JSON — inject a single quote via tool_name
-    # We verify the escaping mechanism works at the cmd level
-    cmd = brain.get_spawn_cmd("arxiv", {"note": "it's a test", "_task_id": 1})
-    # The shell string should not contain a bare unescaped single quote
-    # inside the outer 'claude --print '...' wrapper
-    inner = cmd[len("claude --print '"):-1]  # strip wrapper quotes
-    assert "'" not in inner or "'\\''" in cmd  # bare ' only allowed if escaped
+    argv = brain.get_spawn_argv("arxiv", {"note": "it's a test", "_task_id": 1})
+    assert argv[:2] == ["claude", "--print"]
+    assert len(argv) == 3
+    assert "it's a test" in argv[2]
+
+
+# ---------------------------------------------------------------------------
+# BrainRegistry
+# ---------------------------------------------------------------------------
+
+def test_registry_resolves_brain_lazily():
+    registry = BrainRegistry()
+    assert "claude_code" in registry.available
+    assert registry._registry == {}
+    brain = registry.get("claude_code")
+    assert isinstance(brain, ClaudeCodeBrain)
+    assert registry._registry == {"claude_code": ClaudeCodeBrain}
+
+
+def test_registry_unknown_brain_raises_key_error():
+    with pytest.raises(KeyError):
+        BrainRegistry().get("nonexistent")
+
+
+def test_registry_failed_import_can_be_retried(monkeypatch):
+    import brains.registry as registry_module
+
+    monkeypatch.setitem(
+        registry_module._BRAIN_CLASSES, "flaky", "brains.claude_code:ClaudeCodeBrain"
+    )
+    registry = BrainRegistry()
+    real_import = registry_module.importlib.import_module
+
+    def failing_import(name):
+        raise ImportError("optional dependency missing")
+
+    monkeypatch.setattr(registry_module.importlib, "import_module", failing_import)
+    with pytest.raises(ImportError):
+        registry.load("flaky")
+    assert "flaky" in registry.available
+
+    monkeypatch.setattr(registry_module.importlib, "import_module", real_import)
+    assert registry.load("flaky") is ClaudeCodeBrain
@@ -1,101 +1,111 @@
 """Tests for core/db.py task CRUD using a temp SQLite database."""
 import pytest
 
-from core.db import (
-    TaskStatus,
-    enqueue_task,
-    get_completed_unnotified,
-    get_pending_tasks,
-    get_recent_tasks,
-    get_task_by_id,
-    init_db,
-    mark_notified,
-    update_task_status,
-)
+from core.db import TaskStatus, encode_metadata, init_db
 
 
 @pytest.fixture
 async def db(tmp_path):
-    db_path = str(tmp_path / "test.db")
-    await init_db(db_path)
-    return db_path
+    database = await init_db(str(tmp_path / "test.db"))
+    yield database
+    await database.close()
 
 
 async def test_enqueue_returns_id(db):
-    task_id = await enqueue_task(db, "Find arxiv papers on LLMs")
+    task_id = await db.enqueue_task("Find arxiv papers on LLMs")
     assert isinstance(task_id, int)
     assert task_id >= 1
 
 
-async def test_get_pending_tasks(db):
-    await enqueue_task(db, "task one")
-    await enqueue_task(db, "task two")
-    tasks = await get_pending_tasks(db)
-    assert len(tasks) == 2
-    assert all(t.status == TaskStatus.pending for t in tasks)
-
-
 async def test_update_task_status(db):
-    task_id = await enqueue_task(db, "a task")
-    await update_task_status(db, task_id, TaskStatus.routing)
-    pending = await get_pending_tasks(db)
-    assert not any(t.id == task_id for t in pending)
+    task_id = await db.enqueue_task("a task")
+    await db.update_task_status(task_id, TaskStatus.routing)
+    assert (await db.get_task_by_id(task_id)).status == TaskStatus.routing
+    assert await db.count_pending() == 0
 
 
 async def test_update_task_with_tool_name(db):
-    task_id = await enqueue_task(db, "search arxiv")
-    await update_task_status(db, task_id, TaskStatus.executing, tool_name="arxiv")
-    pending = await get_pending_tasks(db)
-    assert len(pending) == 0
+    task_id = await db.enqueue_task("search arxiv")
+    await db.update_task_status(task_id, TaskStatus.executing, tool_name="arxiv")
+    assert (await db.get_task_by_id(task_id)).tool_name == "arxiv"
+    assert await db.count_pending() == 0
 
 
 async def test_enqueue_with_metadata(db):
-    task_id = await enqueue_task(db, "daily discover", metadata={"mode": "discover"})
-    tasks = await get_pending_tasks(db)
-    task = next(t for t in tasks if t.id == task_id)
+    task_id = await db.enqueue_task("daily discover", metadata={"mode": "discover"})
+    task = await db.get_task_by_id(task_id)
     assert task.metadata == {"mode": "discover"}
 
 
 async def test_enqueue_stores_chat_id(db):
-    task_id = await enqueue_task(db, "hello", chat_id=42)
-    task = await get_task_by_id(db, task_id)
+    task_id = await db.enqueue_task("hello", chat_id=42)
+    task = await db.get_task_by_id(task_id)
     assert task is not None
     assert task.chat_id == 42
 
 
 async def test_get_task_by_id_missing(db):
-    result = await get_task_by_id(db, 9999)
+    result = await db.get_task_by_id(9999)
     assert result is None
 
 
 async def test_get_completed_unnotified(db):
-    task_id = await enqueue_task(db, "some task", chat_id=99)
-    await update_task_status(db, task_id, TaskStatus.done)
-    tasks = await get_completed_unnotified(db)
+    task_id = await db.enqueue_task("some task", chat_id=99)
+    await db.update_task_status(task_id, TaskStatus.done)
+    tasks = await db.get_completed_unnotified()
     assert any(t.id == task_id for t in tasks)
     assert all(not t.notified for t in tasks)
 
 
 async def test_mark_notified(db):
-    task_id = await enqueue_task(db, "notify me", chat_id=99)
-    await update_task_status(db, task_id, TaskStatus.done)
-    await mark_notified(db, task_id)
-    tasks = await get_completed_unnotified(db)
+    task_id = await db.enqueue_task("notify me", chat_id=99)
+    await db.update_task_status(task_id, TaskStatus.done)
+    await db.mark_notified(task_id)
+    tasks = await db.get_completed_unnotified()
     assert not any(t.id == task_id for t in tasks)
 
 
+async def test_mark_notified_many(db):
+    ids = [await db.enqueue_task(f"task {i}", chat_id=99) for i in range(3)]
+    for task_id in ids:
+        await db.update_task_status(task_id, TaskStatus.done)
+    await db.mark_notified_many(ids[:2])
+    tasks = await db.get_completed_unnotified()
+    assert [t.id for t in tasks] == [ids[2]]
+
+
+async def test_count_pending(db):
+    ids = [await db.enqueue_task(f"task {i}") for i in range(3)]
+    await db.update_task_status(ids[0], TaskStatus.done)
+    assert await db.count_pending() == 2
+
+
+async def test_update_task_status_records_result_path(db):
+    task_id = await db.enqueue_task("cloud task", chat_id=99)
+    await db.update_task_status(task_id, TaskStatus.done, result_path="/inbox/1_result.md")
+    task = await db.get_task_by_id(task_id)
+    assert task.result_path == "/inbox/1_result.md"
+
+
 async def test_completed_without_chat_id_not_returned(db):
-    task_id = await enqueue_task(db, "no chat id task")
-    await update_task_status(db, task_id, TaskStatus.done)
-    tasks = await get_completed_unnotified(db)
+    task_id = await db.enqueue_task("no chat id task")
+    await db.update_task_status(task_id, TaskStatus.done)
+    tasks = await db.get_completed_unnotified()
     assert not any(t.id == task_id for t in tasks)
 
 
+async def test_get_recent_task_snippets_truncates_in_sql(db):
+    id1 = await db.enqueue_task("short")
+    id2 = await db.enqueue_task("y" * 500)
+    rows = await db.get_recent_task_snippets(limit=5, width=60)
+    assert rows == [(id2, TaskStatus.pending, "y" * 61), (id1, TaskStatus.pending, "short")]
+
+
 async def test_get_recent_tasks_returns_newest_first(db):
-    id1 = await enqueue_task(db, "first task")
-    id2 = await enqueue_task(db, "second task")
-    id3 = await enqueue_task(db, "third task")
-    tasks = await get_recent_tasks(db, limit=2)
+    id1 = await db.enqueue_task("first task")
+    id2 = await db.enqueue_task("second task")
+    id3 = await db.enqueue_task("third task")
+    tasks = await db.get_recent_tasks(limit=2)
     assert len(tasks) == 2
     assert tasks[0].id == id3  # newest first
     assert tasks[1].id == id2
@@ -103,39 +113,128 @@ async def test_get_recent_tasks_returns_newest_first(db):
 
 async def test_get_recent_tasks_respects_limit(db):
     for i in range(10):
-        await enqueue_task(db, f"task {i}")
-    tasks = await get_recent_tasks(db, limit=3)
+        await db.enqueue_task(f"task {i}")
+    tasks = await db.get_recent_tasks(limit=3)
     assert len(tasks) == 3
 
 
 async def test_get_recent_tasks_empty_db(db):
-    tasks = await get_recent_tasks(db)
+    tasks = await db.get_recent_tasks()
     assert tasks == []
 
 
 async def test_update_task_with_result(db):
-    task_id = await enqueue_task(db, "answer me")
-    await update_task_status(db, task_id, TaskStatus.done, result="Here is the answer.")
-    task = await get_task_by_id(db, task_id)
+    task_id = await db.enqueue_task("answer me")
+    await db.update_task_status(task_id, TaskStatus.done, result="Here is the answer.")
+    task = await db.get_task_by_id(task_id)
     assert task is not None
     assert task.result == "Here is the answer."
 
 
 async def test_result_defaults_to_none(db):
-    task_id = await enqueue_task(db, "no result task")
-    task = await get_task_by_id(db, task_id)
+    task_id = await db.enqueue_task("no result task")
+    task = await db.get_task_by_id(task_id)
     assert task is not None
     assert task.result is None
 
 
 async def test_failed_status_persists_error_metadata(db):
-    task_id = await enqueue_task(db, "a task that will fail")
-    await update_task_status(
-        db, task_id, TaskStatus.failed,
+    task_id = await db.enqueue_task("a task that will fail")
+    await db.update_task_status(
+        task_id, TaskStatus.failed,
         metadata={"error": "Ollama failed after 3 attempt(s)"},
     )
-    task = await get_task_by_id(db, task_id)
+    task = await db.get_task_by_id(task_id)
     assert task is not None
     assert task.status == TaskStatus.failed
     assert "error" in task.metadata
     assert "Ollama" in task.metadata["error"]
+
+
+async def test_update_task_status_keeps_unset_fields(db):
+    task_id = await db.enqueue_task("keep my tool")
+    await db.update_task_status(
+        task_id, TaskStatus.executing, tool_name="arxiv", metadata={"params": {}}
+    )
+    await db.update_task_status(task_id, TaskStatus.done, result="ok")
+    task = await db.get_task_by_id(task_id)
+    assert task is not None
+    assert task.status == TaskStatus.done
+    assert task.tool_name == "arxiv"
+    assert task.metadata == {"params": {}}
+    assert task.result == "ok"
+
+
+async def test_claim_pending_tasks_marks_routing(db):
+    id1 = await db.enqueue_task("first")
+    id2 = await db.enqueue_task("second")
+    claimed = await db.claim_pending_tasks()
+    assert [t.id for t in claimed] == [id1, id2]
+    assert all(t.status == TaskStatus.routing for t in claimed)
+    assert await db.count_pending() == 0
+
+
+async def test_claim_pending_tasks_never_returns_a_task_twice(db):
+    await db.enqueue_task("only once")
+    assert len(await db.claim_pending_tasks()) == 1
+    assert await db.claim_pending_tasks() == []
+
+
+async def test_claim_pending_tasks_respects_limit(db):
+    for i in range(5):
+        await db.enqueue_task(f"task {i}")
+    assert len(await db.claim_pending_tasks(limit=2)) == 2
+    assert await db.count_pending() == 3
+
+
+async def test_open_applies_wal_pragmas(db):
+    async with db.conn.execute("PRAGMA journal_mode") as cursor:
+        assert (await cursor.fetchone())[0] == "wal"
+    async with db.conn.execute("PRAGMA synchronous") as cursor:
+        assert (await cursor.fetchone())[0] == 1  # NORMAL
+
+
+async def test_pending_scan_uses_status_index(db):
+    async with db.conn.execute(
+        "EXPLAIN QUERY PLAN SELECT id FROM tasks WHERE status = ? ORDER BY id",
+        (TaskStatus.pending.value,),
+    ) as cursor:
+        plan = " ".join(row[3] for row in await cursor.fetchall())
+    assert "idx_tasks_status_id" in plan
+
+
+async def test_undelivered_scan_uses_partial_index(db):
+    async with db.conn.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM tasks"
+        " WHERE status = ? AND chat_id IS NOT NULL AND notified = 0",
+        (TaskStatus.done.value,),
+    ) as cursor:
+        plan = " ".join(row[3] for row in await cursor.fetchall())
+    assert "idx_tasks_undelivered" in plan
+
+
+async def test_update_task_status_accepts_preserialized_metadata(db):
+    task_id = await db.enqueue_task("pre-serialised")
+    await db.update_task_status(
+        task_id, TaskStatus.executing, metadata_json=encode_metadata({"handoff": True})
+    )
+    task = await db.get_task_by_id(task_id)
+    assert task is not None
+    assert task.metadata == {"handoff": True}
+
+
+async def test_writes_are_committed_without_explicit_commit(db):
+    """Autocommit mode: a second connection sees writes immediately."""
+    import sqlite3
+
+    task_id = await db.enqueue_task("visible elsewhere", chat_id=1)
+    await db.update_task_status(task_id, TaskStatus.done)
+    await db.mark_notified_many([task_id])
+    other = sqlite3.connect(db.db_path)
+    try:
+        row = other.execute(
+            "SELECT status, notified FROM tasks WHERE id = ?", (task_id,)
+        ).fetchone()
+    finally:
+        other.close()
+    assert row == ("done", 1)
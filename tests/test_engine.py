@@ -1,5 +1,6 @@
 """Tests for Engine._handle fallback behaviour (routing failure, unknown tool)."""
 import asyncio
+from pathlib import Path
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
@@ -22,8 +23,12 @@ def fake_settings(tmp_path):
     s.ollama_base_url = "http://localhost:11434"
     s.ollama_timeout = 10
     s.ollama_max_retries = 1
+    s.router_cache_ttl = 0
+    s.ollama_keep_alive = "10m"
+    s.ollama_num_ctx = 2048
     s.default_cloud_brain = "claude_code"
     s.guardian_poll_interval = 60
+    s.log_dir = str(tmp_path / "logs")
     s.build_semaphores.return_value = (asyncio.Semaphore(1), asyncio.Semaphore(1))
     return s
 
@@ -39,13 +44,6 @@ def _pending_task(text: str = "hello", task_id: int = 1) -> Task:
     return Task(id=task_id, request_text=text, status=TaskStatus.pending, chat_id=999)
 
 
-# Shared patches applied in every _handle test
-_HANDLE_PATCHES = [
-    patch("core.engine.update_task_status", new_callable=AsyncMock),
-    patch("core.engine.get_task_by_id", new_callable=AsyncMock),
-]
-
-
 # ---------------------------------------------------------------------------
 # Routing failure → query fallback
 # ---------------------------------------------------------------------------
@@ -57,8 +55,8 @@ async def test_handle_routing_failure_falls_back_to_query(engine):
     mock_tool_instance = AsyncMock()
     mock_tool_cls = MagicMock(return_value=mock_tool_instance)
 
-    with patch("core.engine.update_task_status", new_callable=AsyncMock), \
-         patch("core.engine.get_task_by_id", new_callable=AsyncMock), \
+    with patch.object(engine.db, "update_task_status", new_callable=AsyncMock), \
+         patch.object(engine.db, "get_task_by_id", new_callable=AsyncMock), \
          patch.object(engine.router, "route", side_effect=RuntimeError("bad JSON")), \
          patch.dict("tools.TOOL_REGISTRY", {"query": mock_tool_cls}, clear=True):
         await engine._handle(task)
@@ -74,13 +72,13 @@ async def test_handle_routing_failure_does_not_mark_failed(engine):
     task = _pending_task("How's it hanging?")
     captured_statuses: list[TaskStatus] = []
 
-    async def record_status(db, task_id, status, **_kw):
+    async def record_status(task_id, status, **_kw):
         captured_statuses.append(status)
 
     mock_tool_cls = MagicMock(return_value=AsyncMock())
 
-    with patch("core.engine.update_task_status", side_effect=record_status), \
-         patch("core.engine.get_task_by_id", new_callable=AsyncMock), \
+    with patch.object(engine.db, "update_task_status", side_effect=record_status), \
+         patch.object(engine.db, "get_task_by_id", new_callable=AsyncMock), \
          patch.object(engine.router, "route", side_effect=RuntimeError("timeout")), \
          patch.dict("tools.TOOL_REGISTRY", {"query": mock_tool_cls}, clear=True):
         await engine._handle(task)
@@ -101,8 +99,8 @@ async def test_handle_unknown_tool_falls_back_to_query(engine):
     mock_tool_instance = AsyncMock()
     mock_tool_cls = MagicMock(return_value=mock_tool_instance)
 
-    with patch("core.engine.update_task_status", new_callable=AsyncMock), \
-         patch("core.engine.get_task_by_id", new_callable=AsyncMock), \
+    with patch.object(engine.db, "update_task_status", new_callable=AsyncMock), \
+         patch.object(engine.db, "get_task_by_id", new_callable=AsyncMock), \
          patch.object(engine.router, "route", new=AsyncMock(return_value=bad_output)), \
          patch.dict("tools.TOOL_REGISTRY", {"query": mock_tool_cls}, clear=True):
         await engine._handle(task)
@@ -118,13 +116,103 @@ async def test_handle_unknown_tool_no_query_fallback_fails(engine):
     bad_output = RouterOutput(tool_name="ghost_tool", params={}, handoff=False)
     captured_statuses: list[TaskStatus] = []
 
-    async def record_status(db, task_id, status, **_kw):
+    async def record_status(task_id, status, **_kw):
         captured_statuses.append(status)
 
-    with patch("core.engine.update_task_status", side_effect=record_status), \
-         patch("core.engine.get_task_by_id", new_callable=AsyncMock), \
+    with patch.object(engine.db, "update_task_status", side_effect=record_status), \
+         patch.object(engine.db, "get_task_by_id", new_callable=AsyncMock), \
          patch.object(engine.router, "route", new=AsyncMock(return_value=bad_output)), \
          patch.dict("tools.TOOL_REGISTRY", {}, clear=True):
         await engine._handle(task)
 
     assert TaskStatus.failed in captured_statuses
+
+
+# ---------------------------------------------------------------------------
+# Wake-up on enqueue
+# ---------------------------------------------------------------------------
+
+async def test_submit_task_wakes_worker_loop(engine):
+    """Enqueuing a task sets the wake event so run() doesn't wait for the next poll."""
+    assert not engine._wake.is_set()
+    with patch.object(engine.db, "enqueue_task", new=AsyncMock(return_value=7)):
+        task_id = await engine.submit_task("find papers")
+    assert task_id == 7
+    assert engine._wake.is_set()
+
+
+# ---------------------------------------------------------------------------
+# Claimed tasks go straight to executing
+# ---------------------------------------------------------------------------
+
+async def test_handle_claimed_task_writes_executing_then_done(engine):
+    """The claim already set routing; _handle only reports it and writes the rest."""
+    task = _pending_task("find papers").model_copy(update={"status": TaskStatus.routing})
+    output = RouterOutput(tool_name="query", params={"question": "find papers"}, handoff=False)
+    captured_statuses: list[TaskStatus] = []
+    notified: list[TaskStatus] = []
+
+    async def record_status(task_id, status, **_kw):
+        captured_statuses.append(status)
+
+    async def on_update(t):
+        notified.append(t.status)
+
+    engine.register_notify_callback(on_update)
+    mock_tool_cls = MagicMock(return_value=AsyncMock())
+
+    with patch.object(engine.db, "update_task_status", side_effect=record_status), \
+         patch.object(engine.db, "get_task_by_id", new=AsyncMock(return_value=None)), \
+         patch.object(engine.router, "route", new=AsyncMock(return_value=output)), \
+         patch.dict("tools.TOOL_REGISTRY", {"query": mock_tool_cls}, clear=True):
+        await engine._handle(task)
+
+    assert captured_statuses == [TaskStatus.executing, TaskStatus.done]
+    assert notified[0] == TaskStatus.routing
+
+
+# ---------------------------------------------------------------------------
+# Brain spawning
+# ---------------------------------------------------------------------------
+
+async def test_spawn_brain_detaches_and_returns_pid(engine, fake_settings):
+    """Brains are exec'd directly in a new session with output in a per-task log."""
+    brain = MagicMock()
+    brain.get_spawn_argv.return_value = ["claude", "--print", "do it"]
+    brain.get_result_path.return_value = "/inbox/7_result.md"
+    engine.brain_registry.get.return_value = brain
+    proc = MagicMock(pid=4321)
+    proc.wait = AsyncMock(return_value=0)
+
+    with patch("core.engine.asyncio.create_subprocess_exec", new_callable=AsyncMock,
+               return_value=proc) as mock_exec:
+        pid, result_path = await engine._spawn_brain(7, "arxiv", {"_task_id": 7})
+
+    assert pid == 4321
+    assert result_path == "/inbox/7_result.md"
+    assert mock_exec.call_args[0] == ("claude", "--print", "do it")
+    kwargs = mock_exec.call_args[1]
+    assert kwargs["start_new_session"] is True
+    assert kwargs["stderr"] == asyncio.subprocess.STDOUT
+    assert (Path(fake_settings.log_dir) / "brains" / "7.log").exists()
+
+    # The exit waiter is held by the engine until it finishes, then released.
+    (waiter,) = engine._brain_waiters
+    await waiter
+    assert engine._brain_waiters == set()
+
+
+async def test_brain_exit_fires_result_callbacks(engine):
+    """When a spawned brain exits, providers are told its result is ready."""
+    seen: list[int] = []
+
+    async def on_result(task_id):
+        seen.append(task_id)
+
+    engine.register_result_callback(on_result)
+    proc = MagicMock()
+    proc.wait = AsyncMock(return_value=0)
+
+    await engine._await_brain_exit(7, proc)
+
+    assert seen == [7]
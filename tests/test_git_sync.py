@@ -1,18 +1,54 @@
-"""Tests for tools/git_sync.py (subprocess mocked)."""
-import asyncio
-import json
-from unittest.mock import AsyncMock, MagicMock, call, patch
+"""Tests for tools/git_sync.py (subprocesses faked in-process)."""
+import re
+from unittest.mock import patch
 
 import pytest
 
 from tools.git_sync import GitSyncTool
 
+_NO_REPO = re.compile("not a git repo")
+_CONFLICT = re.compile("conflict")
 
-def make_proc(returncode: int = 0, stdout: bytes = b"", stderr: bytes = b"") -> AsyncMock:
-    proc = AsyncMock()
-    proc.returncode = returncode
-    proc.communicate.return_value = (stdout, stderr)
-    proc.wait = AsyncMock(return_value=None)
+
+class FakeGit:
+    """Records every command GitSyncTool runs and answers from canned output."""
+
+    def __init__(self) -> None:
+        self.calls: list[tuple[str, ...]] = []
+        self.cwd: str | None = None  # cwd of the most recent command
+        self.outputs: dict[tuple[str, ...], str] = {}
+        self.error: Exception | None = None
+        self.branch_exists = False
+
+    async def run(self, *cmd: str, cwd: str = ".") -> str:
+        self.calls.append(cmd)
+        self.cwd = cwd
+        if self.error is not None:
+            raise self.error
+        if cmd[:2] == ("git", "switch") and len(cmd) == 3 and not self.branch_exists:
+            raise RuntimeError(f"fatal: invalid reference: {cmd[2]}")
+        return self.outputs.get(cmd, "")
+
+
+@pytest.fixture
+def fake_git(monkeypatch):
+    fake = FakeGit()
+    monkeypatch.setattr(GitSyncTool, "_run", staticmethod(fake.run))
+    return fake
+
+
+class _Proc:
+    """Minimal stand-in for asyncio.subprocess.Process, for testing _run itself."""
+
+    def __init__(self, returncode: int = 0, stdout: bytes = b"", stderr: bytes = b"") -> None:
+        self.returncode = returncode
+        self._out = (stdout, stderr)
+
+    async def communicate(self) -> tuple[bytes, bytes]:
+        return self._out
+
+
+async def _spawn(proc: _Proc):
     return proc
 
 
@@ -21,16 +57,16 @@ def make_proc(returncode: int = 0, stdout: bytes = b"", stderr: bytes = b"") ->
 # ---------------------------------------------------------------------------
 
 async def test_run_returns_stdout_on_success():
-    proc = make_proc(stdout=b"hello\n")
-    with patch("tools.git_sync.asyncio.create_subprocess_exec", return_value=proc):
+    with patch("tools.git_sync.asyncio.create_subprocess_exec",
+               lambda *a, **kw: _spawn(_Proc(stdout=b"hello\n"))):
         result = await GitSyncTool._run("git", "status", cwd=".")
     assert result == "hello"
 
 
 async def test_run_raises_on_nonzero_exit():
-    proc = make_proc(returncode=1, stderr=b"fatal: not a git repo")
-    with patch("tools.git_sync.asyncio.create_subprocess_exec", return_value=proc):
-        with pytest.raises(RuntimeError, match="not a git repo"):
+    with patch("tools.git_sync.asyncio.create_subprocess_exec",
+               lambda *a, **kw: _spawn(_Proc(returncode=1, stderr=b"fatal: not a git repo"))):
+        with pytest.raises(RuntimeError, match=_NO_REPO):
             await GitSyncTool._run("git", "pull", cwd=".")
 
 
@@ -38,103 +74,96 @@ async def test_run_raises_on_nonzero_exit():
 # _pre_task
 # ---------------------------------------------------------------------------
 
-async def test_pre_task_calls_pull_rebase():
-    with patch.object(GitSyncTool, "_run", new=AsyncMock(return_value="")) as mock_run:
-        await GitSyncTool()._pre_task({"repo_path": "/repo"})
-    mock_run.assert_awaited_once_with("git", "pull", "--rebase", cwd="/repo")
+async def test_pre_task_calls_pull_rebase(fake_git):
+    await GitSyncTool()._pre_task({"repo_path": "/repo"})
+    assert fake_git.calls == [("git", "pull", "--rebase")]
+    assert fake_git.cwd == "/repo"
 
 
-async def test_pre_task_propagates_error():
-    with patch.object(GitSyncTool, "_run", new=AsyncMock(side_effect=RuntimeError("conflict"))):
-        with pytest.raises(RuntimeError, match="conflict"):
-            await GitSyncTool()._pre_task({"repo_path": "/repo"})
+async def test_pre_task_propagates_error(fake_git):
+    fake_git.error = RuntimeError("conflict")
+    with pytest.raises(RuntimeError, match=_CONFLICT):
+        await GitSyncTool()._pre_task({"repo_path": "/repo"})
 
 
 # ---------------------------------------------------------------------------
 # _post_task — branch handling
 # ---------------------------------------------------------------------------
 
-async def test_post_task_checks_out_existing_branch():
-    """Uses git checkout (no -b) when branch already exists."""
-    tool = GitSyncTool()
-    mock_run = AsyncMock(return_value="")
+async def test_post_task_checks_out_existing_branch(fake_git):
+    """Switches straight to an existing branch: no probe, no -c."""
+    fake_git.branch_exists = True
+    await GitSyncTool()._post_task({"repo_path": "/repo", "branch": "feat/x", "message": "msg"})
+
+    assert fake_git.calls[0] == ("git", "switch", "feat/x")
+    assert ("git", "switch", "-c", "feat/x") not in set(fake_git.calls)
+
+
+async def test_post_task_creates_new_branch(fake_git):
+    """Creates the branch with switch -c when switching to it fails."""
+    await GitSyncTool()._post_task({"repo_path": "/repo", "branch": "feat/new", "message": "msg"})
 
-    with patch.object(GitSyncTool, "_branch_exists", new=AsyncMock(return_value=True)), \
-         patch.object(GitSyncTool, "_run", mock_run):
-        await tool._post_task({"repo_path": "/repo", "branch": "feat/x", "message": "msg"})
+    assert fake_git.calls[:2] == [
+        ("git", "switch", "feat/new"),
+        ("git", "switch", "-c", "feat/new"),
+    ]
 
-    cmds = [c.args for c in mock_run.call_args_list]
-    assert ("git", "checkout", "feat/x") in cmds
-    assert ("git", "checkout", "-b", "feat/x") not in cmds
 
+async def test_post_task_reports_both_switch_errors(monkeypatch):
+    """When switch and switch -c both fail, the first (real) cause is not lost."""
+    errors = {
+        ("git", "switch", "feat/x"): "error: Your local changes would be overwritten",
+        ("git", "switch", "-c", "feat/x"): "fatal: a branch named 'feat/x' already exists",
+    }
 
-async def test_post_task_creates_new_branch():
-    """Uses git checkout -b when branch does not exist."""
-    tool = GitSyncTool()
-    mock_run = AsyncMock(return_value="")
+    async def run(*cmd: str, cwd: str = ".") -> str:
+        raise RuntimeError(errors[cmd])
 
-    with patch.object(GitSyncTool, "_branch_exists", new=AsyncMock(return_value=False)), \
-         patch.object(GitSyncTool, "_run", mock_run):
-        await tool._post_task({"repo_path": "/repo", "branch": "feat/new", "message": "msg"})
+    monkeypatch.setattr(GitSyncTool, "_run", staticmethod(run))
+    with pytest.raises(RuntimeError) as excinfo:
+        await GitSyncTool()._post_task({"repo_path": "/repo", "branch": "feat/x", "message": "m"})
 
-    cmds = [c.args for c in mock_run.call_args_list]
-    assert ("git", "checkout", "-b", "feat/new") in cmds
+    assert "local changes would be overwritten" in str(excinfo.value)
+    assert "already exists" in str(excinfo.value)
 
 
 # ---------------------------------------------------------------------------
 # _post_task — staging
 # ---------------------------------------------------------------------------
 
-async def test_post_task_stages_specific_paths():
+async def test_post_task_stages_specific_paths(fake_git):
     """Uses git add -- <paths> when params["paths"] is provided."""
-    tool = GitSyncTool()
-    mock_run = AsyncMock(return_value="")
-
-    with patch.object(GitSyncTool, "_branch_exists", new=AsyncMock(return_value=False)), \
-         patch.object(GitSyncTool, "_run", mock_run):
-        await tool._post_task({
-            "repo_path": "/repo",
-            "branch": "b",
-            "message": "m",
-            "paths": ["src/foo.py", "src/bar.py"],
-        })
-
-    cmds = [c.args for c in mock_run.call_args_list]
+    await GitSyncTool()._post_task({
+        "repo_path": "/repo",
+        "branch": "b",
+        "message": "m",
+        "paths": ["src/foo.py", "src/bar.py"],
+    })
+
+    cmds = set(fake_git.calls)
     assert ("git", "add", "--", "src/foo.py", "src/bar.py") in cmds
+    assert ("git", "add", "-A") not in cmds
 
 
-async def test_post_task_stages_all_when_no_paths():
+async def test_post_task_stages_all_when_no_paths(fake_git):
     """Falls back to git add -A when params["paths"] is absent."""
-    tool = GitSyncTool()
-    mock_run = AsyncMock(return_value="")
+    await GitSyncTool()._post_task({"repo_path": "/repo", "branch": "b", "message": "m"})
 
-    with patch.object(GitSyncTool, "_branch_exists", new=AsyncMock(return_value=False)), \
-         patch.object(GitSyncTool, "_run", mock_run):
-        await tool._post_task({"repo_path": "/repo", "branch": "b", "message": "m"})
-
-    cmds = [c.args for c in mock_run.call_args_list]
-    assert ("git", "add", "-A") in cmds
+    assert {("git", "add", "-A"), ("git", "commit", "-m", "m")} <= set(fake_git.calls)
 
 
 # ---------------------------------------------------------------------------
 # _post_task — PR title / body
 # ---------------------------------------------------------------------------
 
-async def test_post_task_uses_custom_pr_title_and_body():
-    tool = GitSyncTool()
-    mock_run = AsyncMock(return_value="")
-
-    with patch.object(GitSyncTool, "_branch_exists", new=AsyncMock(return_value=False)), \
-         patch.object(GitSyncTool, "_run", mock_run):
-        await tool._post_task({
-            "repo_path": "/repo",
-            "branch": "b",
-            "message": "commit msg",
-            "pr_title": "My PR",
-            "pr_body": "Details here.",
-        })
-
-    cmds = [c.args for c in mock_run.call_args_list]
-    assert ("gh", "pr", "create", "--title", "My PR", "--body", "Details here.") in cmds
-
-
+async def test_post_task_uses_custom_pr_title_and_body(fake_git):
+    await GitSyncTool()._post_task({
+        "repo_path": "/repo",
+        "branch": "b",
+        "message": "commit msg",
+        "pr_title": "My PR",
+        "pr_body": "Details here.",
+    })
+
+    pr_cmd = ("gh", "pr", "create", "--title", "My PR", "--body", "Details here.")
+    assert pr_cmd in set(fake_git.calls)
@@ -1,5 +1,7 @@
 """Tests for guardian.interface_check — structural/signature validation."""
 import inspect
+from types import SimpleNamespace
+
 import pytest
 
 from guardian.interface_check import (
@@ -61,22 +63,22 @@ class WrongParamTool(BaseTool):
 class GoodBrain(BaseBrain):
     brain_name = "good_brain"
 
-    def get_spawn_cmd(self, tool_name: str, params: dict) -> str:
-        return "echo brain"
+    def get_spawn_argv(self, tool_name: str, params: dict) -> list[str]:
+        return ["echo", "brain"]
 
 
 class NoNameBrain(BaseBrain):
     brain_name = ""
 
-    def get_spawn_cmd(self, tool_name: str, params: dict) -> str:
-        return "echo"
+    def get_spawn_argv(self, tool_name: str, params: dict) -> list[str]:
+        return ["echo"]
 
 
 class BadParamBrain(BaseBrain):
     brain_name = "bad_brain"
 
-    def get_spawn_cmd(self, wrong: str, also_wrong: dict) -> str:
-        return "echo"
+    def get_spawn_argv(self, wrong: str, also_wrong: dict) -> list[str]:
+        return ["echo"]
 
 
 class GoodProvider:
@@ -127,6 +129,43 @@ def test_tool_wrong_param_name_is_error():
     assert len(errors) >= 1
 
 
+def test_signature_is_computed_once_per_function(monkeypatch):
+    """Revalidating the same class reuses the cached signature introspection."""
+    from guardian import interface_check
+
+    _check_tool(GoodTool)
+    calls = []
+    real_sig, real_iscoro = inspect.signature, inspect.iscoroutinefunction
+    monkeypatch.setattr(inspect, "signature", lambda fn: calls.append(fn) or real_sig(fn))
+    monkeypatch.setattr(
+        inspect, "iscoroutinefunction", lambda fn: calls.append(fn) or real_iscoro(fn)
+    )
+
+    assert _check_tool(GoodTool) == []
+    assert _check_tool(GoodTool) == []
+    assert calls == []
+    assert GoodTool.run_local in interface_check._SIG_CACHE
+
+
+def test_param_names_fast_path_matches_inspect_signature():
+    import functools
+
+    from guardian.interface_check import _param_names
+
+    def plain(self, tool_name, params, extra=1):
+        local = 1  # noqa: F841 — locals must not leak into the parameter list
+
+    def starred(self, *args, key=None, **kwargs):
+        pass
+
+    @functools.wraps(plain)
+    def wrapped(*args, **kwargs):
+        pass
+
+    for fn in (plain, starred, wrapped, functools.partial(plain, None)):
+        assert _param_names(fn) == tuple(inspect.signature(fn).parameters)
+
+
 # ---------------------------------------------------------------------------
 # Brain checks
 # ---------------------------------------------------------------------------
@@ -143,10 +182,10 @@ def test_brain_missing_name_is_error():
     assert any("brain_name" in i.issue_text for i in errors)
 
 
-def test_brain_wrong_get_spawn_cmd_params_is_error():
+def test_brain_wrong_get_spawn_argv_params_is_error():
     issues = _check_brain(BadParamBrain)
     errors = [i for i in issues if i.severity == "error"]
-    assert any("get_spawn_cmd" in i.issue_text for i in errors)
+    assert any("get_spawn_argv" in i.issue_text for i in errors)
 
 
 # ---------------------------------------------------------------------------
@@ -182,16 +221,20 @@ def test_provider_extra_param_is_error():
 # ---------------------------------------------------------------------------
 
 
-def test_danger_zone_warning(tmp_path, monkeypatch):
+@pytest.fixture(scope="module")
+def danger_src(tmp_path_factory):
+    """A fake module source referencing a system path, written once per module."""
+    src = tmp_path_factory.mktemp("danger") / "evil_tool.py"
+    src.write_text('open("/etc/passwd")')
+    return src
+
+
+def test_danger_zone_warning(danger_src, monkeypatch):
     """A source file referencing /etc/passwd should produce a warning."""
     from guardian.interface_check import _scan_source_for_danger
 
-    # Write a fake module file with a system path reference
-    src = tmp_path / "evil_tool.py"
-    src.write_text('open("/etc/passwd")')
-
     # Patch inspect.getfile to return our fake path
-    monkeypatch.setattr(inspect, "getfile", lambda cls: str(src))
+    monkeypatch.setattr(inspect, "getfile", lambda cls: str(danger_src))
 
     issues = _scan_source_for_danger(GoodTool)
     warnings = [i for i in issues if i.severity == "warning"]
@@ -199,38 +242,61 @@ def test_danger_zone_warning(tmp_path, monkeypatch):
     assert "system path" in warnings[0].issue_text
 
 
-# ---------------------------------------------------------------------------
-# validate_registries integration
-# ---------------------------------------------------------------------------
+def test_danger_scan_reads_shared_module_once(tmp_path, monkeypatch):
+    """Classes from the same unchanged module share one source read."""
+    from pathlib import Path
 
+    from guardian.interface_check import _scan_source_for_danger
 
-def test_validate_registries_removes_bad_tool():
-    """Bad tools are quarantined (removed) from the registry in-place."""
+    src = tmp_path / "shared_tools.py"
+    src.write_text('open("/etc/hosts")')
+    monkeypatch.setattr(inspect, "getfile", lambda cls: str(src))
+    reads = []
+    real_read_bytes = Path.read_bytes
+    monkeypatch.setattr(Path, "read_bytes", lambda p: reads.append(p) or real_read_bytes(p))
 
-    class FakeRegistry:
-        _registry: dict = {}
+    assert len(_scan_source_for_danger(GoodTool)) == 1
+    assert len(_scan_source_for_danger(NoNameTool)) == 1
+    assert reads == [src]
 
-    tool_reg = {"good_tool": GoodTool, "bad_run_local": BadRunLocalTool}
-    brain_reg = FakeRegistry()
-    brain_reg._registry = {}
 
-    issues = validate_registries(tool_reg, brain_reg)
+def test_danger_scan_stats_shared_module_once_per_pass(tmp_path, monkeypatch):
+    """Within one pass, classes sharing a module reuse its result without a stat."""
+    from pathlib import Path
+
+    from guardian.interface_check import _scan_source_for_danger
+
+    src = tmp_path / "pair.py"
+    src.write_text('open("/proc/self")')
+    monkeypatch.setattr(inspect, "getfile", lambda cls: str(src))
+    seen: dict = {}
+    assert len(_scan_source_for_danger(GoodTool, seen)) == 1
+    assert seen == {str(src): True}
+
+    monkeypatch.setattr(Path, "stat", lambda p: (_ for _ in ()).throw(AssertionError(p)))
+    assert len(_scan_source_for_danger(NoNameTool, seen)) == 1
 
-    assert "good_tool" in tool_reg, "Good tool must survive"
-    assert "bad_run_local" not in tool_reg, "Bad tool must be quarantined"
-    errors = [i for i in issues if i.severity == "error"]
-    assert len(errors) >= 1
 
+# ---------------------------------------------------------------------------
+# validate_registries integration
+# ---------------------------------------------------------------------------
 
-def test_validate_registries_removes_bad_brain():
-    class FakeRegistry:
-        _registry: dict = {}
 
-    tool_reg = {}
-    brain_reg = FakeRegistry()
-    brain_reg._registry = {"good_brain": GoodBrain, "bad_brain": BadParamBrain}
+@pytest.mark.parametrize(
+    "kind,good,bad,good_name,bad_name",
+    [
+        ("tool", GoodTool, BadRunLocalTool, "good_tool", "bad_run_local"),
+        ("brain", GoodBrain, BadParamBrain, "good_brain", "bad_brain"),
+    ],
+)
+def test_validate_registries_quarantines_bad_entries(kind, good, bad, good_name, bad_name):
+    """Bad tools/brains are quarantined (removed) from their registry in-place."""
+    entries = {good_name: good, bad_name: bad}
+    tool_reg = entries if kind == "tool" else {}
+    brain_reg = SimpleNamespace(_registry=entries if kind == "brain" else {})
 
-    validate_registries(tool_reg, brain_reg)
+    issues = validate_registries(tool_reg, brain_reg)
 
-    assert "good_brain" in brain_reg._registry
-    assert "bad_brain" not in brain_reg._registry
+    assert good_name in entries, f"Good {kind} must survive"
+    assert bad_name not in entries, f"Bad {kind} must be quarantined"
+    assert any(i.severity == "error" for i in issues)
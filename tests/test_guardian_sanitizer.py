@@ -1,6 +1,9 @@
 """Tests for guardian.sanitizer — spawn command safety checks."""
+import re
+
 import pytest
 
+import guardian.sanitizer
 from guardian.sanitizer import check_spawn_cmd, SanitizeResult
 
 
@@ -18,117 +21,66 @@ def _violations(cmd: str) -> list[str]:
 
 
 # ---------------------------------------------------------------------------
-# Shell operator tests
-# ---------------------------------------------------------------------------
-
-
-def test_bare_pipe_is_blocked():
-    result = check_spawn_cmd("cat /tmp/foo | rm -rf /")
-    assert not result.ok
-    assert any("operator" in v for v in result.violations)
-
-
-def test_semicolon_is_blocked():
-    result = check_spawn_cmd("echo hello; rm -rf /")
-    assert not result.ok
-    assert any("operator" in v for v in result.violations)
-
-
-def test_double_ampersand_is_blocked():
-    result = check_spawn_cmd("true && rm -rf /")
-    assert not result.ok
-    assert any("operator" in v for v in result.violations)
-
-
-def test_double_pipe_is_blocked():
-    result = check_spawn_cmd("false || rm -rf /")
-    assert not result.ok
-    assert any("operator" in v for v in result.violations)
-
-
-def test_pipe_inside_single_quotes_is_allowed():
-    # Pipe is safely quoted — should not trigger
-    result = check_spawn_cmd("claude --print 'grep foo | bar'")
-    assert result.ok, f"Unexpected violations: {result.violations}"
-
-
-def test_pipe_inside_double_quotes_is_allowed():
-    result = check_spawn_cmd('claude --print "grep foo | bar"')
-    assert result.ok, f"Unexpected violations: {result.violations}"
-
-
-# ---------------------------------------------------------------------------
-# Command substitution
-# ---------------------------------------------------------------------------
-
-
-def test_dollar_paren_substitution_blocked():
-    result = check_spawn_cmd("echo $(whoami)")
-    assert not result.ok
-    assert any("substitution" in v for v in result.violations)
-
-
-def test_backtick_substitution_blocked():
-    result = check_spawn_cmd("echo `whoami`")
-    assert not result.ok
-    assert any("substitution" in v for v in result.violations)
-
-
-# ---------------------------------------------------------------------------
-# Recursive engine spawn
-# ---------------------------------------------------------------------------
-
-
-def test_core_engine_module_blocked():
-    result = check_spawn_cmd("python -m core.engine")
-    assert not result.ok
-    assert any("recursive" in v for v in result.violations)
-
-
-def test_core_engine_path_blocked():
-    result = check_spawn_cmd("python core/engine.py")
-    assert not result.ok
-    assert any("recursive" in v for v in result.violations)
-
-
-# ---------------------------------------------------------------------------
-# System path write
+# Rule table: (cmd, expected ok, substring of an expected violation)
 # ---------------------------------------------------------------------------
 
 
-def test_etc_path_blocked():
-    result = check_spawn_cmd("claude --print task > /etc/crontab")
-    assert not result.ok
-    assert any("system path" in v for v in result.violations)
-
-
-def test_usr_path_blocked():
-    result = check_spawn_cmd("cp evil /usr/bin/evil")
-    assert not result.ok
-    assert any("system path" in v for v in result.violations)
+@pytest.mark.parametrize(
+    "cmd,ok,needle",
+    [
+        # Shell operators
+        ("cat /tmp/foo | rm -rf /", False, "operator"),
+        ("echo hello; rm -rf /", False, "operator"),
+        ("true && rm -rf /", False, "operator"),
+        ("false || rm -rf /", False, "operator"),
+        ("claude --print 'grep foo | bar'", True, ""),  # safely quoted
+        ('claude --print "grep foo | bar"', True, ""),
+        # Command substitution
+        ("echo $(whoami)", False, "substitution"),
+        ("echo `whoami`", False, "substitution"),
+        # Recursive engine spawn
+        ("python -m core.engine", False, "recursive"),
+        ("python core/engine.py", False, "recursive"),
+        # System path write
+        ("claude --print task > /etc/crontab", False, "system path"),
+        ("cp evil /usr/bin/evil", False, "system path"),
+        # Clean commands
+        ("claude --print 'summarise arxiv 2401.00001'", True, ""),
+        ("nohup claude --dangerously-skip-permissions --print 'do the thing' &", True, ""),
+        ("", True, ""),  # edge case: empty string has no violations
+    ],
+)
+def test_check_spawn_cmd(cmd, ok, needle):
+    result = check_spawn_cmd(cmd)
+    assert result.ok is ok, f"Unexpected violations: {result.violations}"
+    if needle:
+        assert any(needle in v for v in result.violations)
+    else:
+        assert result.violations == []
 
 
-# ---------------------------------------------------------------------------
-# Clean commands
-# ---------------------------------------------------------------------------
+def test_patterns_compiled_once():
+    """Patterns are compiled at import, not rebuilt on every check."""
+    for name in ("_ALWAYS_BLOCKED_RE", "_QUOTED_RE", "_SHELL_OPERATOR_RE"):
+        assert isinstance(getattr(guardian.sanitizer, name), re.Pattern)
 
 
-def test_clean_claude_command_passes():
-    cmd = "claude --print 'summarise arxiv 2401.00001'"
-    result = check_spawn_cmd(cmd)
-    assert result.ok, f"Unexpected violations: {result.violations}"
+def test_each_always_blocked_rule_reported_once_in_order():
+    cmd = "python -m core.engine $(cat /etc/passwd) `id` > /root/x core/engine"
+    assert _violations(cmd) == [
+        "command substitution ($(...) or backtick) is not allowed",
+        "recursive engine spawn (core.engine / core/engine) is not allowed",
+        "write to system path (/etc, /usr, /sys, /proc, /root) is not allowed",
+    ]
 
 
-def test_nohup_wrapped_clean_command_passes():
-    cmd = "nohup claude --dangerously-skip-permissions --print 'do the thing' &"
-    result = check_spawn_cmd(cmd)
-    assert result.ok, f"Unexpected violations: {result.violations}"
+def test_escaped_quote_keeps_double_quoted_span_open():
+    # The \" does not close the string, so the pipe is still quoted.
+    assert _ok('claude --print "say \\"hi | there"')
 
 
-def test_empty_string_passes():
-    # Edge case: empty string has no violations
-    result = check_spawn_cmd("")
-    assert result.ok
+def test_operator_after_unterminated_quote_is_quoted():
+    assert _ok("claude --print 'a | b")
 
 
 def test_sanitize_result_dataclass():
@@ -4,50 +4,42 @@ import pytest
 from guardian.validator import validate_message, MAX_MESSAGE_LEN
 
 
-def test_valid_message_passes():
-    ok, reason = validate_message("Search arxiv for LLM papers")
-    assert ok is True
-    assert reason == ""
-
-
-def test_empty_string_blocked():
-    ok, reason = validate_message("")
-    assert ok is False
-    assert "Empty" in reason
-
-
-def test_exactly_at_limit_passes():
-    text = "a" * MAX_MESSAGE_LEN
-    ok, reason = validate_message(text)
-    assert ok is True
-
-
-def test_one_over_limit_blocked():
-    text = "a" * (MAX_MESSAGE_LEN + 1)
-    ok, reason = validate_message(text)
-    assert ok is False
-    assert "too long" in reason
-    assert str(MAX_MESSAGE_LEN + 1) in reason
-
-
-def test_over_limit_reason_includes_limit():
-    text = "x" * (MAX_MESSAGE_LEN + 500)
-    ok, reason = validate_message(text)
+@pytest.mark.parametrize(
+    "text,ok,needle",
+    [
+        ("Search arxiv for LLM papers", True, ""),
+        ("", False, "Empty"),
+        ("a" * MAX_MESSAGE_LEN, True, ""),  # exactly at the limit
+        ("a" * (MAX_MESSAGE_LEN + 1), False, f"too long ({MAX_MESSAGE_LEN + 1}"),
+        ("x" * (MAX_MESSAGE_LEN + 500), False, f"limit {MAX_MESSAGE_LEN}"),
+        ("Hello, 世界! Привет!", True, ""),
+        # whitespace is not empty — it passes validation (router handles it)
+        ("   ", True, ""),
+        ("line1\nline2\ttabbed", True, ""),
+    ],
+)
+def test_validate_message(text, ok, needle):
+    result, reason = validate_message(text)
+    assert result is ok
+    if needle:
+        assert needle in reason
+    else:
+        assert reason == ""
+
+
+def test_lone_surrogate_blocked():
+    ok, reason = validate_message("abc\ud800def")
     assert ok is False
-    assert str(MAX_MESSAGE_LEN) in reason
-
-
-def test_normal_utf8_passes():
-    ok, reason = validate_message("Hello, 世界! Привет!")
-    assert ok is True
+    assert "Non-UTF-8" in reason
+    assert "position 3" in reason
 
 
-def test_whitespace_only_is_valid():
-    # whitespace is not empty — it passes validation (router handles it)
-    ok, reason = validate_message("   ")
-    assert ok is True
+def test_validator_does_not_encode():
+    """Length and UTF-8 checks work on the str itself; no encoded copy is made."""
 
+    class NoEncode(str):
+        def encode(self, *args, **kwargs):
+            raise AssertionError("validate_message must not encode the text")
 
-def test_newlines_and_tabs_pass():
-    ok, reason = validate_message("line1\nline2\ttabbed")
-    assert ok is True
+    assert validate_message(NoEncode("x" * (MAX_MESSAGE_LEN + 1)))[0] is False
+    assert validate_message(NoEncode("fine"))[0] is True
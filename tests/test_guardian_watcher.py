@@ -2,16 +2,17 @@
 import asyncio
 import shutil
 from pathlib import Path
-from unittest.mock import AsyncMock, MagicMock, patch
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
 
 import pytest
 
-from guardian.watcher import _snapshot, _new_files, _quarantine, watch_for_new_modules
+from guardian.watcher import _snapshot, _quarantine, watch_for_new_modules
 from guardian.smoke_test import SmokeResult
 
 
 # ---------------------------------------------------------------------------
-# _snapshot / _new_files
+# _snapshot
 # ---------------------------------------------------------------------------
 
 
@@ -28,29 +29,113 @@ def test_snapshot_ignores_dunder_files(tmp_path):
     assert "my_tool.py" in paths
 
 
-def test_new_files_detects_additions(tmp_path):
+def test_snapshot_detects_additions(tmp_path):
     (tmp_path / "tools").mkdir()
     existing = tmp_path / "tools" / "existing.py"
     existing.write_text("")
-    known = {existing: existing.stat().st_mtime}
+    known = _snapshot(tmp_path)
+    assert known == {existing}
 
     # Add a new file
     new = tmp_path / "tools" / "new_tool.py"
     new.write_text("")
 
-    found = _new_files(known, tmp_path)
-    assert new in found
-    assert existing not in found
+    found = [p for p in _snapshot(tmp_path) if p not in known]
+    assert found == [new]
 
 
-def test_new_files_ignores_base_and_registry(tmp_path):
+def test_snapshot_ignores_base_registry_and_non_py(tmp_path):
     (tmp_path / "brains").mkdir()
-    for name in ("base.py", "registry.py", "__init__.py"):
+    for name in ("base.py", "registry.py", "__init__.py", "notes.txt"):
         (tmp_path / "brains" / name).write_text("")
+    (tmp_path / "brains" / "pkg.py").mkdir()  # a directory, not a module
 
-    known: dict = {}
-    found = _new_files(known, tmp_path)
-    assert found == []
+    assert _snapshot(tmp_path) == set()
+
+
+def test_snapshot_tolerates_missing_dirs(tmp_path):
+    assert _snapshot(tmp_path) == set()
+
+
+def test_snapshot_makes_no_stat_calls(tmp_path, monkeypatch):
+    """File types come from the directory listing; no per-file stat is issued."""
+    tools = tmp_path / "tools"
+    tools.mkdir()
+    for i in range(500):
+        (tools / f"t{i}.py").write_text("")
+
+    def no_stat(*args, **kwargs):
+        raise AssertionError("unexpected stat call")
+
+    monkeypatch.setattr("guardian.watcher.os.stat", no_stat)
+    monkeypatch.setattr(Path, "stat", no_stat)
+    assert len(_snapshot(tmp_path)) == 500
+
+
+async def test_process_new_forgets_modules_that_left_disk(tmp_path):
+    from guardian.watcher import _process_new
+
+    gone, kept, added = (tmp_path / f"{n}.py" for n in ("gone", "kept", "added"))
+    known = {gone, kept}
+
+    with (
+        patch("guardian.watcher.smoke_test.run", new=AsyncMock(return_value=SmokeResult(ok=True))),
+        patch("guardian.watcher._hot_register") as mock_register,
+    ):
+        await _process_new({kept, added}, known, {}, SimpleNamespace(_registry={}))
+
+    assert [c.args[0] for c in mock_register.call_args_list] == [added]
+    assert known == {kept, added}
+
+
+def test_hot_register_uses_smoke_tested_class_without_import(tmp_path):
+    from guardian.watcher import _hot_register
+
+    tool_cls = SimpleNamespace(tool_name="fresh")
+    tool_registry: dict = {}
+    brain_registry = SimpleNamespace(_registry={})
+
+    with patch("importlib.import_module") as mock_import:
+        _hot_register(tmp_path / "tools" / "fresh.py", tool_registry, brain_registry, tool_cls)
+
+    assert tool_registry == {"fresh": tool_cls}
+    mock_import.assert_not_called()
+
+
+async def test_hot_added_tool_is_still_scanned_for_system_paths(tmp_path, monkeypatch):
+    """The smoke-tested class is traceable to its file, so the danger scan sees it."""
+    import sys
+
+    import tools
+    from guardian import smoke_test
+    from guardian.interface_check import _scan_source_for_danger
+    from guardian.watcher import _hot_register
+
+    tools.get_tool_registry()  # built before the new BaseTool subclass exists
+    path = tmp_path / "tools" / "hot_etc.py"
+    path.parent.mkdir()
+    path.write_text(
+        "from tools.base import BaseTool\n"
+        "TARGET = '/etc/hosts'\n"
+        "class HotEtcTool(BaseTool):\n"
+        "    tool_name = 'hot_etc'\n"
+        "    async def run_local(self, params):\n"
+        "        return None\n"
+    )
+    # Set then delete so teardown removes whatever the smoke test publishes.
+    monkeypatch.setitem(sys.modules, "tools.hot_etc", None)
+    monkeypatch.delitem(sys.modules, "tools.hot_etc")
+    monkeypatch.setattr(tools, "hot_etc", None, raising=False)
+    monkeypatch.delattr(tools, "hot_etc")
+
+    result = await smoke_test.run(path)
+    assert result.ok, result.reason
+    tool_registry: dict = {}
+    _hot_register(path, tool_registry, SimpleNamespace(_registry={}), result.tool_cls)
+
+    issues = _scan_source_for_danger(tool_registry["hot_etc"])
+    assert [i.severity for i in issues] == ["warning"]
+    assert str(path) in issues[0].issue_text
 
 
 # ---------------------------------------------------------------------------
@@ -82,15 +167,17 @@ async def test_watch_registers_passing_module(tmp_path):
     (tmp_path / "tools").mkdir()
 
     tool_registry: dict = {}
-    brain_registry = MagicMock()
-    brain_registry._registry = {}
+    brain_registry = SimpleNamespace(_registry={})
 
     pass_result = SmokeResult(ok=True)
+    done = asyncio.Event()
 
     with (
         patch("guardian.watcher.smoke_test.run", new=AsyncMock(return_value=pass_result)),
-        patch("guardian.watcher._hot_register") as mock_register,
+        patch("guardian.watcher._hot_register", side_effect=lambda *a, **kw: done.set())
+        as mock_register,
         patch("guardian.watcher._quarantine") as mock_quarantine,
+        patch("guardian.watcher.awatch", None),  # exercise the polling fallback
     ):
         task = asyncio.create_task(
             watch_for_new_modules(
@@ -100,21 +187,21 @@ async def test_watch_registers_passing_module(tmp_path):
                 poll_interval=0,  # immediate poll
             )
         )
-        # Yield once so the watcher runs synchronous startup code and takes its
-        # initial snapshot (tools/ is empty at this point).
-        await asyncio.sleep(0)
+        try:
+            # Yield once so the watcher runs synchronous startup code and takes its
+            # initial snapshot (tools/ is empty at this point).
+            await asyncio.sleep(0)
 
-        # Create the file AFTER the snapshot so the watcher treats it as new.
-        new_tool = tmp_path / "tools" / "cool_tool.py"
-        new_tool.write_text("# cool tool")
+            # Create the file AFTER the snapshot so the watcher treats it as new.
+            new_tool = tmp_path / "tools" / "cool_tool.py"
+            new_tool.write_text("# cool tool")
 
-        # Give the watcher time to complete one poll cycle and process the file.
-        await asyncio.sleep(0.05)
-        task.cancel()
-        try:
-            await task
-        except asyncio.CancelledError:
-            pass
+            # Returns as soon as the watcher has processed the file.
+            await asyncio.wait_for(done.wait(), timeout=1.0)
+        finally:
+            # The event loop is shared across tests; never leave the watcher running.
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
 
     mock_register.assert_called_once()
     mock_quarantine.assert_not_called()
@@ -126,15 +213,17 @@ async def test_watch_quarantines_failing_module(tmp_path):
     (tmp_path / "tools").mkdir()
 
     tool_registry: dict = {}
-    brain_registry = MagicMock()
-    brain_registry._registry = {}
+    brain_registry = SimpleNamespace(_registry={})
 
     fail_result = SmokeResult(ok=False, reason="ImportError: broken")
+    done = asyncio.Event()
 
     with (
         patch("guardian.watcher.smoke_test.run", new=AsyncMock(return_value=fail_result)),
         patch("guardian.watcher._hot_register") as mock_register,
-        patch("guardian.watcher._quarantine") as mock_quarantine,
+        patch("guardian.watcher._quarantine", side_effect=lambda *a, **kw: done.set())
+        as mock_quarantine,
+        patch("guardian.watcher.awatch", None),  # exercise the polling fallback
     ):
         task = asyncio.create_task(
             watch_for_new_modules(
@@ -144,18 +233,39 @@ async def test_watch_quarantines_failing_module(tmp_path):
                 poll_interval=0,
             )
         )
-        # Let the watcher take its initial snapshot before we add the bad file.
-        await asyncio.sleep(0)
+        try:
+            # Let the watcher take its initial snapshot before we add the bad file.
+            await asyncio.sleep(0)
 
-        bad_tool = tmp_path / "tools" / "bad_tool.py"
-        bad_tool.write_text("# bad")
+            bad_tool = tmp_path / "tools" / "bad_tool.py"
+            bad_tool.write_text("# bad")
 
-        await asyncio.sleep(0.05)
-        task.cancel()
-        try:
-            await task
-        except asyncio.CancelledError:
-            pass
+            await asyncio.wait_for(done.wait(), timeout=1.0)
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
 
     mock_quarantine.assert_called_once_with(bad_tool)
     mock_register.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_watch_uses_file_notifications_when_available(tmp_path):
+    """With watchfiles available, each change batch triggers one rescan."""
+    (tmp_path / "tools").mkdir()
+    new_tool = tmp_path / "tools" / "cool_tool.py"
+
+    async def fake_awatch(*paths, **kwargs):
+        assert list(paths) == [tmp_path / "tools"]
+        new_tool.write_text("# cool tool")
+        yield {("added", str(new_tool))}
+
+    with (
+        patch("guardian.watcher.smoke_test.run", new=AsyncMock(return_value=SmokeResult(ok=True))),
+        patch("guardian.watcher._hot_register") as mock_register,
+        patch("guardian.watcher.awatch", fake_awatch),
+    ):
+        await watch_for_new_modules({}, SimpleNamespace(_registry={}), base_dir=tmp_path)
+
+    mock_register.assert_called_once()
+    assert mock_register.call_args[0][0] == new_tool
@@ -1,8 +1,12 @@
 """Tests for tools/memory.py (lancedb and sentence-transformers mocked)."""
 import asyncio
+import sys
+import weakref
 from datetime import datetime, timezone
 from unittest.mock import AsyncMock, MagicMock, call, patch
 
+import numpy as np
+import pyarrow as pa
 import pytest
 
 import tools.memory as mem_module
@@ -12,7 +16,7 @@ from tools.memory import MemoryTool, SIMILARITY_THRESHOLD, TABLE_NAME
 # Constants / shared fixtures
 # ---------------------------------------------------------------------------
 
-FAKE_VEC = [0.1, 0.2, 0.3, 0.4]  # 4-dim dummy embedding
+FAKE_VEC = np.array([0.1, 0.2, 0.3, 0.4], dtype=np.float32)  # 4-dim dummy embedding
 FAKE_MODEL = "all-MiniLM-L6-v2"
 FAKE_DB_PATH = "/tmp/fake_memory_db"
 FAKE_INBOX = "/tmp/fake_inbox"
@@ -29,10 +33,23 @@ def mock_settings(tmp_path):
     s = MagicMock()
     s.memory_db_path = str(tmp_path / "memory")
     s.memory_embedding_model = FAKE_MODEL
+    s.memory_nprobes = 20
+    s.memory_embed_concurrency = 1
     s.brain_inbox = str(tmp_path / "inbox")
     return s
 
 
+@pytest.fixture(autouse=True)
+def reset_module_caches(monkeypatch):
+    mem_module._embed_cache.clear()
+    monkeypatch.setattr(mem_module, "_embed_slots", None)
+    monkeypatch.setattr(mem_module, "_db_cache", {})
+    monkeypatch.setattr(mem_module, "_table_cache", {})
+    monkeypatch.setattr(mem_module, "_index_due", weakref.WeakKeyDictionary())
+    yield
+    mem_module._embed_cache.clear()
+
+
 def make_table(rows: list[dict] | None = None) -> MagicMock:
     """Build a mock LanceDB table with controllable rows."""
     table = MagicMock()
@@ -42,17 +59,30 @@ def make_table(rows: list[dict] | None = None) -> MagicMock:
     # Chain: table.search(v).metric("cosine").limit(k).to_list()
     search_chain = MagicMock()
     search_chain.metric.return_value = search_chain
+    search_chain.nprobes.return_value = search_chain
     search_chain.limit.return_value = search_chain
     search_chain.to_list.return_value = rows or []
     table.search.return_value = search_chain
 
+    # Chain: table.search().where(...).select(...).limit(n).to_list() — exact-hash lookup
+    exact_chain = MagicMock()
+    exact_chain.where.return_value = exact_chain
+    exact_chain.select.return_value = exact_chain
+    exact_chain.limit.return_value = exact_chain
+    exact_chain.to_list.return_value = []
+    table.search.side_effect = lambda *args: search_chain if args else exact_chain
+    table.exact_chain = exact_chain
+    table.schema.names = ["vector", "content", "source_path", "created_at", "content_hash"]
+
     return table
 
 
 def make_db(table: MagicMock, table_exists: bool = True) -> MagicMock:
     db = MagicMock()
-    db.list_tables.return_value = [TABLE_NAME] if table_exists else []
-    db.open_table.return_value = table
+    if table_exists:
+        db.open_table.return_value = table
+    else:
+        db.open_table.side_effect = ValueError(f"Table '{TABLE_NAME}' was not found")
     db.create_table.return_value = table
     return db
 
@@ -76,6 +106,7 @@ async def test_store_inserts_when_table_empty(mock_settings):
     assert added["content"] == "Hello world"
     assert added["source_path"] == "test.md"
     assert "created_at" in added
+    assert added["vector"] is FAKE_VEC  # handed to LanceDB as the float32 array, not a list
 
 
 # ---------------------------------------------------------------------------
@@ -100,6 +131,204 @@ async def test_store_skips_duplicate(mock_settings):
         await MemoryTool()._store({"content": "Hello world", "source_path": "new.md"})
 
     table.add.assert_not_called()
+    # Unit vectors: dot product ranks like cosine, minus the per-row norms.
+    table.search.return_value.metric.assert_called_once_with("dot")
+
+
+async def test_store_exact_duplicate_skips_embedding(mock_settings):
+    table = make_table(rows=[])
+    table.exact_chain.to_list.return_value = [{
+        "content_hash": mem_module._content_hash("Hello world"),
+        "source_path": "original.md",
+        "created_at": "2026-01-01T00:00:00+00:00",
+    }]
+    db = make_db(table)
+
+    with patch(_EMBED) as embed, \
+         patch(_LANCEDB + ".connect", return_value=db), \
+         patch(_GET_SETTINGS, return_value=mock_settings):
+        result = MemoryTool()._store_sync("Hello world", "new.md", "/db", FAKE_MODEL, 20)
+
+    embed.assert_not_called()
+    table.add.assert_not_called()
+    assert result["similarity"] == 1.0
+    assert result["existing_source"] == "original.md"
+
+
+async def test_store_records_content_hash(mock_settings):
+    table = make_table(rows=[])
+    db = make_db(table, table_exists=False)
+
+    with patch(_EMBED, return_value=FAKE_VEC), \
+         patch(_LANCEDB + ".connect", return_value=db), \
+         patch(_GET_SETTINGS, return_value=mock_settings):
+        MemoryTool()._store_sync("Hello world", "new.md", "/db", FAKE_MODEL, 20)
+
+    added = table.add.call_args[0][0][0]
+    assert added["content_hash"] == mem_module._content_hash("Hello world")
+
+
+def test_open_table_adds_missing_hash_column():
+    table = make_table()
+    table.schema.names = ["vector", "content", "source_path", "created_at"]
+    db = make_db(table)
+
+    with patch(_LANCEDB + ".connect", return_value=db):
+        assert mem_module._open_table("/db") is table
+        mem_module._open_table("/db")
+
+    table.add_columns.assert_called_once_with({"content_hash": "CAST(NULL AS STRING)"})
+
+
+def test_embed_returns_unit_float32_array():
+    encoder = MagicMock()
+    encoder.encode.return_value = np.array([0.6, 0.8], dtype=np.float64)
+    with patch("tools.memory._get_encoder", return_value=encoder):
+        vec = mem_module._embed("hello", FAKE_MODEL)
+
+    assert vec.dtype == np.float32
+    assert encoder.encode.call_args.kwargs["normalize_embeddings"] is True
+
+
+@pytest.mark.parametrize("backend,kwargs", [("torch", {}), ("onnx", {"backend": "onnx"})])
+def test_get_encoder_passes_configured_backend(monkeypatch, mock_settings, backend, kwargs):
+    import types
+
+    st = types.SimpleNamespace(SentenceTransformer=MagicMock())
+    monkeypatch.setitem(sys.modules, "sentence_transformers", st)
+    monkeypatch.setattr(mem_module, "_encoder", None)
+    mock_settings.memory_embedding_backend = backend
+    with patch(_GET_SETTINGS, return_value=mock_settings):
+        enc = mem_module._get_encoder(FAKE_MODEL)
+        assert mem_module._get_encoder(FAKE_MODEL) is enc  # loaded once
+
+    st.SentenceTransformer.assert_called_once_with(FAKE_MODEL, **kwargs)
+
+
+async def test_preload_encoder_loads_configured_model(mock_settings):
+    with patch(_GET_SETTINGS, return_value=mock_settings), \
+            patch("tools.memory._get_encoder") as get_encoder:
+        await mem_module.preload_encoder()
+    get_encoder.assert_called_once_with(mock_settings.memory_embedding_model)
+
+
+async def test_preload_encoder_failure_is_not_raised(mock_settings):
+    with patch(_GET_SETTINGS, return_value=mock_settings), \
+            patch("tools.memory._get_encoder", side_effect=ImportError("no sentence_transformers")):
+        await mem_module.preload_encoder()  # logged; the first real store reports it
+
+
+def test_embed_caches_repeated_text():
+    encoder = MagicMock()
+    encoder.encode.side_effect = lambda text, **kw: np.array([0.6, 0.8])
+    with patch("tools.memory._get_encoder", return_value=encoder):
+        first = mem_module._embed("same note", FAKE_MODEL)
+        second = mem_module._embed("same note", FAKE_MODEL)
+        mem_module._embed("same note", "other-model")
+
+    assert first is second
+    assert not second.flags.writeable
+    assert encoder.encode.call_count == 2  # once per (model, text)
+
+
+def test_embed_cache_evicts_least_recently_used(monkeypatch):
+    monkeypatch.setattr(mem_module, "EMBED_CACHE_SIZE", 2)
+    encoder = MagicMock()
+    encoder.encode.side_effect = lambda text, **kw: np.array([1.0, 0.0])
+    with patch("tools.memory._get_encoder", return_value=encoder):
+        for text in ("a", "b", "a", "c"):  # "b" is least recently used when "c" lands
+            mem_module._embed(text, FAKE_MODEL)
+        mem_module._embed("a", FAKE_MODEL)
+        assert encoder.encode.call_count == 3
+        mem_module._embed("b", FAKE_MODEL)
+        assert encoder.encode.call_count == 4
+
+
+async def test_concurrent_stores_share_bounded_embed_slots(mock_settings):
+    import threading
+    import time
+
+    mock_settings.memory_embed_concurrency = 2
+    lock = threading.Lock()
+    active = peak = 0
+
+    def slow_embed(text, model_name):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.02)
+        with lock:
+            active -= 1
+        return FAKE_VEC
+
+    db = make_db(make_table(rows=[]))
+    with patch(_EMBED, side_effect=slow_embed), \
+         patch(_LANCEDB + ".connect", return_value=db), \
+         patch(_GET_SETTINGS, return_value=mock_settings):
+        tool = MemoryTool()
+        await asyncio.gather(*(
+            tool._store({"content": f"note {i}", "source_path": "x.md"}) for i in range(10)
+        ))
+
+    assert peak == 2
+
+
+async def test_repeated_calls_reuse_connection_and_table(mock_settings, tmp_path):
+    mock_settings.brain_inbox = str(tmp_path)
+    table = make_table(rows=[{"content": "x", "source_path": "x.md",
+                              "created_at": "2026-01-01T00:00:00+00:00", "_distance": 0.5}])
+    db = make_db(table)
+
+    with patch(_EMBED, return_value=FAKE_VEC), \
+         patch(_LANCEDB + ".connect", return_value=db) as connect, \
+         patch(_GET_SETTINGS, return_value=mock_settings), \
+         patch(_TO_THREAD, new=AsyncMock(side_effect=lambda fn, *a: fn(*a))):
+        await MemoryTool()._store({"content": "one", "source_path": "1.md"})
+        await MemoryTool()._store({"content": "two", "source_path": "2.md"})
+        await MemoryTool()._query({"query": "anything"})
+
+    connect.assert_called_once()
+    db.open_table.assert_called_once_with(TABLE_NAME)
+
+
+def test_fresh_process_finds_table_on_disk(mock_settings, tmp_path, monkeypatch):
+    db_path = str(tmp_path / "memory")
+    hit_vec = FAKE_VEC / np.linalg.norm(FAKE_VEC)
+    with patch(_EMBED, return_value=hit_vec), patch(_GET_SETTINGS, return_value=mock_settings):
+        MemoryTool()._store_sync("stored earlier", "a.md", db_path, FAKE_MODEL, 20)
+
+        # As if in a new process: nothing cached, the table only exists on disk.
+        monkeypatch.setattr(mem_module, "_db_cache", {})
+        monkeypatch.setattr(mem_module, "_table_cache", {})
+        results = MemoryTool()._query_sync("anything", 5, None, db_path, FAKE_MODEL, 20)
+
+    assert [r["content"] for r in results] == ["stored earlier"]
+
+
+def test_store_migrates_table_without_content_hash(mock_settings, tmp_path):
+    import lancedb
+
+    db_path = str(tmp_path / "memory")
+    old = lancedb.connect(db_path).create_table(TABLE_NAME, schema=pa.schema([
+        pa.field("vector", pa.list_(pa.float32(), 4)),
+        pa.field("content", pa.large_utf8()),
+        pa.field("source_path", pa.utf8()),
+        pa.field("created_at", pa.utf8()),
+    ]))
+    old.add([{"vector": np.array([1, 0, 0, 0], dtype=np.float32), "content": "old",
+              "source_path": "old.md", "created_at": "2026-01-01T00:00:00+00:00"}])
+
+    new_vec = np.array([0, 1, 0, 0], dtype=np.float32)
+    with patch(_EMBED, return_value=new_vec), patch(_GET_SETTINGS, return_value=mock_settings):
+        first = MemoryTool()._store_sync("new", "new.md", db_path, FAKE_MODEL, 20)
+        again = MemoryTool()._store_sync("new", "new.md", db_path, FAKE_MODEL, 20)
+
+    table = lancedb.connect(db_path).open_table(TABLE_NAME)
+    assert "content_hash" in table.schema.names
+    assert table.count_rows() == 2
+    assert first == {"duplicate": False}
+    assert again["similarity"] == 1.0  # caught by hash
 
 
 async def test_store_inserts_below_threshold(mock_settings):
@@ -142,6 +371,50 @@ async def test_store_threshold_is_inclusive(mock_settings):
     table.add.assert_not_called()
 
 
+def test_ensure_index_builds_once_table_is_large_enough():
+    table = make_table()
+    table.list_indices.return_value = []
+
+    mem_module._ensure_index(table, mem_module.INDEX_MIN_ROWS - 1)
+    table.create_index.assert_not_called()
+
+    mem_module._ensure_index(table, mem_module.INDEX_MIN_ROWS)
+    table.create_index.assert_called_once()
+    assert table.create_index.call_args.kwargs["metric"] == "dot"
+
+
+def test_ensure_index_skips_existing_index():
+    table = make_table()
+    table.list_indices.return_value = [MagicMock()]
+    table.index_stats.return_value = MagicMock(num_indexed_rows=10 * mem_module.INDEX_MIN_ROWS)
+
+    mem_module._ensure_index(table, 10 * mem_module.INDEX_MIN_ROWS + 1)
+    table.create_index.assert_not_called()
+
+
+def test_ensure_index_rebuilds_after_table_doubles():
+    table = make_table()
+    table.list_indices.return_value = []
+    n = mem_module.INDEX_MIN_ROWS
+
+    mem_module._ensure_index(table, n)
+    mem_module._ensure_index(table, 2 * n - 1)
+    assert table.create_index.call_count == 1
+
+    mem_module._ensure_index(table, 2 * n)
+    assert table.create_index.call_count == 2
+    assert table.create_index.call_args.kwargs["replace"] is True
+    table.list_indices.assert_called_once()  # later checks use the cached threshold
+
+
+def test_ensure_index_failure_does_not_raise():
+    table = make_table()
+    table.list_indices.return_value = []
+    table.create_index.side_effect = RuntimeError("training failed")
+
+    mem_module._ensure_index(table, mem_module.INDEX_MIN_ROWS)  # logged, not raised
+
+
 async def test_store_raises_on_empty_content(mock_settings):
     with patch(_GET_SETTINGS, return_value=mock_settings):
         with pytest.raises(ValueError, match="requires 'content'"):
@@ -152,6 +425,59 @@ async def test_store_raises_on_empty_content(mock_settings):
 # _query
 # ---------------------------------------------------------------------------
 
+async def test_store_many_embeds_once_and_adds_once(mock_settings):
+    table = make_table(rows=[])
+    db = make_db(table, table_exists=False)
+    vecs = [np.array([1.0, 0.0]), np.array([0.0, 1.0]), np.array([0.0, 1.0])]
+    items = [{"content": c, "source_path": f"{c}.md"} for c in ("a", "b", "b again")]
+
+    with patch("tools.memory._embed_batch", return_value=vecs) as embed_batch, \
+         patch(_LANCEDB + ".connect", return_value=db), \
+         patch(_GET_SETTINGS, return_value=mock_settings), \
+         patch(_TO_THREAD, new=AsyncMock(side_effect=lambda fn, *a: fn(*a))):
+        results = await MemoryTool()._store_many(items)
+
+    embed_batch.assert_called_once_with(["a", "b", "b again"], FAKE_MODEL)
+    table.add.assert_called_once()
+    assert [r["content"] for r in table.add.call_args[0][0]] == ["a", "b"]
+    # The third item duplicates the second within the same batch.
+    assert [r["duplicate"] for r in results] == [False, False, True]
+    assert results[2]["existing_source"] == "b.md"
+
+
+async def test_store_many_embeds_only_items_not_stored_verbatim(mock_settings):
+    table = make_table(rows=[])
+    table.exact_chain.to_list.return_value = [{
+        "content_hash": mem_module._content_hash("a"),
+        "source_path": "a.md",
+        "created_at": "2026-01-01T00:00:00+00:00",
+    }]
+    db = make_db(table)
+    items = [{"content": c, "source_path": f"{c}.md"} for c in ("a", "b")]
+
+    with patch("tools.memory._embed_batch", return_value=[np.array([1.0, 0.0])]) as embed_batch, \
+         patch(_LANCEDB + ".connect", return_value=db), \
+         patch(_GET_SETTINGS, return_value=mock_settings), \
+         patch(_TO_THREAD, new=AsyncMock(side_effect=lambda fn, *a: fn(*a))):
+        results = await MemoryTool()._store_many(items)
+
+    embed_batch.assert_called_once_with(["b"], FAKE_MODEL)
+    assert [r["duplicate"] for r in results] == [True, False]
+    assert [r["content"] for r in table.add.call_args[0][0]] == ["b"]
+
+
+def test_embed_batch_encodes_only_cache_misses():
+    encoder = MagicMock()
+    encoder.encode.side_effect = lambda texts, **kw: np.ones((len(texts), 2))
+    with patch("tools.memory._get_encoder", return_value=encoder):
+        cached = mem_module._embed("seen", FAKE_MODEL)
+        vecs = mem_module._embed_batch(["seen", "new 1", "new 2"], FAKE_MODEL)
+
+    assert vecs[0] is cached
+    assert encoder.encode.call_args.args[0] == ["new 1", "new 2"]
+    assert encoder.encode.call_args.kwargs["batch_size"] == mem_module.EMBED_BATCH_SIZE
+
+
 async def test_query_writes_results_file(mock_settings, tmp_path):
     mock_settings.brain_inbox = str(tmp_path)
     hit = {
@@ -177,6 +503,29 @@ async def test_query_writes_results_file(mock_settings, tmp_path):
     assert "Some stored memory content." in content
 
 
+async def test_dedup_asks_for_top_1_but_query_for_top_k(mock_settings, tmp_path):
+    mock_settings.brain_inbox = str(tmp_path)
+    hit = {
+        "content": "x",
+        "source_path": "x.md",
+        "created_at": "2026-01-01T00:00:00+00:00",
+        "_distance": 0.5,
+    }
+    table = make_table(rows=[hit])
+    db = make_db(table)
+    chain = table.search.return_value
+
+    with patch(_EMBED, return_value=FAKE_VEC), \
+         patch(_LANCEDB + ".connect", return_value=db), \
+         patch(_GET_SETTINGS, return_value=mock_settings), \
+         patch(_TO_THREAD, new=AsyncMock(side_effect=lambda fn, *a: fn(*a))):
+        await MemoryTool()._store({"content": "New content", "source_path": "new.md"})
+        chain.limit.assert_called_once_with(1)
+        chain.limit.reset_mock()
+        await MemoryTool()._query({"query": "anything", "top_k": 7})
+        chain.limit.assert_called_once_with(7)
+
+
 async def test_query_no_table_writes_empty_result(mock_settings, tmp_path):
     mock_settings.brain_inbox = str(tmp_path)
     db = make_db(MagicMock(), table_exists=False)
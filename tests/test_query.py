@@ -20,6 +20,7 @@ def mock_settings(tmp_path):
     s.ollama_base_url = "http://localhost:11434"
     s.ollama_model = "qwen2.5:1.5b"
     s.ollama_timeout = 30
+    s.memory_embed_concurrency = 1
     return s
 
 
@@ -1,6 +1,8 @@
 """Tests for RouterOutput Pydantic parsing (Ollama mocked)."""
 import asyncio
 import json
+from pathlib import Path
+
 import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 
@@ -48,16 +50,39 @@ def test_parse_strips_markdown_fences():
     assert result.tool_name == "arxiv"
 
 
+def test_parse_strips_bare_fences_without_language_tag():
+    router = make_router()
+    raw = '```\n{"tool_name": "memory",\n "params": {}, "handoff": false}\n```\n'
+    result = router._parse(raw)
+    assert result.tool_name == "memory"
+
+
+def test_parse_slices_single_fenced_block_without_regex(monkeypatch):
+    monkeypatch.setattr("core.router._FENCE_RE", None)  # any regex use would raise
+    raw = '```json\n{"tool_name": "arxiv", "params": {}, "handoff": false}\n```'
+    assert make_router()._parse(raw).tool_name == "arxiv"
+
+
+def test_parse_falls_back_to_regex_for_extra_fences():
+    raw = '```json\n{"tool_name": "arxiv", "params": {},\n```\n"handoff": false}\n```'
+    assert make_router()._parse(raw).tool_name == "arxiv"
+
+
 def test_parse_invalid_json_raises():
     router = make_router()
     with pytest.raises(ValueError):
         router._parse("not json at all")
 
 
-def test_parse_missing_field_raises():
+def test_parse_missing_tool_name_raises():
     router = make_router()
     with pytest.raises(ValueError):
-        router._parse('{"tool_name": "arxiv"}')  # missing params + handoff
+        router._parse('{"params": {}, "handoff": false}')
+
+
+def test_parse_defaults_missing_params_and_handoff():
+    result = make_router()._parse('{"tool_name": "arxiv"}')
+    assert (result.tool_name, result.params, result.handoff) == ("arxiv", {}, False)
 
 
 # ---- route() integration (Ollama mocked) ------------------------------------
@@ -74,6 +99,19 @@ async def test_route_calls_ollama():
     assert result.handoff is False
 
 
+async def test_route_keeps_model_loaded_between_calls():
+    router = make_router()
+    expected = {"tool_name": "arxiv", "params": {}, "handoff": False}
+    mock_chat = AsyncMock(return_value={"message": {"content": json.dumps(expected)}})
+
+    with patch.object(router.client, "chat", new=mock_chat):
+        await router.route("Find papers on RL")
+
+    kwargs = mock_chat.call_args.kwargs
+    assert kwargs["keep_alive"] == "10m"
+    assert kwargs["options"]["num_predict"] > 0
+
+
 async def test_route_retries_on_transient_error():
     """A single transient failure is retried and the second attempt succeeds."""
     router = make_router(max_retries=3)
@@ -182,3 +220,97 @@ def test_build_system_prompt_no_examples_section_when_empty():
         prompt = router._build_system_prompt()
 
     assert "Examples:" not in prompt
+
+
+# ---- _load_user_prefs — mtime/size cache -------------------------------------
+
+def test_load_user_prefs_missing_file_returns_empty():
+    router = make_router()
+    assert router._load_user_prefs() == ""
+
+
+def test_load_user_prefs_cached_until_file_changes(tmp_path):
+    prefs = tmp_path / "prefs.md"
+    prefs.write_text("likes: short answers", encoding="utf-8")
+    router = Router(
+        model="qwen2.5:1.5b",
+        user_prefs_path=str(prefs),
+        llm_semaphore=asyncio.Semaphore(1),
+    )
+    assert router._load_user_prefs() == "likes: short answers"
+
+    with patch.object(Path, "read_text", side_effect=AssertionError("should be cached")):
+        assert router._load_user_prefs() == "likes: short answers"
+
+    prefs.write_text("likes: long, detailed answers", encoding="utf-8")
+    assert router._load_user_prefs() == "likes: long, detailed answers"
+
+
+# ---- route() cache -------------------------------------------------------------
+
+async def test_route_caches_identical_requests():
+    router = make_router()
+    expected = {"tool_name": "arxiv", "params": {"query": "RL"}, "handoff": False}
+    mock_chat = AsyncMock(return_value={"message": {"content": json.dumps(expected)}})
+
+    with patch.object(router.client, "chat", new=mock_chat):
+        first = await router.route("Find papers on RL")
+        first.params["query"] = "mutated downstream"
+        second = await router.route("Find papers on RL")
+
+    assert mock_chat.await_count == 1
+    assert second.params == {"query": "RL"}
+
+
+async def test_route_cache_disabled_with_zero_ttl():
+    router = Router(
+        model="qwen2.5:1.5b",
+        user_prefs_path="/nonexistent/prefs.md",
+        llm_semaphore=asyncio.Semaphore(1),
+        cache_ttl=0,
+    )
+    expected = {"tool_name": "arxiv", "params": {}, "handoff": False}
+    mock_chat = AsyncMock(return_value={"message": {"content": json.dumps(expected)}})
+
+    with patch.object(router.client, "chat", new=mock_chat):
+        await router.route("Find papers on RL")
+        await router.route("Find papers on RL")
+
+    assert mock_chat.await_count == 2
+
+
+# ---- _render_prompt_parts ------------------------------------------------------
+
+def test_render_prompt_parts_reused_until_prefs_change(tmp_path):
+    prefs = tmp_path / "prefs.md"
+    prefs.write_text("likes: short answers", encoding="utf-8")
+    router = Router(
+        model="qwen2.5:1.5b",
+        user_prefs_path=str(prefs),
+        llm_semaphore=asyncio.Semaphore(1),
+    )
+    first = router._render_prompt_parts()
+    assert router._render_prompt_parts() is first
+    assert first[1] == "likes: short answers\n\n---\nUser request: "
+
+    prefs.write_text("likes: long, detailed answers", encoding="utf-8")
+    second = router._render_prompt_parts()
+    assert second is not first
+    assert second[1].startswith("likes: long, detailed answers")
+    assert second[2] != first[2]
+
+
+def test_render_prompt_parts_rebuilt_when_tools_change():
+    router = make_router()
+    first = router._render_prompt_parts()
+
+    class LateTool(BaseTool):
+        tool_name = "late_tool"
+        routing_description = "hot-registered after startup"
+        async def run_local(self, params: dict) -> None: ...
+
+    with patch.dict("tools.TOOL_REGISTRY", {"late_tool": LateTool}):
+        second = router._render_prompt_parts()
+
+    assert "late_tool" in second[0]["content"]
+    assert "late_tool" not in first[0]["content"]
@@ -14,28 +14,37 @@ def fake_asyncio_run(coro):
     coro.close()
 
 
-@pytest.mark.parametrize("tool_name,tool_cls,params", [
-    ("arxiv",    ArxivTool,    {"query": "transformers", "mode": "search"}),
-    ("git_sync", GitSyncTool,  {"phase": "pre", "repo_path": "/repo"}),
-    ("memory",   MemoryTool,   {"action": "store", "content": "hi", "source_path": "x.md"}),
-])
-def test_runner_local_calls_run_local(tool_name, tool_cls, params):
+# (tool_name, tool_cls, params, params serialised once at import for argv)
+_LOCAL_CASES = [
+    (name, cls, params, json.dumps(params))
+    for name, cls, params in [
+        ("arxiv",    ArxivTool,    {"query": "transformers", "mode": "search"}),
+        ("git_sync", GitSyncTool,  {"phase": "pre", "repo_path": "/repo"}),
+        ("git_sync", GitSyncTool,  {"phase": "post", "repo_path": "/repo"}),
+        ("git_sync", GitSyncTool,  {"phase": "pre", "repo_path": "."}),
+        ("memory",   MemoryTool,   {"action": "store", "content": "hi", "source_path": "x.md"}),
+    ]
+]
+
+
+@pytest.mark.parametrize("tool_name,tool_cls,params,params_json", _LOCAL_CASES)
+def test_runner_local_calls_run_local(tool_name, tool_cls, params, params_json):
     """'local' mode looks up the tool and calls run_local with the parsed params."""
     mock_run_local = AsyncMock()
     with (
         patch("tools.runner.asyncio.run", side_effect=fake_asyncio_run),
         patch.object(tool_cls, "run_local", mock_run_local),
-        patch("sys.argv", ["runner", tool_name, "local", json.dumps(params)]),
+        patch("sys.argv", ["runner", tool_name, "local", params_json]),
     ):
         runner_module.main()
 
     mock_run_local.assert_called_once_with(params)
 
 
-def test_runner_spawn_calls_brain_get_spawn_cmd():
-    """'spawn' mode invokes the configured brain's get_spawn_cmd and executes it."""
+def test_runner_spawn_calls_brain_get_spawn_argv():
+    """'spawn' mode invokes the configured brain's get_spawn_argv and executes it."""
     mock_brain = MagicMock()
-    mock_brain.get_spawn_cmd.return_value = "claude --print '...'"
+    mock_brain.get_spawn_argv.return_value = ["claude", "--print", "..."]
     mock_settings = MagicMock()
     mock_settings.default_cloud_brain = "claude_code"
     params = {"query": "transformers"}
@@ -43,13 +52,15 @@ def test_runner_spawn_calls_brain_get_spawn_cmd():
     with (
         patch("tools.runner.BrainRegistry") as mock_registry_cls,
         patch("tools.runner.get_settings", return_value=mock_settings),
-        patch("tools.runner.subprocess.run"),
+        patch("tools.runner.subprocess.Popen") as mock_popen,
         patch("sys.argv", ["runner", "arxiv", "spawn", json.dumps(params)]),
     ):
         mock_registry_cls.return_value.get.return_value = mock_brain
         runner_module.main()
 
-    mock_brain.get_spawn_cmd.assert_called_once_with("arxiv", params)
+    mock_brain.get_spawn_argv.assert_called_once_with("arxiv", params)
+    assert mock_popen.call_args[0][0] == ["claude", "--print", "..."]
+    assert mock_popen.call_args[1]["start_new_session"] is True
 
 
 def test_runner_unknown_tool_exits():
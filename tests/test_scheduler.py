@@ -15,8 +15,7 @@ from providers.scheduler import Scheduler, _seconds_until_utc
 def test_seconds_until_utc_future_time():
     """Target time is 1 hour in the future → delay ≈ 3600s."""
     now = datetime(2026, 2, 26, 10, 0, 0, tzinfo=timezone.utc)
-    with patch("providers.scheduler.datetime") as mock_dt:
-        mock_dt.now.return_value = now
+    with patch("providers.scheduler.time.time", return_value=now.timestamp()):
         delay = _seconds_until_utc(11, 0)
     assert 3590 < delay <= 3600
 
@@ -24,8 +23,7 @@ def test_seconds_until_utc_future_time():
 def test_seconds_until_utc_past_time_wraps_to_next_day():
     """Target time already passed today → wraps to same time tomorrow (~86400s)."""
     now = datetime(2026, 2, 26, 12, 0, 0, tzinfo=timezone.utc)
-    with patch("providers.scheduler.datetime") as mock_dt:
-        mock_dt.now.return_value = now
+    with patch("providers.scheduler.time.time", return_value=now.timestamp()):
         delay = _seconds_until_utc(11, 0)  # 11:00 has passed; next is tomorrow
     assert 82800 <= delay <= 86400
 
@@ -33,48 +31,88 @@ def test_seconds_until_utc_past_time_wraps_to_next_day():
 def test_seconds_until_utc_exact_time_wraps():
     """Target time is exactly now → wraps to next day."""
     now = datetime(2026, 2, 26, 0, 0, 0, tzinfo=timezone.utc)
-    with patch("providers.scheduler.datetime") as mock_dt:
-        mock_dt.now.return_value = now
+    with patch("providers.scheduler.time.time", return_value=now.timestamp()):
         delay = _seconds_until_utc(0, 0)
     assert delay > 86390  # ~24h
 
 
 # ---------------------------------------------------------------------------
-# _job_loop — fires after initial delay, then enqueues
+# dispatch loop — fires due jobs, re-arms them a day later
 # ---------------------------------------------------------------------------
 
-async def test_job_loop_enqueues_after_initial_delay():
-    """_job_loop sleeps for the initial delay then calls enqueue_task."""
-    settings_mock = AsyncMock()
-    settings_mock.db_path = ":memory:"
-
-    enqueued = []
-
-    async def fake_enqueue(db_path, description, metadata):
-        enqueued.append(description)
-
-    scheduler = Scheduler.__new__(Scheduler)
-    scheduler.settings = settings_mock
-    scheduler._running = True
-
-    # Patch initial delay to 0 and the 24h repeat to something large
-    # so the loop only fires once before we cancel it
-    sleep_calls = []
-
-    async def fake_sleep(seconds):
-        sleep_calls.append(seconds)
-        if len(sleep_calls) >= 2:
-            scheduler._running = False
-
-    with patch("providers.scheduler._seconds_until_utc", return_value=0), \
-         patch("providers.scheduler.enqueue_task", side_effect=fake_enqueue), \
-         patch("providers.scheduler.asyncio.sleep", side_effect=fake_sleep):
-        await scheduler._job_loop(0, 0, "test job", {"key": "val"})
-
-    assert "test job" in enqueued
-    # First sleep is the initial delay (0), second is the 24h interval
-    assert sleep_calls[0] == 0
-    assert sleep_calls[1] == 24 * 3600
+async def test_dispatch_loop_fires_due_job_and_rearms_it():
+    """A job due now is submitted once and pushed back onto the heap 24h later."""
+    engine = AsyncMock()
+    scheduler = Scheduler()
+    scheduler.register_engine(engine)
+    scheduler.add_daily("00:00", "test job", {"key": "val"})
+
+    with patch("providers.scheduler._seconds_until_utc", return_value=0):
+        task = asyncio.create_task(scheduler.run())
+        await asyncio.sleep(0.01)
+        await scheduler.stop()
+        await task
+
+    engine.submit_task.assert_awaited_once_with("test job", metadata={"key": "val"})
+    assert len(scheduler._heap) == 1
+    fire_at, _, entry = scheduler._heap[0]
+    assert fire_at - asyncio.get_running_loop().time() > 24 * 3600 - 5
+    assert entry == (0, 0, "test job", {"key": "val"})
+
+
+async def test_failed_submit_does_not_stop_other_jobs():
+    """A job whose submit raises is logged and re-armed; later jobs still fire."""
+    engine = AsyncMock()
+    engine.submit_task.side_effect = [RuntimeError("database is locked"), None]
+    scheduler = Scheduler()
+    scheduler.register_engine(engine)
+    scheduler.add_daily("00:00", "a", {})
+    scheduler.add_daily("00:00", "b", {})
+
+    with patch("providers.scheduler._seconds_until_utc", return_value=0):
+        task = asyncio.create_task(scheduler.run())
+        await asyncio.sleep(0.01)
+        await scheduler.stop()
+        await task
+
+    assert [c.args[0] for c in engine.submit_task.await_args_list] == ["a", "b"]
+    assert len(scheduler._heap) == 2  # both re-armed
+
+
+async def test_add_daily_while_running_wakes_dispatch_loop():
+    """A job added to an idle running scheduler fires without waiting out a sleep."""
+    engine = AsyncMock()
+    scheduler = Scheduler()
+    scheduler.register_engine(engine)
+
+    with patch("providers.scheduler._seconds_until_utc", return_value=0):
+        task = asyncio.create_task(scheduler.run())
+        await asyncio.sleep(0)  # loop is now waiting with an empty heap
+        scheduler.add_daily("09:15", "late job", {})
+        await asyncio.sleep(0.01)
+        await scheduler.stop()
+        await task
+
+    engine.submit_task.assert_awaited_once_with("late job", metadata={})
+
+
+async def test_rearm_follows_utc_wall_clock():
+    """The next fire is recomputed from UTC, so a late fire doesn't shift later ones."""
+    engine = AsyncMock()
+    scheduler = Scheduler()
+    scheduler.register_engine(engine)
+    loop = asyncio.get_running_loop()
+    scheduler._heap = [(loop.time() - 100.0, 0, (0, 0, "late", {}))]
+
+    with patch("providers.scheduler._seconds_until_utc", return_value=23 * 3600) as until:
+        task = asyncio.create_task(scheduler.run())
+        await asyncio.sleep(0.01)
+        await scheduler.stop()
+        await task
+
+    engine.submit_task.assert_awaited_once()
+    until.assert_called_once_with(0, 0)
+    assert abs(scheduler._heap[0][0] - (loop.time() + 23 * 3600)) < 5
 
 
 # ---------------------------------------------------------------------------
@@ -90,3 +128,11 @@ def test_add_daily_stores_hour_and_minute():
 
     s.add_daily("14:30", "Afternoon job", {"x": 1})
     assert s._jobs == [(14, 30, "Afternoon job", {"x": 1})]
+
+
+@pytest.mark.parametrize("utc_time", ["25:00", "12:60", "25:99", "-1:30"])
+def test_add_daily_rejects_out_of_range_time(utc_time):
+    s = Scheduler()
+    with pytest.raises(ValueError, match="Invalid UTC time"):
+        s.add_daily(utc_time, "bad", {})
+    assert s._jobs == []
@@ -45,10 +45,13 @@ def provider(mock_settings):
 # Result matching — _send_result
 # ---------------------------------------------------------------------------
 
+def test_init_creates_brain_inbox(tmp_path, provider):
+    assert (tmp_path / "inbox").is_dir()
+
+
 async def test_send_result_uses_task_id_prefixed_file(tmp_path, mock_settings, provider):
     """_send_result picks up the file named {task_id}_*.md, not any stray file."""
     inbox = tmp_path / "inbox"
-    inbox.mkdir()
     mock_settings.brain_inbox = str(inbox)
 
     # Write a file belonging to task 42 and a decoy for task 99
@@ -60,22 +63,79 @@ async def test_send_result_uses_task_id_prefixed_file(tmp_path, mock_settings, p
     task.chat_id = 1001
     task.tool_name = "arxiv"
     task.result = None  # no structured result; should fall through to file glob
+    task.result_path = None
 
     mock_bot = AsyncMock()
     provider.settings = mock_settings
 
-    with patch("providers.telegram.mark_notified", new=AsyncMock()):
-        await provider._send_result(mock_bot, task)
+    provider._engine = AsyncMock()
+    provider.app.bot = mock_bot
+    await provider._send_result(task)
 
     sent_text = mock_bot.send_message.call_args.kwargs["text"]
     assert "Correct result for task 42" in sent_text
     assert "Wrong result" not in sent_text
 
 
+async def test_send_result_uses_result_index_without_glob(tmp_path, provider):
+    path = tmp_path / "inbox" / "42_arxiv_search_query.md"
+    path.write_text("Indexed result")
+    provider._result_index = {42: path}
+    task = MagicMock(id=42, chat_id=1001, result=None, result_path=None)
+    provider._engine = AsyncMock()
+    provider.app.bot = AsyncMock()
+
+    with patch("providers.telegram.os.scandir", side_effect=AssertionError("inbox scanned")):
+        assert await provider._send_result(task) is True
+
+    assert "Indexed result" in provider.app.bot.send_message.call_args.kwargs["text"]
+    assert provider._result_index == {}
+
+
+def test_index_inbox_maps_task_ids_to_newest_file(tmp_path):
+    import os
+
+    from providers.telegram import _index_inbox
+
+    old, new = tmp_path / "7_a.md", tmp_path / "7_b.md"
+    old.write_text("old")
+    new.write_text("new")
+    os.utime(old, (1, 1))
+    (tmp_path / "8_x.md").write_text("x")
+    (tmp_path / "notes_1.md").write_text("not a task file")
+    (tmp_path / "9_x.txt").write_text("wrong suffix")
+
+    assert _index_inbox(tmp_path) == {7: new, 8: tmp_path / "8_x.md"}
+
+
+async def test_send_result_picks_newest_of_several_files(tmp_path, mock_settings, provider):
+    import os
+
+    inbox = tmp_path / "inbox"
+    mock_settings.brain_inbox = str(inbox)
+    old, new = inbox / "6_draft.md", inbox / "6_result.md"
+    old.write_text("stale")
+    new.write_text("fresh")
+    os.utime(old, (1_000, 1_000))
+    os.utime(new, (2_000, 2_000))
+
+    task = MagicMock()
+    task.id = 6
+    task.chat_id = 1001
+    task.result = None
+    task.result_path = None
+
+    provider.settings = mock_settings
+    provider._engine = AsyncMock()
+    provider.app.bot = AsyncMock()
+    await provider._send_result(task)
+
+    assert provider.app.bot.send_message.call_args.kwargs["text"] == "fresh"
+
+
 async def test_send_result_falls_back_when_no_file(tmp_path, mock_settings, provider):
     """If no {task_id}_*.md exists, sends the generic completion message."""
     inbox = tmp_path / "inbox"
-    inbox.mkdir()
     mock_settings.brain_inbox = str(inbox)
 
     task = MagicMock()
@@ -83,12 +143,15 @@ async def test_send_result_falls_back_when_no_file(tmp_path, mock_settings, prov
     task.chat_id = 2002
     task.tool_name = "arxiv"
     task.result = None
+    task.result_path = None
+    task.metadata = {}  # local tool, not a cloud handoff
 
     mock_bot = AsyncMock()
     provider.settings = mock_settings
 
-    with patch("providers.telegram.mark_notified", new=AsyncMock()):
-        await provider._send_result(mock_bot, task)
+    provider._engine = AsyncMock()
+    provider.app.bot = mock_bot
+    await provider._send_result(task)
 
     sent_text = mock_bot.send_message.call_args.kwargs["text"]
     assert "Task #7 complete" in sent_text
@@ -96,7 +159,6 @@ async def test_send_result_falls_back_when_no_file(tmp_path, mock_settings, prov
 
 async def test_send_result_truncates_long_output(tmp_path, mock_settings, provider):
     inbox = tmp_path / "inbox"
-    inbox.mkdir()
     mock_settings.brain_inbox = str(inbox)
     (inbox / "5_result.md").write_text("x" * 5000)
 
@@ -105,18 +167,44 @@ async def test_send_result_truncates_long_output(tmp_path, mock_settings, provid
     task.chat_id = 3003
     task.tool_name = "memory"
     task.result = None
+    task.result_path = None
 
     mock_bot = AsyncMock()
     provider.settings = mock_settings
 
-    with patch("providers.telegram.mark_notified", new=AsyncMock()):
-        await provider._send_result(mock_bot, task)
+    provider._engine = AsyncMock()
+    provider.app.bot = mock_bot
+    await provider._send_result(task)
 
     sent_text = mock_bot.send_message.call_args.kwargs["text"]
     assert "…(truncated)" in sent_text
     assert len(sent_text) <= 4100  # 4000 content + truncation notice
 
 
+async def test_send_result_reads_recorded_result_path(tmp_path, mock_settings, provider):
+    """A recorded result_path is read directly, capped to one message."""
+    result_file = tmp_path / "elsewhere" / "8_result.md"
+    result_file.parent.mkdir()
+    result_file.write_text("é" * 20000)
+
+    task = MagicMock()
+    task.id = 8
+    task.chat_id = 4004
+    task.tool_name = "arxiv"
+    task.result = None
+    task.result_path = str(result_file)
+
+    mock_bot = AsyncMock()
+    provider.settings = mock_settings
+    provider._engine = AsyncMock()
+    provider.app.bot = mock_bot
+    assert await provider._send_result(task, mark=False) is True
+
+    sent_text = mock_bot.send_message.call_args.kwargs["text"]
+    assert sent_text == "é" * 4000 + "\n\n…(truncated)"
+    provider._engine.mark_result_delivered.assert_not_awaited()
+
+
 async def test_send_result_uses_task_result_field(mock_settings, provider):
     """When task.result is set, it's sent directly without touching the inbox."""
     task = MagicMock()
@@ -124,12 +212,14 @@ async def test_send_result_uses_task_result_field(mock_settings, provider):
     task.chat_id = 5005
     task.tool_name = "query"
     task.result = "The answer is 42."
+    task.result_path = None
 
     mock_bot = AsyncMock()
     provider.settings = mock_settings
 
-    with patch("providers.telegram.mark_notified", new=AsyncMock()):
-        await provider._send_result(mock_bot, task)
+    provider._engine = AsyncMock()
+    provider.app.bot = mock_bot
+    await provider._send_result(task)
 
     sent_text = mock_bot.send_message.call_args.kwargs["text"]
     assert sent_text == "The answer is 42."
@@ -142,12 +232,14 @@ async def test_send_result_truncates_long_task_result(mock_settings, provider):
     task.chat_id = 5006
     task.tool_name = "query"
     task.result = "y" * 5000
+    task.result_path = None
 
     mock_bot = AsyncMock()
     provider.settings = mock_settings
 
-    with patch("providers.telegram.mark_notified", new=AsyncMock()):
-        await provider._send_result(mock_bot, task)
+    provider._engine = AsyncMock()
+    provider.app.bot = mock_bot
+    await provider._send_result(task)
 
     sent_text = mock_bot.send_message.call_args.kwargs["text"]
     assert "…(truncated)" in sent_text
@@ -166,22 +258,23 @@ async def test_cmd_status_no_args_shows_recent_tasks(provider, mock_settings):
     context = MagicMock()
     context.args = []
 
-    from core.db import Task, TaskStatus
     recent = [
-        Task(id=3, request_text="third task", status=TaskStatus.done),
-        Task(id=2, request_text="second task", status=TaskStatus.executing),
-        Task(id=1, request_text="first task", status=TaskStatus.done),
+        (3, TaskStatus.done, "third task"),
+        (2, TaskStatus.executing, "x" * 61),
+        (1, TaskStatus.done, "first task"),
     ]
 
     provider.settings = mock_settings
-    with patch("providers.telegram.get_recent_tasks", new=AsyncMock(return_value=recent)):
-        await provider._cmd_status(update, context)
+    provider._engine = AsyncMock()
+    provider._engine.get_recent_task_snippets.return_value = recent
+    await provider._cmd_status(update, context)
 
     reply = update.message.reply_text.call_args[0][0]
     assert "#3" in reply
     assert "#2" in reply
     assert "done" in reply
     assert "executing" in reply
+    assert "x" * 60 + "…" in reply
 
 
 async def test_cmd_status_no_args_empty_db(provider, mock_settings):
@@ -193,13 +286,38 @@ async def test_cmd_status_no_args_empty_db(provider, mock_settings):
     context.args = []
 
     provider.settings = mock_settings
-    with patch("providers.telegram.get_recent_tasks", new=AsyncMock(return_value=[])):
-        await provider._cmd_status(update, context)
+    provider._engine = AsyncMock()
+    provider._engine.get_recent_task_snippets.return_value = []
+    await provider._cmd_status(update, context)
 
     reply = update.message.reply_text.call_args[0][0]
     assert "No tasks" in reply
 
 
+async def test_cmd_help_sends_prebuilt_entities(provider):
+    from providers.telegram import HELP_TEXT, _HELP_ENTITIES
+
+    update = MagicMock()
+    update.message = AsyncMock()
+    await provider._cmd_help(update, MagicMock())
+
+    update.message.reply_text.assert_awaited_once_with(HELP_TEXT, entities=_HELP_ENTITIES)
+    bold = _HELP_ENTITIES[0]
+    assert HELP_TEXT[bold.offset:bold.offset + bold.length] == "Pie-Brain"
+
+
+def test_allowed_user_ids_coerced_to_frozenset(provider):
+    from config.settings import Settings
+
+    provider.settings = Settings(telegram_allowed_user_ids=[1, 2])
+    assert isinstance(provider.settings.telegram_allowed_user_ids, frozenset)
+    update = MagicMock()
+    update.effective_user.id = 2
+    assert provider._is_authorized(update)
+    update.effective_user.id = 3
+    assert not provider._is_authorized(update)
+
+
 # ---------------------------------------------------------------------------
 # Event loop fix — post_init hook registers the delivery task
 # ---------------------------------------------------------------------------
@@ -223,6 +341,52 @@ async def test_on_startup_creates_delivery_task(provider):
     assert delivered == [True]
 
 
+async def test_deliver_results_marks_only_sent_tasks(provider):
+    """Sends run concurrently; a failed send doesn't block marking the others."""
+    tasks = [_make_task(TaskStatus.done, task_id=i) for i in (1, 2, 3)]
+    provider._engine = AsyncMock()
+    provider._engine.get_deliverable_results.return_value = tasks
+
+    async def fake_send(task, mark=True):
+        if task.id == 2:
+            raise RuntimeError("boom")
+        return task.id == 1
+
+    provider._send_result = fake_send
+    loop_task = asyncio.create_task(provider._deliver_results())
+    for _ in range(5):
+        await asyncio.sleep(0)
+    loop_task.cancel()
+
+    provider._engine.mark_results_delivered.assert_awaited_once_with([1])
+
+
+async def test_run_owns_and_cancels_delivery_task(provider):
+    """run() starts the delivery loop itself and cancels it on shutdown."""
+    started = asyncio.Event()
+
+    async def fake_deliver():
+        started.set()
+        await asyncio.Event().wait()
+
+    provider._deliver_results = fake_deliver
+    provider.app.updater.start_polling = AsyncMock()
+    provider.app.updater.stop = AsyncMock()
+    provider.app.start = AsyncMock()
+    provider.app.stop = AsyncMock()
+
+    runner = asyncio.create_task(provider.run())
+    await asyncio.wait_for(started.wait(), timeout=1.0)
+    delivery = provider._delivery_task
+    assert delivery.get_name() == "telegram-deliver-results"
+
+    runner.cancel()
+    await asyncio.gather(runner, return_exceptions=True)
+    assert delivery.cancelled()
+    assert provider._delivery_task is None
+    provider.app.stop.assert_awaited_once()
+
+
 # ---------------------------------------------------------------------------
 # register_engine — wires up callback
 # ---------------------------------------------------------------------------
@@ -254,8 +418,8 @@ async def test_on_task_update_routing_sends_message(provider, mock_settings):
     mock_bot = AsyncMock()
     provider.settings = mock_settings
 
-    with patch("providers.telegram.Bot", return_value=mock_bot):
-        await provider._on_task_update(task)
+    provider.app.bot = mock_bot
+    await provider._on_task_update(task)
 
     mock_bot.send_message.assert_called_once()
     text = mock_bot.send_message.call_args.kwargs["text"]
@@ -269,8 +433,8 @@ async def test_on_task_update_executing_includes_tool(provider, mock_settings):
     mock_bot = AsyncMock()
     provider.settings = mock_settings
 
-    with patch("providers.telegram.Bot", return_value=mock_bot):
-        await provider._on_task_update(task)
+    provider.app.bot = mock_bot
+    await provider._on_task_update(task)
 
     text = mock_bot.send_message.call_args.kwargs["text"]
     assert "memory" in text
@@ -284,8 +448,8 @@ async def test_on_task_update_done_delegates_to_send_result(provider, mock_setti
     provider._send_result = AsyncMock()
     mock_bot = AsyncMock()
 
-    with patch("providers.telegram.Bot", return_value=mock_bot):
-        await provider._on_task_update(task)
+    provider.app.bot = mock_bot
+    await provider._on_task_update(task)
 
     provider._send_result.assert_awaited_once()
     mock_bot.send_message.assert_not_called()
@@ -297,8 +461,8 @@ async def test_on_task_update_failed_sends_error(provider, mock_settings):
     mock_bot = AsyncMock()
     provider.settings = mock_settings
 
-    with patch("providers.telegram.Bot", return_value=mock_bot):
-        await provider._on_task_update(task)
+    provider.app.bot = mock_bot
+    await provider._on_task_update(task)
 
     text = mock_bot.send_message.call_args.kwargs["text"]
     assert "failed" in text.lower()
@@ -311,7 +475,56 @@ async def test_on_task_update_skips_no_chat_id(provider, mock_settings):
     mock_bot = AsyncMock()
     provider.settings = mock_settings
 
-    with patch("providers.telegram.Bot", return_value=mock_bot):
-        await provider._on_task_update(task)
+    provider.app.bot = mock_bot
+    await provider._on_task_update(task)
 
     mock_bot.send_message.assert_not_called()
+
+
+# ---------------------------------------------------------------------------
+# _on_message — backlog cap
+# ---------------------------------------------------------------------------
+
+def _make_update(text="search arxiv"):
+    update = MagicMock()
+    update.message.text = text
+    update.message.reply_text = AsyncMock()
+    update.effective_user.id = 42
+    update.effective_chat.id = 1234
+    return update
+
+
+async def test_on_message_rejects_when_backlog_full(provider, mock_settings):
+    mock_settings.telegram_max_pending_tasks = 3
+    provider._engine = AsyncMock()
+    provider._engine.pending_count.return_value = 3
+    update = _make_update()
+
+    await provider._on_message(update, MagicMock())
+
+    provider._engine.submit_task.assert_not_awaited()
+    assert "Busy" in update.message.reply_text.call_args.args[0]
+
+
+async def test_on_message_queues_below_backlog_cap(provider, mock_settings):
+    mock_settings.telegram_max_pending_tasks = 3
+    provider._engine = AsyncMock()
+    provider._engine.pending_count.return_value = 2
+    provider._engine.submit_task.return_value = 7
+    update = _make_update()
+
+    await provider._on_message(update, MagicMock())
+
+    provider._engine.submit_task.assert_awaited_once_with("search arxiv", chat_id=1234)
+    update.message.reply_text.assert_awaited_once_with("Task #7 queued.")
+
+
+async def test_on_message_ignores_blank_text(provider):
+    provider._engine = AsyncMock()
+    update = _make_update(text="   \n ")
+
+    await provider._on_message(update, MagicMock())
+
+    provider._engine.pending_count.assert_not_awaited()
+    provider._engine.submit_task.assert_not_awaited()
+    update.message.reply_text.assert_not_awaited()
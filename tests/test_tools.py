@@ -1,4 +1,11 @@
 """Tests for BaseTool registry auto-collection."""
+import json
+import os
+import shlex
+import subprocess
+import sys
+from pathlib import Path
+
 import pytest
 
 from tools import TOOL_REGISTRY
@@ -30,3 +37,69 @@ def test_tools_have_required_methods():
     for name, cls in TOOL_REGISTRY.items():
         assert hasattr(cls, "run_local"), f"{name} missing run_local"
         assert hasattr(cls, "get_spawn_cmd"), f"{name} missing get_spawn_cmd"
+
+
+def test_spawn_cmd_round_trips_quoted_params():
+    params = {"query": "what's new in RL?", "max_results": 5}
+    argv = shlex.split(TOOL_REGISTRY["arxiv"]().get_spawn_cmd(params))
+    assert argv[:5] == ["python", "-m", "tools.runner", "arxiv", "local"]
+    assert json.loads(argv[5]) == params
+    assert ", " not in argv[5]  # compact separators
+
+
+def test_import_tools_does_not_import_tool_modules():
+    code = (
+        "import sys, tools\n"
+        "assert 'tools.memory' not in sys.modules\n"
+        "assert tools.load_tool('git_sync').tool_name == 'git_sync'\n"
+        "assert 'tools.memory' not in sys.modules\n"
+        "assert 'memory' in tools.TOOL_REGISTRY\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=Path(__file__).parent.parent)
+
+
+def test_load_tool_unknown_returns_none():
+    from tools import load_tool
+
+    assert load_tool("no_such_tool") is None
+
+
+@pytest.fixture
+def manifest(monkeypatch, tmp_path):
+    """Install a fake tools._manifest listing *modules*; returns its file."""
+    import types
+
+    import tools
+
+    path = tmp_path / "_manifest.py"
+    path.write_text("")
+    dir_mtime = os.stat(tools._pkg_path).st_mtime
+    os.utime(path, (dir_mtime + 60, dir_mtime + 60))  # written after the last tool change
+    monkeypatch.setattr(tools, "_MANIFEST", path)
+    monkeypatch.setattr(tools, "_modules", None)
+
+    def install(*modules: str) -> Path:
+        monkeypatch.setitem(sys.modules, "tools._manifest", types.SimpleNamespace(MODULES=modules))
+        return path
+
+    return install
+
+
+def test_manifest_overrides_directory_scan(monkeypatch, manifest):
+    import tools
+
+    manifest("git_sync")
+    assert tools._tool_modules() == ("git_sync",)
+    monkeypatch.setattr(tools, "_modules", None)
+    monkeypatch.delitem(sys.modules, "tools._manifest")
+    monkeypatch.setattr(tools, "_MANIFEST", Path("/nonexistent/_manifest.py"))
+    assert set(tools._tool_modules()) >= {"arxiv", "git_sync", "memory"}
+
+
+def test_manifest_older_than_tools_dir_falls_back_to_scan(manifest):
+    import tools
+
+    path = manifest("git_sync")
+    dir_mtime = os.stat(tools._pkg_path).st_mtime
+    os.utime(path, (dir_mtime - 60, dir_mtime - 60))  # a tool was added since
+    assert set(tools._tool_modules()) >= {"arxiv", "git_sync", "memory"}
@@ -1,20 +1,93 @@
-"""Auto-collect all BaseTool subclasses into TOOL_REGISTRY at import time."""
+"""Collect BaseTool subclasses into TOOL_REGISTRY, importing tool modules on first use.
+
+``import tools`` only lists the package directory; the tool modules (and their
+heavy dependencies) are imported when TOOL_REGISTRY is first accessed, or one at
+a time through load_tool().
+"""
 import importlib
+import os
 import pkgutil
 from pathlib import Path
 
 from tools.base import BaseTool
 
-# Import every module in this package so subclasses are registered
 _pkg_path = str(Path(__file__).parent)
-for _info in pkgutil.iter_modules([_pkg_path]):
-    if _info.name not in ("base", "runner"):
-        importlib.import_module(f"tools.{_info.name}")
+_MANIFEST = Path(_pkg_path) / "_manifest.py"
+_NOT_TOOLS = ("base", "runner")
+_modules: tuple[str, ...] | None = None
+
+
+def scan_tool_modules() -> tuple[str, ...]:
+    """List tool module names by scanning the package directory."""
+    return tuple(
+        info.name
+        for info in pkgutil.iter_modules([_pkg_path])
+        if info.name not in _NOT_TOOLS and not info.name.startswith("_")
+    )
+
+
+def _manifest_modules() -> tuple[str, ...] | None:
+    """MODULES from tools/_manifest.py, or None if it is missing or out of date.
+
+    The manifest is only rewritten by setup.sh, so a tool added or removed since
+    (a dev-mode git pull, a hand edit) leaves the package directory newer than
+    it, and the caller falls back to scanning.
+    """
+    try:
+        if _MANIFEST.stat().st_mtime < os.stat(_pkg_path).st_mtime:
+            return None
+        from tools._manifest import MODULES
+    except (OSError, ImportError):
+        return None
+    return tuple(MODULES)
+
+
+def _tool_modules() -> tuple[str, ...]:
+    """Tool module names, from tools/_manifest.py when the installer wrote one.
+
+    Falls back to a directory scan; either way the result is computed once.
+    """
+    global _modules
+    if _modules is None:
+        _modules = _manifest_modules()
+        if _modules is None:
+            _modules = scan_tool_modules()
+    return _modules
+
+
+def get_tool_registry() -> dict[str, type[BaseTool]]:
+    """Return TOOL_REGISTRY, importing every tool module the first time."""
+    registry = globals().get("TOOL_REGISTRY")
+    if registry is None:
+        for name in _tool_modules():
+            importlib.import_module(f"tools.{name}")
+        registry = {cls.tool_name: cls for cls in BaseTool.__subclasses__() if cls.tool_name}
+        globals()["TOOL_REGISTRY"] = registry  # later lookups skip __getattr__
+    return registry
+
+
+def load_tool(name: str) -> type[BaseTool] | None:
+    """Return the tool registered as *name*, or None.
+
+    Before the registry is built, only ``tools.<name>`` is imported — tools live
+    in a module named after their tool_name — so one-shot callers such as
+    tools.runner skip every other tool's dependencies.
+    """
+    registry = globals().get("TOOL_REGISTRY")
+    if registry is None and name in _tool_modules():
+        importlib.import_module(f"tools.{name}")
+        for cls in BaseTool.__subclasses__():
+            if cls.tool_name == name:
+                return cls
+    return get_tool_registry().get(name)
+
+
+def __getattr__(name: str):
+    if name == "TOOL_REGISTRY":
+        return get_tool_registry()
+    if name in _tool_modules():
+        return importlib.import_module(f"tools.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-TOOL_REGISTRY: dict[str, type[BaseTool]] = {
-    cls.tool_name: cls
-    for cls in BaseTool.__subclasses__()
-    if cls.tool_name
-}
 
-__all__ = ["BaseTool", "TOOL_REGISTRY"]
+__all__ = ["BaseTool", "TOOL_REGISTRY", "get_tool_registry", "load_tool"]
@@ -1,19 +1,156 @@
 """ArXiv tool — specific search and daily discover."""
 import asyncio
+import hashlib
+import io
+import json
 import logging
+import re
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
+from typing import TextIO
 
 import arxiv
 
 from config.settings import get_settings
-from core.utils import atomic_write
+from core.utils import atomic_write, atomic_writer
 from tools.base import BaseTool
 
 logger = logging.getLogger(__name__)
 
 _DISCOVER_MAX_PER_KEYWORD = 50
+# Keyword searches in flight at once during discover. Each is a single page
+# (max_results fits one request), so this stays a small burst against the API.
+_DISCOVER_CONCURRENCY = 3
 _SUMMARY_TRUNCATE = 400
+# Abstracts arrive hard-wrapped (sometimes with \r\n or tabs); runs collapse to one space.
+_WS_RE = re.compile(r"\s+")
+# One paper in the markdown written by _write_papers.
+_PAPER_TEMPLATE = (
+    "## {i}. {title}\n"
+    "**ID:** `{short_id}`  \n"
+    "**Authors:** {authors}  \n"
+    "**Published:** {published}  \n"
+    "**Categories:** {categories}  \n"
+    "[Abstract](https://arxiv.org/abs/{short_id}) | [PDF]({pdf})\n"
+    "\n"
+    "> {summary}\n"
+    "\n"
+    "---\n"
+)
+_DISCOVER_CACHE_TTL = 24 * 3600  # seconds; arxiv publishes new listings once a day
+# arxiv.Client fetches page_size rows per request whatever max_results is, so
+# pages are sized to the search (capped here) rather than left at the default 100.
+_MAX_PAGE_SIZE = 500
+
+
+# Idle clients by page size, kept for the process lifetime: each holds a requests
+# Session, so later searches reuse its keep-alive connection to export.arxiv.org.
+# A client is checked out by one search at a time — its request pacing and its
+# Session are not safe to share across threads.
+_idle_clients: dict[int, list[arxiv.Client]] = {}
+_clients_lock = threading.Lock()
+
+
+@contextmanager
+def _checkout_client(max_results: int) -> Iterator[arxiv.Client]:
+    """Lend out a client whose pages fit a search for *max_results* papers."""
+    page_size = max(1, min(max_results, _MAX_PAGE_SIZE))
+    with _clients_lock:
+        idle = _idle_clients.setdefault(page_size, [])
+        client = idle.pop() if idle else None
+    if client is None:
+        client = arxiv.Client(page_size=page_size)
+    try:
+        yield client
+    finally:
+        with _clients_lock:
+            _idle_clients[page_size].append(client)
+
+
+def _run_search(search: arxiv.Search, max_results: int) -> list:
+    """Fetch every result of *search*; blocking, so called via asyncio.to_thread."""
+    with _checkout_client(max_results) as client:
+        return list(client.results(search))
+
+
+@dataclass
+class _CachedAuthor:
+    name: str
+
+
+@dataclass
+class _CachedPaper:
+    """The arxiv.Result fields this tool reads, as rebuilt from the discover cache."""
+
+    entry_id: str
+    title: str
+    authors: list[_CachedAuthor]
+    published: datetime | None
+    categories: list[str]
+    summary: str
+    pdf_url: str | None
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "_CachedPaper":
+        return cls(
+            entry_id=d["entry_id"],
+            title=d["title"],
+            authors=[_CachedAuthor(n) for n in d["authors"]],
+            published=datetime.fromisoformat(d["published"]) if d["published"] else None,
+            categories=d["categories"],
+            summary=d["summary"],
+            pdf_url=d["pdf_url"],
+        )
+
+
+def _paper_to_dict(paper) -> dict:
+    return {
+        "entry_id": paper.entry_id,
+        "title": paper.title,
+        "authors": [a.name for a in paper.authors],
+        "published": paper.published.isoformat() if paper.published else None,
+        "categories": list(paper.categories),
+        "summary": paper.summary,
+        "pdf_url": paper.pdf_url,
+    }
+
+
+def _discover_cache_path(cache_dir: str, keywords: list[str], day: datetime) -> Path:
+    """Cache file for *keywords* on *day*'s UTC date; keyword order doesn't matter."""
+    digest = hashlib.blake2b("\0".join(sorted(keywords)).encode(), digest_size=8).hexdigest()
+    return Path(cache_dir) / f"arxiv_discover_{day.strftime('%Y-%m-%d')}_{digest}.json"
+
+
+def _load_discover_cache(path: Path) -> list | None:
+    """Return the papers cached at *path*, or None if it is missing, stale or unreadable."""
+    try:
+        age = time.time() - path.stat().st_mtime
+    except FileNotFoundError:
+        return None
+    if age > _DISCOVER_CACHE_TTL:
+        path.unlink(missing_ok=True)
+        return None
+    try:
+        return [_CachedPaper.from_dict(d) for d in json.loads(path.read_text(encoding="utf-8"))]
+    except (OSError, ValueError, KeyError, TypeError):
+        logger.warning("Ignoring unreadable arxiv discover cache %s", path, exc_info=True)
+        return None
+
+
+def _prune_discover_cache(cache_dir: Path, keep: Path) -> None:
+    """Delete discover cache files other than *keep* that are past their TTL."""
+    cutoff = time.time() - _DISCOVER_CACHE_TTL
+    for old in cache_dir.glob("arxiv_discover_*.json"):
+        try:
+            if old != keep and old.stat().st_mtime < cutoff:
+                old.unlink()
+        except FileNotFoundError:
+            pass
 
 
 class ArxivTool(BaseTool):
@@ -50,6 +187,7 @@ class ArxivTool(BaseTool):
         memory = MemoryTool()
 
         retrieved_at = datetime.now(tz=timezone.utc).strftime("%Y-%m-%d")
+        items = []
         for paper in self._fetched_papers:
             short_id = paper.entry_id.split("/abs/")[-1]
             authors = ", ".join(a.name for a in paper.authors[:5])
@@ -58,12 +196,13 @@ class ArxivTool(BaseTool):
                 f"Authors: {authors}\n"
                 f"Published: {paper.published.strftime('%Y-%m-%d') if paper.published else 'unknown'}\n"
                 f"Retrieved: {retrieved_at}\n\n"
-                f"{paper.summary.replace(chr(10), ' ').strip()}"
+                f"{_WS_RE.sub(' ', paper.summary).strip()}"
             )
-            # _store handles dedup internally (logs duplicates at INFO level)
-            await memory._store({"content": content, "source_path": short_id})
+            items.append({"content": content, "source_path": short_id})
 
-        logger.info("ArXiv post-task: submitted %d paper(s) to memory.", len(self._fetched_papers))
+        # One batched embedding pass and one table write; duplicates are skipped inside.
+        await memory._store_many(items)
+        logger.info("ArXiv post-task: submitted %d paper(s) to memory.", len(items))
 
     # ------------------------------------------------------------------
 
@@ -79,6 +218,7 @@ class ArxivTool(BaseTool):
         if paper_id:
             search = arxiv.Search(id_list=[paper_id])
             slug = paper_id.replace("/", "_")
+            max_results = 1
         else:
             search = arxiv.Search(
                 query=query,
@@ -88,51 +228,87 @@ class ArxivTool(BaseTool):
             slug = "query"
 
         logger.info("ArXiv specific search: id=%r query=%r", paper_id, query)
-        client = arxiv.Client()
-        papers = await asyncio.to_thread(list, client.results(search))
+        papers = await asyncio.to_thread(_run_search, search, max_results)
         self._fetched_papers.extend(papers)
 
-        content = self._format_papers(f"ArXiv: {query or paper_id}", papers)
-        self._write_output(f"arxiv_search_{slug}.md", content, params.get("_task_id"))
+        self._write_output(
+            f"arxiv_search_{slug}.md", f"ArXiv: {query or paper_id}", papers,
+            params.get("_task_id"),
+        )
 
     async def _daily_discover(self, params: dict) -> None:
-        """Fetch papers submitted in the last 24 h matching user interests."""
-        since = datetime.now(tz=timezone.utc) - timedelta(hours=24)
+        """Fetch papers submitted in the last 24 h matching user interests.
+
+        Results are cached per UTC day and keyword set, so a repeat run the same
+        day makes no network requests.
+        """
+        generated_at = datetime.now(tz=timezone.utc)
+        since = generated_at - timedelta(hours=24)
         settings = get_settings()
         keywords = params.get("keywords") or settings.arxiv_discover_keywords
 
-        logger.info(
-            "ArXiv daily discover since %s, keywords=%s",
-            since.isoformat(), keywords,
+        cache_path = _discover_cache_path(settings.arxiv_cache_dir, keywords, generated_at)
+        papers = _load_discover_cache(cache_path)
+        if papers is not None:
+            logger.info(
+                "ArXiv daily discover: %d paper(s) from cache %s", len(papers), cache_path.name
+            )
+        else:
+            logger.info(
+                "ArXiv daily discover since %s, keywords=%s",
+                since.isoformat(), keywords,
+            )
+            papers, complete = await self._fetch_discover(keywords, since, generated_at)
+            if complete:  # a partial result set is not worth reusing
+                cached = json.dumps([_paper_to_dict(p) for p in papers], separators=(",", ":"))
+                atomic_write(cache_path, cached)
+                _prune_discover_cache(cache_path.parent, keep=cache_path)
+        self._fetched_papers.extend(papers)
+
+        self._write_output(
+            "arxiv_daily_discover.md",
+            f"ArXiv Daily Discover — {generated_at.strftime('%Y-%m-%d')}",
+            papers,
+            params.get("_task_id"),
+            generated_at=generated_at,
         )
 
-        client = arxiv.Client()
-        seen: set[str] = set()
-        papers: list = []
+    async def _fetch_discover(
+        self, keywords: list[str], since: datetime, until: datetime
+    ) -> tuple[list, bool]:
+        """Return (papers published after *since*, whether every keyword search succeeded)."""
+        sem = asyncio.Semaphore(_DISCOVER_CONCURRENCY)
+        # Let the API drop older papers instead of paging through them here.
+        window = f"submittedDate:[{since:%Y%m%d%H%M} TO {until:%Y%m%d%H%M}]"
 
-        for kw in keywords:
+        async def fetch(kw: str) -> list:
             search = arxiv.Search(
-                query=kw,
+                query=f"({kw}) AND {window}",
                 max_results=_DISCOVER_MAX_PER_KEYWORD,
                 sort_by=arxiv.SortCriterion.SubmittedDate,
                 sort_order=arxiv.SortOrder.Descending,
             )
-            results = await asyncio.to_thread(list, client.results(search))
+            async with sem:
+                return await asyncio.to_thread(_run_search, search, _DISCOVER_MAX_PER_KEYWORD)
+
+        per_keyword = await asyncio.gather(*(fetch(kw) for kw in keywords), return_exceptions=True)
+        failures = [r for r in per_keyword if isinstance(r, Exception)]
+        if failures and len(failures) == len(per_keyword):
+            raise failures[0]
+
+        seen: set[str] = set()
+        papers: list = []
+        for kw, results in zip(keywords, per_keyword):
+            if isinstance(results, Exception):
+                logger.warning("ArXiv discover: search for %r failed: %s", kw, results)
+                continue
             for paper in results:
                 if paper.published < since:
-                    break  # results are date-descending; nothing later will qualify
+                    break  # safety net: results are date-descending, nothing later qualifies
                 if paper.entry_id not in seen:
                     seen.add(paper.entry_id)
                     papers.append(paper)
-        self._fetched_papers.extend(papers)
-
-        generated_at = datetime.now(tz=timezone.utc)
-        content = self._format_papers(
-            f"ArXiv Daily Discover — {generated_at.strftime('%Y-%m-%d')}",
-            papers,
-            generated_at=generated_at,
-        )
-        self._write_output("arxiv_daily_discover.md", content, params.get("_task_id"))
+        return papers, not failures
 
     # ------------------------------------------------------------------
 
@@ -142,49 +318,66 @@ class ArxivTool(BaseTool):
         papers: list,
         generated_at: datetime | None = None,
     ) -> str:
-        lines: list[str] = [f"# {heading}", ""]
+        buf = io.StringIO()
+        self._write_papers(buf, heading, papers, generated_at)
+        return buf.getvalue()
+
+    def _write_papers(
+        self,
+        out: TextIO,
+        heading: str,
+        papers: list,
+        generated_at: datetime | None = None,
+    ) -> None:
+        """Write the papers markdown to *out* one paper at a time."""
+        out.write(f"# {heading}\n\n")
         if generated_at:
-            lines += [f"_Generated: {generated_at.strftime('%Y-%m-%dT%H:%M UTC')}_", ""]
+            out.write(f"_Generated: {generated_at.strftime('%Y-%m-%dT%H:%M UTC')}_\n\n")
 
         if not papers:
-            lines.append("_No papers found._")
-            return "\n".join(lines)
+            out.write("_No papers found._")
+            return
 
-        lines += [f"_{len(papers)} paper(s)_", ""]
+        out.write(f"_{len(papers)} paper(s)_\n")
 
         for i, paper in enumerate(papers, 1):
             short_id = paper.entry_id.split("/abs/")[-1]
-            authors = ", ".join(a.name for a in paper.authors[:3])
-            if len(paper.authors) > 3:
+            author_list = paper.authors
+            authors = ", ".join([a.name for a in author_list[:3]])
+            if len(author_list) > 3:
                 authors += " et al."
-            published = (
-                paper.published.strftime("%Y-%m-%d") if paper.published else "unknown"
-            )
+            published = paper.published
+            published = published.strftime("%Y-%m-%d") if published else "unknown"
             categories = ", ".join(paper.categories[:3])
-            summary = paper.summary.replace("\n", " ").strip()
+            summary = _WS_RE.sub(" ", paper.summary).strip()
             if len(summary) > _SUMMARY_TRUNCATE:
                 summary = summary[:_SUMMARY_TRUNCATE] + "…"
             pdf = paper.pdf_url or f"https://arxiv.org/pdf/{short_id}"
 
-            lines += [
-                f"## {i}. {paper.title}",
-                f"**ID:** `{short_id}`  ",
-                f"**Authors:** {authors}  ",
-                f"**Published:** {published}  ",
-                f"**Categories:** {categories}  ",
-                f"[Abstract](https://arxiv.org/abs/{short_id}) | [PDF]({pdf})",
-                "",
-                f"> {summary}",
-                "",
-                "---",
-                "",
-            ]
-
-        return "\n".join(lines)
-
-    def _write_output(self, filename: str, content: str, task_id: int | None = None) -> None:
+            out.write("\n")
+            out.write(_PAPER_TEMPLATE.format(
+                i=i,
+                title=paper.title,
+                short_id=short_id,
+                authors=authors,
+                published=published,
+                categories=categories,
+                pdf=pdf,
+                summary=summary,
+            ))
+
+    def _write_output(
+        self,
+        filename: str,
+        heading: str,
+        papers: list,
+        task_id: int | None = None,
+        generated_at: datetime | None = None,
+    ) -> None:
+        """Stream the papers markdown straight into the inbox file."""
         settings = get_settings()
         prefix = f"{task_id}_" if task_id is not None else ""
         out_path = Path(settings.brain_inbox) / f"{prefix}{filename}"
-        atomic_write(out_path, content)
+        with atomic_writer(out_path) as fh:
+            self._write_papers(fh, heading, papers, generated_at)
         logger.info("ArXiv output written to %s", out_path)
@@ -1,4 +1,5 @@
 import json
+import shlex
 from abc import ABC, abstractmethod
 
 
@@ -32,5 +33,7 @@ class BaseTool(ABC):
 
     def get_spawn_cmd(self, params: dict) -> str:
         """Return a shell command to run this tool as a subprocess."""
-        params_json = json.dumps(params)
-        return f"python -m tools.runner {self.tool_name} local '{params_json}'"
+        # shlex.quote: params may contain quotes (e.g. "what's new") that a bare
+        # '...' wrapper would break on.
+        params_json = json.dumps(params, separators=(",", ":"))
+        return f"python -m tools.runner {self.tool_name} local {shlex.quote(params_json)}"
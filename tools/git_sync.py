@@ -44,10 +44,19 @@ class GitSyncTool(BaseTool):
 
         logger.info("GitSync post-task: branch=%s message=%r", branch, message)
 
-        if await self._branch_exists(branch, repo_path):
-            await self._run("git", "checkout", branch, cwd=repo_path)
-        else:
-            await self._run("git", "checkout", "-b", branch, cwd=repo_path)
+        # Switch first and create only if that fails: one git process when the
+        # branch exists, instead of a rev-parse probe before every checkout.
+        # `switch` (unlike `checkout`) never falls back to restoring a file
+        # that happens to share the branch's name.
+        try:
+            await self._run("git", "switch", branch, cwd=repo_path)
+        except RuntimeError as switch_exc:
+            try:
+                await self._run("git", "switch", "-c", branch, cwd=repo_path)
+            except RuntimeError as create_exc:
+                # Report both: when the branch exists, the switch error (e.g. local
+                # changes would be overwritten) is the real cause, not "already exists".
+                raise RuntimeError(f"{switch_exc}; then {create_exc}") from switch_exc
 
         if paths:
             await self._run("git", "add", "--", *paths, cwd=repo_path)
@@ -64,17 +73,6 @@ class GitSyncTool(BaseTool):
 
     # ------------------------------------------------------------------
 
-    async def _branch_exists(self, branch: str, cwd: str) -> bool:
-        """Return True if *branch* already exists in the repo at *cwd*."""
-        proc = await asyncio.create_subprocess_exec(
-            "git", "rev-parse", "--verify", branch,
-            cwd=cwd,
-            stdout=asyncio.subprocess.DEVNULL,
-            stderr=asyncio.subprocess.DEVNULL,
-        )
-        await proc.wait()
-        return proc.returncode == 0
-
     @staticmethod
     async def _run(*cmd: str, cwd: str = ".") -> str:
         """Run *cmd* in *cwd*, returning stdout. Raises RuntimeError on failure."""
@@ -1,7 +1,11 @@
 """Memory tool — LanceDB vector store with sentence-transformers dedup."""
 import asyncio
+import hashlib
 import logging
 import re
+import threading
+import weakref
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
@@ -17,6 +21,23 @@ logger = logging.getLogger(__name__)
 SIMILARITY_THRESHOLD = 0.8
 TABLE_NAME = "memories"
 CONTENT_TRUNCATE = 600
+# One query result in the markdown written by _format_results.
+_RESULT_TEMPLATE = (
+    "## {i}. {source_path}\n"
+    "**Similarity:** {similarity:.3f}  \n"
+    "**Stored:** {created_at}  \n"
+    "\n"
+    "{content}\n"
+    "\n"
+    "---\n"
+)
+# Below this many rows a flat scan is as fast as any ANN index, and IVF training
+# needs a reasonable sample anyway.
+INDEX_MIN_ROWS = 1024
+# Embeddings are unit-length, so dot product ranks exactly like cosine without
+# the per-row norm computation. LanceDB reports it as 1 - dot, like cosine.
+_METRIC = "dot"
+_ROWS_PER_PARTITION = 4000
 
 # Maps relative-time phrases to how far back they reach.
 _RECENCY_PATTERNS: list[tuple[str, timedelta]] = [
@@ -41,35 +62,267 @@ def _parse_recency(query_text: str) -> datetime | None:
 
 # Module-level encoder singleton — loading is expensive on Pi 4.
 _encoder = None
-_encoder_model: str = ""
+_encoder_key: tuple[str, str] = ("", "")
+_encoder_lock = threading.Lock()  # a preload and a first store may race to load it
 
 
 def _get_encoder(model_name: str):
-    global _encoder, _encoder_model
-    if _encoder is None or _encoder_model != model_name:
-        from sentence_transformers import SentenceTransformer
-        logger.info("Loading embedding model: %s", model_name)
-        _encoder = SentenceTransformer(model_name)
-        _encoder_model = model_name
-    return _encoder
+    """Return the shared SentenceTransformer for *model_name*.
 
+    The inference backend comes from settings.memory_embedding_backend; "onnx"
+    (or "openvino") runs noticeably faster than torch on a Pi's CPU but needs
+    sentence-transformers >= 3.2 and its optional runtime installed.
+    """
+    global _encoder, _encoder_key
+    backend = get_settings().memory_embedding_backend
+    if _encoder is not None and _encoder_key == (model_name, backend):
+        return _encoder
+    with _encoder_lock:
+        if _encoder is None or _encoder_key != (model_name, backend):
+            from sentence_transformers import SentenceTransformer
+            logger.info("Loading embedding model: %s (backend=%s)", model_name, backend)
+            # Only pass backend when asked: older sentence-transformers don't accept it.
+            kwargs = {} if backend == "torch" else {"backend": backend}
+            _encoder = SentenceTransformer(model_name, **kwargs)
+            _encoder_key = (model_name, backend)
+        return _encoder
 
-def _embed(text: str, model_name: str) -> list[float]:
-    """Return a normalised embedding vector for *text*."""
-    enc = _get_encoder(model_name)
-    return enc.encode(text, normalize_embeddings=True).tolist()
+
+async def preload_encoder() -> None:
+    """Load the embedding model in a worker thread ahead of the first store or query.
+
+    Loading takes several seconds on a Pi; the engine starts this at boot so the
+    first memory task doesn't wait for it. Failures are left for that task to report.
+    """
+    try:
+        await asyncio.to_thread(_get_encoder, get_settings().memory_embedding_model)
+    except Exception:
+        logger.warning("Could not preload the embedding model", exc_info=True)
+
+
+# LRU of recent embeddings keyed by (model, content digest): a forward pass is
+# the dominant cost of every store/query, and repeated notes and questions are
+# common. ~1.5 KB per 384-dim entry.
+EMBED_CACHE_SIZE = 1024
+_embed_cache: OrderedDict = OrderedDict()
+_embed_lock = threading.Lock()  # _embed runs in asyncio.to_thread workers
+
+
+EMBED_BATCH_SIZE = 32
+
+
+# Bounds concurrent embedding workers. asyncio.to_thread's default executor would
+# otherwise run one encode per core-ish thread at once, each of which already
+# uses every core. Created on first use so it binds to the running loop.
+_embed_slots: asyncio.Semaphore | None = None
+
+
+def embed_semaphore(limit: int) -> asyncio.Semaphore:
+    """Return the shared semaphore gating embedding work, sized *limit* on first use."""
+    global _embed_slots
+    if _embed_slots is None:
+        _embed_slots = asyncio.Semaphore(max(1, limit))
+    return _embed_slots
 
 
-def _get_or_create_table(db, dim: int):
-    if TABLE_NAME in db.list_tables():
-        return db.open_table(TABLE_NAME)
+def _cache_key(text: str, model_name: str) -> tuple[str, bytes]:
+    return model_name, hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+
+def _cache_put(key: tuple[str, bytes], vec) -> None:
+    vec.flags.writeable = False
+    with _embed_lock:
+        _embed_cache[key] = vec
+        while len(_embed_cache) > EMBED_CACHE_SIZE:
+            _embed_cache.popitem(last=False)
+
+
+def _embed(text: str, model_name: str):
+    """Return a unit-length float32 embedding (numpy array) for *text*.
+
+    Kept as an array: LanceDB takes it as-is, so no per-element list conversion.
+    Cached arrays are shared between callers and therefore read-only.
+    """
+    key = _cache_key(text, model_name)
+    with _embed_lock:
+        vec = _embed_cache.get(key)
+        if vec is not None:
+            _embed_cache.move_to_end(key)
+            return vec
+
+    enc = _get_encoder(model_name)
+    vec = enc.encode(text, normalize_embeddings=True, convert_to_numpy=True).astype(
+        "float32", copy=False
+    )
+    _cache_put(key, vec)
+    return vec
+
+
+def _embed_batch(texts: list[str], model_name: str) -> list:
+    """Like _embed for many texts: every cache miss goes through one encode() call."""
+    keys = [_cache_key(t, model_name) for t in texts]
+    vecs: list = [None] * len(texts)
+    with _embed_lock:
+        for i, key in enumerate(keys):
+            vec = _embed_cache.get(key)
+            if vec is not None:
+                _embed_cache.move_to_end(key)
+                vecs[i] = vec
+
+    misses = [i for i, v in enumerate(vecs) if v is None]
+    if misses:
+        enc = _get_encoder(model_name)
+        encoded = enc.encode(
+            [texts[i] for i in misses],
+            batch_size=EMBED_BATCH_SIZE,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+        ).astype("float32", copy=False)
+        for i, vec in zip(misses, encoded):
+            _cache_put(keys[i], vec)
+            vecs[i] = vec
+    return vecs
+
+
+# Connections and the opened memories table, per db_path, reused across calls:
+# reopening means re-reading the table manifest from the SD card every time.
+_db_cache: dict[str, object] = {}
+_table_cache: dict[str, object] = {}
+_open_lock = threading.Lock()  # callers run in asyncio.to_thread workers
+
+
+def _connect(db_path: str):
+    with _open_lock:
+        db = _db_cache.get(db_path)
+        if db is None:
+            # Interval 0: every read checks for versions written by other processes
+            # (tool subprocesses store memories too), so a cached table is never stale.
+            db = lancedb.connect(db_path, read_consistency_interval=timedelta(0))
+            _db_cache[db_path] = db
+    return db
+
+
+def _open_table(db_path: str):
+    """Return the memories table at *db_path*, or None if it doesn't exist yet."""
+    table = _table_cache.get(db_path)
+    if table is None:
+        db = _connect(db_path)
+        with _open_lock:
+            table = _table_cache.get(db_path)
+            if table is None:
+                # Not list_tables(): newer lancedb returns a response object from
+                # it, against which a membership test is always False.
+                try:
+                    table = db.open_table(TABLE_NAME)
+                except (ValueError, FileNotFoundError):  # no table yet
+                    return None
+                _add_hash_column(table)
+                _table_cache[db_path] = table
+    return table
+
+
+def _add_hash_column(table) -> None:
+    """Give tables created before content_hash existed the column (NULL for old rows)."""
+    if "content_hash" in table.schema.names:
+        return
+    try:
+        table.add_columns({"content_hash": "CAST(NULL AS STRING)"})
+    except Exception:
+        # Most likely another process migrated it first.
+        logger.warning("Could not add content_hash to the memories table", exc_info=True)
+
+
+def _get_or_create_table(db_path: str, dim: int):
+    table = _open_table(db_path)
+    if table is not None:
+        return table
     schema = pa.schema([
         pa.field("vector", pa.list_(pa.float32(), dim)),
         pa.field("content", pa.large_utf8()),
         pa.field("source_path", pa.utf8()),
         pa.field("created_at", pa.utf8()),
+        pa.field("content_hash", pa.utf8()),
     ])
-    return db.create_table(TABLE_NAME, schema=schema)
+    db = _connect(db_path)
+    with _open_lock:
+        table = _table_cache.get(db_path)
+        if table is None:
+            table = db.create_table(TABLE_NAME, schema=schema, exist_ok=True)
+            _table_cache[db_path] = table
+    return table
+
+
+def _content_hash(content: str) -> str:
+    return hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+
+
+def _find_exact(table, hashes: list[str]) -> dict[str, dict]:
+    """Map each of *hashes* already stored in *table* to its row.
+
+    A filtered scan of one short string column, far cheaper than the embedding it
+    lets an exact re-store skip. Rows stored before the column existed never match.
+    """
+    in_list = ", ".join(f"'{h}'" for h in hashes)  # hex digests: nothing to escape
+    rows = (
+        table.search()
+        .where(f"content_hash IN ({in_list})")
+        .select(["content_hash", "source_path", "created_at"])
+        .limit(len(hashes))
+        .to_list()
+    )
+    return {row["content_hash"]: row for row in rows}
+
+
+def _duplicate(similarity: float, row: dict) -> dict:
+    return {
+        "duplicate": True,
+        "similarity": similarity,
+        "existing_source": row.get("source_path", "unknown"),
+        "existing_created_at": row.get("created_at", "unknown"),
+    }
+
+
+# Row count at which each open table's index is next (re)built; filled lazily.
+_index_due: "weakref.WeakKeyDictionary[object, int]" = weakref.WeakKeyDictionary()
+
+
+def _index_due_at(table) -> int:
+    """Row count at which *table* next needs an index build."""
+    indices = list(table.list_indices())
+    if not indices:
+        return INDEX_MIN_ROWS
+    stats = table.index_stats(indices[0].name)
+    indexed = stats.num_indexed_rows if stats is not None else 0
+    return 2 * max(indexed, INDEX_MIN_ROWS)
+
+
+def _ensure_index(table, row_count: int) -> None:
+    """Build the HNSW vector index once *table* is large enough to benefit.
+
+    Rows added after a build are brute-force searched alongside the index, so
+    it is rebuilt (with more partitions) each time the table doubles rather
+    than on every insert.
+    """
+    due = _index_due.get(table)
+    if due is None:
+        due = _index_due[table] = _index_due_at(table)
+    if row_count < due:
+        return
+    logger.info("Building HNSW index over %d memories", row_count)
+    # Also backs off after a failure, so a failing build isn't retried per store.
+    _index_due[table] = 2 * row_count
+    try:
+        # Keyword form rather than config=HnswSq(...): the latter is missing
+        # from the lancedb releases this project pins.
+        table.create_index(
+            metric=_METRIC,
+            num_partitions=max(1, row_count // _ROWS_PER_PARTITION),
+            index_type="IVF_HNSW_SQ",
+            replace=True,
+        )
+    except Exception:
+        # A missing index only costs speed; never fail the store over it.
+        logger.exception("Failed to build memory vector index")
 
 
 class MemoryTool(BaseTool):
@@ -96,7 +349,7 @@ class MemoryTool(BaseTool):
     # ------------------------------------------------------------------
 
     async def _store(self, params: dict) -> None:
-        """Embed content and store in LanceDB, deduplicating on similarity > 0.8."""
+        """Embed content and store in LanceDB, deduplicating on similarity >= 0.8."""
         content = params.get("content", "")
         source_path = params.get("source_path", "unknown")
 
@@ -106,11 +359,13 @@ class MemoryTool(BaseTool):
         logger.info("Memory store: source=%s len=%d", source_path, len(content))
         settings = get_settings()
 
-        result = await asyncio.to_thread(
-            self._store_sync,
-            content, source_path,
-            settings.memory_db_path, settings.memory_embedding_model,
-        )
+        async with embed_semaphore(settings.memory_embed_concurrency):
+            result = await asyncio.to_thread(
+                self._store_sync,
+                content, source_path,
+                settings.memory_db_path, settings.memory_embedding_model,
+                settings.memory_nprobes,
+            )
 
         if result["duplicate"]:
             logger.info(
@@ -123,6 +378,33 @@ class MemoryTool(BaseTool):
         else:
             logger.info("Memory stored (source=%s).", source_path)
 
+    async def _store_many(self, items: list[dict]) -> list[dict]:
+        """Store many items with one batched embedding pass and a single table write.
+
+        Each item is a _store params dict. Items are deduplicated against the
+        table and against earlier items in the same batch. Returns one result
+        dict per item, as _store_sync does.
+        """
+        if not items:
+            return []
+        if not all(item.get("content") for item in items):
+            raise ValueError("Memory store requires 'content' in every item")
+
+        logger.info("Memory store: %d item(s)", len(items))
+        settings = get_settings()
+
+        async with embed_semaphore(settings.memory_embed_concurrency):
+            results = await asyncio.to_thread(
+                self._store_many_sync,
+                [(item["content"], item.get("source_path", "unknown")) for item in items],
+                settings.memory_db_path, settings.memory_embedding_model,
+                settings.memory_nprobes,
+            )
+        stored = sum(not r["duplicate"] for r in results)
+        logger.info("Memory stored %d item(s), skipped %d duplicate(s).",
+                    stored, len(results) - stored)
+        return results
+
     async def _query(self, params: dict) -> None:
         """Query LanceDB for the nearest neighbours to a text query."""
         query_text = params.get("query", "")
@@ -141,11 +423,13 @@ class MemoryTool(BaseTool):
             logger.info("Memory query: %r (top_k=%d)", query_text, top_k)
         settings = get_settings()
 
-        results = await asyncio.to_thread(
-            self._query_sync,
-            query_text, top_k, since,
-            settings.memory_db_path, settings.memory_embedding_model,
-        )
+        async with embed_semaphore(settings.memory_embed_concurrency):
+            results = await asyncio.to_thread(
+                self._query_sync,
+                query_text, top_k, since,
+                settings.memory_db_path, settings.memory_embedding_model,
+                settings.memory_nprobes,
+            )
 
         content = self._format_results(query_text, results, since=since)
         task_id = params.get("_task_id")
@@ -164,36 +448,106 @@ class MemoryTool(BaseTool):
         source_path: str,
         db_path: str,
         model_name: str,
+        nprobes: int,
     ) -> dict:
+        content_hash = _content_hash(content)
+        table = _open_table(db_path)
+        if table is not None:
+            # Exact re-stores are caught by hash before paying for an embedding.
+            exact = _find_exact(table, [content_hash])
+            if exact:
+                return _duplicate(1.0, exact[content_hash])
+
         vec = _embed(content, model_name)
-        db = lancedb.connect(db_path)
-        table = _get_or_create_table(db, len(vec))
+        if table is None:
+            table = _get_or_create_table(db_path, len(vec))
 
-        if table.count_rows() > 0:
+        row_count = table.count_rows()
+        if row_count > 0:
             hits = (
                 table.search(vec)
-                .metric("cosine")
+                .metric(_METRIC)
+                .nprobes(nprobes)
                 .limit(1)
                 .to_list()
             )
             if hits:
                 similarity = 1.0 - hits[0]["_distance"]
                 if similarity >= SIMILARITY_THRESHOLD:
-                    return {
-                        "duplicate": True,
-                        "similarity": similarity,
-                        "existing_source": hits[0].get("source_path", "unknown"),
-                        "existing_created_at": hits[0].get("created_at", "unknown"),
-                    }
+                    return _duplicate(similarity, hits[0])
 
         table.add([{
             "vector": vec,
             "content": content,
             "source_path": source_path,
             "created_at": datetime.now(tz=timezone.utc).isoformat(),
+            "content_hash": content_hash,
         }])
+        _ensure_index(table, row_count + 1)
         return {"duplicate": False}
 
+    def _store_many_sync(
+        self,
+        items: list[tuple[str, str]],
+        db_path: str,
+        model_name: str,
+        nprobes: int,
+    ) -> list[dict]:
+        hashes = [_content_hash(content) for content, _ in items]
+        table = _open_table(db_path)
+        stored = _find_exact(table, hashes) if table is not None else {}
+        fresh = [i for i, h in enumerate(hashes) if h not in stored]
+        vecs: dict[int, object] = {}
+        if fresh:
+            vecs = dict(zip(fresh, _embed_batch([items[i][0] for i in fresh], model_name)))
+            if table is None:
+                table = _get_or_create_table(db_path, len(vecs[fresh[0]]))
+
+        row_count = table.count_rows()
+        now = datetime.now(tz=timezone.utc).isoformat()
+        results: list[dict] = []
+        rows: list[dict] = []
+        for i, (content, source_path) in enumerate(items):
+            if hashes[i] in stored:
+                results.append(_duplicate(1.0, stored[hashes[i]]))
+                continue
+            vec = vecs[i]
+            dup = None
+            if row_count > 0:
+                hits = (
+                    table.search(vec)
+                    .metric(_METRIC)
+                    .nprobes(nprobes)
+                    .limit(1)
+                    .to_list()
+                )
+                if hits and 1.0 - hits[0]["_distance"] >= SIMILARITY_THRESHOLD:
+                    dup = _duplicate(1.0 - hits[0]["_distance"], hits[0])
+            if dup is None:
+                # Rows queued in this batch are not searchable yet; compare
+                # directly (unit vectors, so the dot product is the similarity).
+                for row in rows:
+                    similarity = float(vec @ row["vector"])
+                    if similarity >= SIMILARITY_THRESHOLD:
+                        dup = _duplicate(similarity, row)
+                        break
+            if dup is not None:
+                results.append(dup)
+                continue
+            rows.append({
+                "vector": vec,
+                "content": content,
+                "source_path": source_path,
+                "created_at": now,
+                "content_hash": hashes[i],
+            })
+            results.append({"duplicate": False})
+
+        if rows:
+            table.add(rows)
+            _ensure_index(table, row_count + len(rows))
+        return results
+
     def _query_sync(
         self,
         query_text: str,
@@ -201,19 +555,18 @@ class MemoryTool(BaseTool):
         since: datetime | None,
         db_path: str,
         model_name: str,
+        nprobes: int,
     ) -> list[dict]:
-        db = lancedb.connect(db_path)
-
-        if TABLE_NAME not in db.list_tables():
+        table = _open_table(db_path)
+        if table is None:
             logger.warning("Memory table does not exist yet — no results.")
             return []
 
-        table = db.open_table(TABLE_NAME)
         if table.count_rows() == 0:
             return []
 
         vec = _embed(query_text, model_name)
-        search = table.search(vec).metric("cosine")
+        search = table.search(vec).metric(_METRIC).nprobes(nprobes)
         if since is not None:
             # created_at is stored as ISO-8601 UTC strings; lexicographic
             # ordering is equivalent to chronological ordering for that format.
@@ -244,20 +597,17 @@ class MemoryTool(BaseTool):
             return "\n".join(lines)
 
         lines += [f"_{len(results)} result(s)_", ""]
-
-        for i, r in enumerate(results, 1):
-            snippet = r["content"]
-            if len(snippet) > CONTENT_TRUNCATE:
-                snippet = snippet[:CONTENT_TRUNCATE] + "…"
-            lines += [
-                f"## {i}. {r['source_path']}",
-                f"**Similarity:** {r['similarity']:.3f}  ",
-                f"**Stored:** {r['created_at']}  ",
-                "",
-                snippet,
-                "",
-                "---",
-                "",
-            ]
-
+        lines += [
+            _RESULT_TEMPLATE.format(
+                i=i,
+                source_path=r["source_path"],
+                similarity=r["similarity"],
+                created_at=r["created_at"],
+                content=(
+                    r["content"] if len(r["content"]) <= CONTENT_TRUNCATE
+                    else r["content"][:CONTENT_TRUNCATE] + "…"
+                ),
+            )
+            for i, r in enumerate(results, 1)
+        ]
         return "\n".join(lines)
@@ -120,12 +120,15 @@ class QueryTool(BaseTool):
         SentenceTransformer twice on the Pi.
         """
         try:
-            results = await asyncio.to_thread(
-                self._query_memory_sync,
-                question,
-                settings.memory_db_path,
-                settings.memory_embedding_model,
-            )
+            from tools.memory import embed_semaphore  # optional dep, hence lazy
+
+            async with embed_semaphore(settings.memory_embed_concurrency):
+                results = await asyncio.to_thread(
+                    self._query_memory_sync,
+                    question,
+                    settings.memory_db_path,
+                    settings.memory_embedding_model,
+                )
         except Exception:
             logger.warning("Memory vector search failed; skipping.", exc_info=True)
             return ""
@@ -143,21 +146,17 @@ class QueryTool(BaseTool):
         self, query_text: str, db_path: str, model_name: str
     ) -> list[dict]:
         """Blocking LanceDB search — called via asyncio.to_thread."""
-        import lancedb
-        from tools.memory import TABLE_NAME, _embed  # reuse module-level encoder singleton
-
-        db = lancedb.connect(db_path)
-        if TABLE_NAME not in db.list_tables():
-            return []
+        # Reuse MemoryTool's encoder singleton and its cached table handle.
+        from tools.memory import _METRIC, _embed, _open_table
 
-        table = db.open_table(TABLE_NAME)
-        if table.count_rows() == 0:
+        table = _open_table(db_path)
+        if table is None or table.count_rows() == 0:
             return []
 
         vec = _embed(query_text, model_name)
         hits = (
             table.search(vec)
-            .metric("cosine")
+            .metric(_METRIC)
             .limit(MAX_MEMORY_HITS)
             .to_list()
         )
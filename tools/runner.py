@@ -6,7 +6,7 @@ import sys
 
 from brains.registry import BrainRegistry
 from config.settings import get_settings
-from tools import TOOL_REGISTRY
+from tools import get_tool_registry, load_tool
 
 
 def main() -> None:
@@ -20,10 +20,10 @@ def main() -> None:
     tool_name, mode, params_json = sys.argv[1], sys.argv[2], sys.argv[3]
     params = json.loads(params_json)
 
-    tool_cls = TOOL_REGISTRY.get(tool_name)
+    tool_cls = load_tool(tool_name)
     if tool_cls is None:
         print(
-            f"Unknown tool: {tool_name!r}. Available: {list(TOOL_REGISTRY)}",
+            f"Unknown tool: {tool_name!r}. Available: {list(get_tool_registry())}",
             file=sys.stderr,
         )
         sys.exit(1)
@@ -34,8 +34,13 @@ def main() -> None:
     elif mode == "spawn":
         settings = get_settings()
         brain = BrainRegistry().get(settings.default_cloud_brain)
-        cmd = brain.get_spawn_cmd(tool_name, params)
-        subprocess.run(["bash", "-c", f"nohup {cmd} &"], check=False)
+        argv = brain.get_spawn_argv(tool_name, params)
+        subprocess.Popen(
+            argv,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
     else:
         print(f"Unknown mode: {mode!r}. Expected 'local' or 'spawn'.", file=sys.stderr)
         sys.exit(1)